@@ -0,0 +1,255 @@
+"""
+Alertas de segurança (veículo BLOQUEADO ou SUSPEITO) sem travar o portão.
+
+A CentralAlertas recebe os alertas de qualquer thread (emitir não bloqueia),
+descarta repetições da mesma placa e limita quantos alertas uma placa gera
+por minuto. Cada destino ("sink") tem a sua própria fila com prioridade e a
+sua thread: um webhook lento não atrasa o som, nem o reconhecimento.
+
+Destinos disponíveis:
+    SinkFila     - a interface busca os alertas no seu loop (faixa de aviso na tela)
+    SinkLog      - logging do modo serviço
+    SinkArquivo  - uma linha JSON por alerta, com rotação do arquivo
+    SinkSom      - bipe do terminal ou um comando (ex.: "paplay ../sons/alerta.wav")
+    SinkWebhook  - POST JSON para um endereço (ex.: um serviço local da portaria)
+"""
+import itertools
+import json
+import logging
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque, namedtuple
+from logging.handlers import RotatingFileHandler
+
+from metricas import metricas
+
+# Menor número = mais urgente
+PRIORIDADES = {"bloqueado": 0, "suspeito": 1}
+
+Alerta = namedtuple("Alerta", "prioridade momento tipo placa mensagem faixa")
+
+log = logging.getLogger("guarita.alertas")
+
+
+class CentralAlertas:
+    """
+    - intervalo_repeticao: o mesmo alerta (placa + tipo) só é repetido depois desse tempo (s)
+    - max_por_placa / janela_s: teto de alertas por placa numa janela (carro indo e voltando no portão)
+    """
+
+    def __init__(self, sinks=(), intervalo_repeticao=60, max_por_placa=3, janela_s=300):
+        self.intervalo_repeticao = intervalo_repeticao
+        self.max_por_placa = max_por_placa
+        self.janela_s = janela_s
+
+        self.emitidos = 0
+        self.repetidos = 0  # Descartados pelo intervalo de repetição
+        self.limitados = 0  # Descartados pelo teto por placa
+
+        self._lock = threading.Lock()
+        self._ultimo = {}  # (placa, tipo) -> momento do último alerta emitido
+        self._recentes = {}  # placa -> deque com os momentos dos alertas na janela
+        self._canais = []
+        for sink in sinks:
+            self.adicionar_sink(sink)
+
+    def adicionar_sink(self, sink):
+        self._canais.append(_Canal(sink))
+
+    def emitir(self, tipo, placa, mensagem="", faixa=None):
+        """Enfileira o alerta para todos os destinos; retorna False se foi descartado (repetido/limitado)"""
+        agora = time.time()
+        with self._lock:
+            anterior = self._ultimo.get((placa, tipo))
+            if anterior is not None and agora - anterior < self.intervalo_repeticao:
+                self.repetidos += 1
+                return False
+
+            recentes = self._recentes.setdefault(placa, deque())
+            while recentes and agora - recentes[0] > self.janela_s:
+                recentes.popleft()
+            if len(recentes) >= self.max_por_placa:
+                self.limitados += 1
+                return False
+
+            recentes.append(agora)
+            self._ultimo[(placa, tipo)] = agora
+            self.emitidos += 1
+            self._esquecer_antigos(agora)
+
+        alerta = Alerta(PRIORIDADES.get(tipo, len(PRIORIDADES)), agora, tipo, placa, mensagem, faixa)
+        metricas.incrementar("guarita_alertas_total", tipo=tipo)
+        for canal in self._canais:
+            canal.colocar(alerta)
+        return True
+
+    def estatisticas(self):
+        return {
+            "emitidos": self.emitidos,
+            "repetidos": self.repetidos,
+            "limitados": self.limitados,
+            "destinos": {canal.nome: canal.estatisticas() for canal in self._canais},
+        }
+
+    def encerrar(self, timeout=5):
+        """Entrega o que ainda está na fila (até 'timeout' por destino) e para as threads"""
+        for canal in self._canais:
+            canal.encerrar(timeout)
+
+    def _esquecer_antigos(self, agora):
+        # Sem isso os dicionários cresceriam com cada placa alertada desde que o programa abriu
+        if len(self._ultimo) < 1000:
+            return
+        limite = max(self.intervalo_repeticao, self.janela_s)
+        self._ultimo = {chave: t for chave, t in self._ultimo.items() if agora - t < limite}
+        self._recentes = {placa: r for placa, r in self._recentes.items() if r and agora - r[-1] < limite}
+
+
+class _Canal:
+    """Fila com prioridade e thread de entrega de um destino"""
+
+    _contador = itertools.count()  # Desempate: mesma prioridade sai na ordem de chegada
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.nome = getattr(sink, "nome", type(sink).__name__)
+        self.entregues = 0
+        self.erros = 0
+        self._fila = queue.PriorityQueue()
+        self._thread = threading.Thread(target=self._loop, name=f"alertas-{self.nome}", daemon=True)
+        self._thread.start()
+
+    def colocar(self, alerta):
+        self._fila.put((alerta.prioridade, next(self._contador), alerta))
+
+    def estatisticas(self):
+        return {"entregues": self.entregues, "erros": self.erros, "na_fila": self._fila.qsize()}
+
+    def encerrar(self, timeout):
+        # Prioridade acima de qualquer alerta: só sai depois de entregar os pendentes
+        self._fila.put((float("inf"), next(self._contador), None))
+        self._thread.join(timeout)
+
+    def _loop(self):
+        while True:
+            _, _, alerta = self._fila.get()
+            if alerta is None:
+                return
+            try:
+                self.sink.enviar(alerta)
+                self.entregues += 1
+            except Exception as e:
+                # Um destino com problema (rede fora, arquivo sem permissão) não derruba os outros
+                self.erros += 1
+                log.error("Falha ao enviar alerta para %s: %s", self.nome, e)
+
+
+def descrever(alerta):
+    """Texto curto do alerta (log, faixa de aviso na tela)"""
+    hora = time.strftime("%H:%M:%S", time.localtime(alerta.momento))
+    origem = f" [{alerta.faixa}]" if alerta.faixa else ""
+    return f"{alerta.tipo.upper()} {alerta.placa} às {hora}{origem}: {alerta.mensagem}"
+
+
+# ================= DESTINOS =================
+class SinkFila:
+    """Guarda os alertas para a interface buscar no próprio loop (o Tkinter só pode ser usado na thread dele)"""
+
+    nome = "tela"
+
+    def __init__(self):
+        self._fila = queue.Queue()
+
+    def enviar(self, alerta):
+        self._fila.put(alerta)
+
+    def pegar(self):
+        itens = []
+        while True:
+            try:
+                itens.append(self._fila.get_nowait())
+            except queue.Empty:
+                return itens
+
+
+class SinkLog:
+    nome = "log"
+
+    def __init__(self, logger=log):
+        self.logger = logger
+
+    def enviar(self, alerta):
+        self.logger.warning("ALERTA %s", descrever(alerta))
+
+
+class SinkArquivo:
+    nome = "arquivo"
+
+    def __init__(self, caminho, max_bytes=5 * 1024 * 1024, copias=5):
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._log = logging.getLogger(f"guarita.alertas.arquivo.{caminho}")
+        self._log.propagate = False
+        self._log.setLevel(logging.INFO)
+        self._log.addHandler(RotatingFileHandler(caminho, maxBytes=max_bytes, backupCount=copias, encoding="utf-8"))
+
+    def enviar(self, alerta):
+        dados = alerta._asdict()
+        dados["momento"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(alerta.momento))
+        self._log.info(json.dumps(dados, ensure_ascii=False))
+
+
+class SinkSom:
+    """Sem comando, usa o bipe do Windows ou o do terminal"""
+
+    nome = "som"
+
+    def __init__(self, comando=None, timeout=10):
+        self.comando = shlex.split(comando) if isinstance(comando, str) else comando
+        self.timeout = timeout
+
+    def enviar(self, alerta):
+        if self.comando:
+            subprocess.run(self.comando, timeout=self.timeout, check=False,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elif sys.platform == "win32":
+            import winsound
+
+            # BLOQUEADO: bipe mais agudo e mais longo
+            winsound.Beep(1500 if alerta.tipo == "bloqueado" else 1000, 600 if alerta.tipo == "bloqueado" else 300)
+        else:
+            sys.stdout.write("\a")
+            sys.stdout.flush()
+
+
+class SinkWebhook:
+    nome = "webhook"
+
+    def __init__(self, url, timeout=3):
+        self.url = url
+        self.timeout = timeout
+
+    def enviar(self, alerta):
+        dados = alerta._asdict()
+        dados["momento"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(alerta.momento))
+        pedido = urllib.request.Request(self.url, data=json.dumps(dados).encode("utf-8"), method="POST",
+                                        headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(pedido, timeout=self.timeout) as resposta:
+            resposta.read()
+
+
+def criar_sinks(config):
+    """Destinos a partir da configuração ({"arquivo": ..., "webhook": ..., "som": true ou comando})"""
+    sinks = []
+    if config.get("arquivo"):
+        sinks.append(SinkArquivo(config["arquivo"]))
+    if config.get("webhook"):
+        sinks.append(SinkWebhook(config["webhook"]))
+    if config.get("som"):
+        sinks.append(SinkSom(config["som"] if isinstance(config["som"], str) else None))
+    return sinks
@@ -0,0 +1,234 @@
+"""
+Motores de OCR intercambiáveis.
+
+Todos têm o método readtext(imagem) do easyocr.Reader, devolvendo uma lista de
+(caixa, texto, confiança). Assim o DetectorPlaca e o PoolOCR funcionam com
+qualquer um deles, escolhido pelo nome na configuração:
+
+    "easyocr"   - EasyOCR/PyTorch (padrão; mais pesado, roda em GPU)
+    "onnx"      - reconhecedor do EasyOCR exportado para ONNX, rodando no onnxruntime (só CPU)
+    "tesseract" - Tesseract com a lista de caracteres restrita aos de placa
+
+Para gerar o modelo ONNX a partir do EasyOCR instalado (precisa de torch só nessa hora):
+    cd src
+    python backends_ocr.py --exportar-onnx ../modelos/reconhecedor.onnx
+"""
+import argparse
+import os
+import string
+import threading
+import time
+
+import cv2
+import numpy as np
+
+CARACTERES_PLACA = string.ascii_uppercase + string.digits
+
+# Motores já carregados, por nome e opções (cada modelo é carregado uma vez só)
+_backends = {}
+_lock_backends = threading.Lock()
+
+
+class BackendOCR:
+    """Base dos motores: só precisa implementar readtext"""
+
+    nome = None
+
+    def readtext(self, imagem, **kwargs):
+        raise NotImplementedError
+
+    @staticmethod
+    def caixa_inteira(imagem):
+        altura, largura = imagem.shape[:2]
+        return [[0, 0], [largura, 0], [largura, altura], [0, altura]]
+
+
+class BackendEasyOCR(BackendOCR):
+    nome = "easyocr"
+
+    def __init__(self, gpu=False, quantizado=False):
+        import easyocr
+
+        # 'gpu=True' é muito mais rápido (precisa de NVIDIA CUDA).
+        # 'quantize=True' (só CPU) deixa o modelo menor e mais rápido, com um pouco menos de precisão.
+        self.reader = easyocr.Reader(['pt'], gpu=gpu, quantize=quantizado)
+
+    def readtext(self, imagem, **kwargs):
+        return self.reader.readtext(imagem, **kwargs)
+
+    def reconhecer_lote(self, imagens):
+        """
+        Lê vários recortes de placa só com o reconhecedor, numa inferência por lote.
+
+        O readtext/readtext_batched rodaria o detector de texto de novo em cada recorte (que já é
+        a placa), e o Reader.recognize na CPU passa as caixas uma a uma. Aqui cada recorte vai para
+        a altura do modelo mantendo a proporção (como o próprio EasyOCR faz) e todos entram juntos
+        no get_text, que monta os tensores de 'batch_size' imagens.
+        """
+        cinzas = [cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY) if imagem.ndim == 3 else imagem for imagem in imagens]
+        try:
+            from easyocr.recognition import get_text
+            from easyocr.utils import get_image_list
+        except ImportError:
+            # Versão do EasyOCR sem essas funções: um recognize por recorte (ainda sem o detector)
+            return [self.reader.recognize(cinza) for cinza in cinzas]
+
+        lista, largura_maxima = [], 0
+        for cinza in cinzas:
+            altura, largura = cinza.shape
+            recortes, largura_recorte = get_image_list([[0, largura, 0, altura]], [], cinza,
+                                                       model_height=self.reader.imgH)
+            lista.extend(recortes)
+            largura_maxima = max(largura_maxima, largura_recorte)
+        ignorar = "".join(set(self.reader.character) - set(self.reader.lang_char))
+        lidos = get_text(self.reader.character, self.reader.imgH, int(largura_maxima), self.reader.recognizer,
+                         self.reader.converter, lista, ignore_char=ignorar, batch_size=len(lista),
+                         device=self.reader.device)
+        # Uma leitura por imagem, na ordem da lista (uma caixa por recorte)
+        return [[(np.asarray(caixa).tolist(), texto, confianca)] for caixa, texto, confianca in lidos]
+
+
+class BackendONNX(BackendOCR):
+    """
+    Reconhecedor CRNN/CTC em ONNX (ex.: o do EasyOCR exportado por exportar_easyocr_onnx).
+    Recebe o recorte da placa inteiro como uma linha de texto, sem o detector de texto do EasyOCR.
+    """
+
+    nome = "onnx"
+
+    def __init__(self, modelo, caracteres, altura=64, threads=1):
+        import onnxruntime as ort
+
+        opcoes = ort.SessionOptions()
+        # Poucas threads por sessão: numa guarita com várias câmeras é melhor dividir os núcleos
+        opcoes.intra_op_num_threads = threads
+        opcoes.inter_op_num_threads = 1
+        opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.sessao = ort.InferenceSession(modelo, sess_options=opcoes, providers=["CPUExecutionProvider"])
+        self.entrada = self.sessao.get_inputs()[0].name
+        self.altura = altura
+
+        with open(caracteres, encoding="utf-8") as arquivo:
+            # Índice 0 da saída é o "branco" do CTC
+            self.caracteres = ["[branco]"] + list(arquivo.read().rstrip("\n"))
+
+    def readtext(self, imagem, **kwargs):
+        logits = self.sessao.run(None, {self.entrada: self._preparar(imagem)})[0][0]
+        texto, confianca = self._decodificar(logits)
+        return [(self.caixa_inteira(imagem), texto, confianca)] if texto else []
+
+    def _preparar(self, imagem):
+        if imagem.ndim == 3:
+            imagem = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+        altura, largura = imagem.shape
+        nova_largura = max(self.altura, int(round(largura * self.altura / altura)))
+        imagem = cv2.resize(imagem, (nova_largura, self.altura), interpolation=cv2.INTER_CUBIC)
+        # Mesma normalização do EasyOCR: pixels em [-1, 1], formato (lote, canal, altura, largura)
+        return ((imagem.astype(np.float32) / 255.0 - 0.5) / 0.5)[None, None]
+
+    def _decodificar(self, logits):
+        """Decodificação gulosa do CTC: junta repetidos e tira os brancos"""
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = exp / exp.sum(axis=1, keepdims=True)
+        indices = probs.argmax(axis=1)
+        maximos = probs.max(axis=1)
+
+        letras = []
+        anterior = 0
+        for indice in indices:
+            if indice != 0 and indice != anterior:
+                letras.append(self.caracteres[indice])
+            anterior = indice
+
+        validos = maximos[indices != 0]
+        if not letras or len(validos) == 0:
+            return "", 0.0
+        # Mesma conta de confiança do EasyOCR (produto das probabilidades, suavizado pelo tamanho)
+        return "".join(letras), float(validos.prod() ** (2.0 / np.sqrt(len(validos))))
+
+
+class BackendTesseract(BackendOCR):
+    nome = "tesseract"
+
+    def __init__(self, idioma="eng", psm=7, caracteres=CARACTERES_PLACA, comando=None):
+        import pytesseract
+
+        if comando:
+            pytesseract.pytesseract.tesseract_cmd = comando
+        # Falha já aqui (e não no primeiro carro) se o executável do Tesseract não estiver instalado
+        pytesseract.get_tesseract_version()
+        self._tesseract = pytesseract
+        self.idioma = idioma
+        # psm 7: a imagem é uma única linha de texto; a whitelist impede símbolos que não existem em placa
+        self.config = f"--oem 1 --psm {psm} -c tessedit_char_whitelist={caracteres}"
+
+    def readtext(self, imagem, **kwargs):
+        dados = self._tesseract.image_to_data(imagem, lang=self.idioma, config=self.config,
+                                              output_type=self._tesseract.Output.DICT)
+        palavras, confiancas = [], []
+        for texto, confianca in zip(dados["text"], dados["conf"]):
+            texto, confianca = texto.strip(), float(confianca)
+            if texto and confianca >= 0:
+                palavras.append(texto)
+                confiancas.append(confianca)
+        if not palavras:
+            return []
+        return [(self.caixa_inteira(imagem), "".join(palavras), min(confiancas) / 100)]
+
+
+BACKENDS = {classe.nome: classe for classe in (BackendEasyOCR, BackendONNX, BackendTesseract)}
+
+
+def carregar_backend(nome="easyocr", **opcoes):
+    """
+    Devolve o motor de OCR pedido, criando só na primeira chamada com essas opções.
+    Os imports pesados (torch, onnxruntime, pytesseract) só acontecem aqui.
+    """
+    if nome not in BACKENDS:
+        raise ValueError(f"Motor de OCR desconhecido: {nome} (opções: {', '.join(BACKENDS)})")
+
+    chave = (nome, repr(sorted(opcoes.items())))
+    with _lock_backends:
+        if chave not in _backends:
+            print(f"Carregando modelo OCR '{nome}' (uma única vez)...")
+            inicio = time.perf_counter()
+            _backends[chave] = BACKENDS[nome](**opcoes)
+            print(f"Modelo OCR carregado em {time.perf_counter() - inicio:.1f} s")
+        return _backends[chave]
+
+
+def exportar_easyocr_onnx(caminho_modelo, caminho_caracteres=None):
+    """Exporta o reconhecedor do EasyOCR (português) para ONNX e grava a lista de caracteres ao lado"""
+    import torch
+
+    reader = BackendEasyOCR(gpu=False).reader
+    reconhecedor = getattr(reader.recognizer, "module", reader.recognizer).eval()
+
+    class SoImagem(torch.nn.Module):
+        # O forward do EasyOCR recebe (imagem, texto), mas o texto não é usado no reconhecimento
+        def __init__(self, modelo):
+            super().__init__()
+            self.modelo = modelo
+
+        def forward(self, imagem):
+            return self.modelo(imagem, None)
+
+    os.makedirs(os.path.dirname(os.path.abspath(caminho_modelo)), exist_ok=True)
+    exemplo = torch.zeros(1, 1, 64, 256)
+    torch.onnx.export(SoImagem(reconhecedor), exemplo, caminho_modelo, input_names=["imagem"],
+                      output_names=["logits"], opset_version=13,
+                      dynamic_axes={"imagem": {0: "lote", 3: "largura"}, "logits": {0: "lote", 1: "passos"}})
+
+    caminho_caracteres = caminho_caracteres or os.path.splitext(caminho_modelo)[0] + ".txt"
+    with open(caminho_caracteres, "w", encoding="utf-8") as arquivo:
+        arquivo.write(reader.character)
+    return caminho_modelo, caminho_caracteres
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ferramentas dos motores de OCR")
+    parser.add_argument("--exportar-onnx", required=True, metavar="ARQUIVO",
+                        help="Exporta o reconhecedor do EasyOCR para este arquivo .onnx")
+    args = parser.parse_args()
+    modelo, caracteres = exportar_easyocr_onnx(args.exportar_onnx)
+    print(f"Modelo: {modelo}\nCaracteres: {caracteres}")
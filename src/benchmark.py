@@ -0,0 +1,522 @@
+"""
+Benchmark offline do reconhecimento de placas (sem webcam).
+
+Passa uma pasta de imagens, um vídeo ou placas sintéticas pelo DetectorPlaca.processar
+e mede o tempo de cada etapa, FPS, latência (p50/p95/p99), memória de pico e,
+com um gabarito, a taxa de acerto. O resultado sai em JSON para comparar execuções.
+
+Exemplos:
+    cd src
+    python benchmark.py --sintetico 50 --saida ../bench_sintetico.json
+    python benchmark.py --fonte ../dados_teste --gabarito ../dados_teste/gabarito.csv
+    python benchmark.py --fonte ../videos/portao.mp4 --gabarito ../videos/portao.csv
+    python benchmark.py --comparar-deteccao 30 --roi 0 0.3 1 0.7
+    python benchmark.py --comparar-processos 200 --processos 0 1 2 4
+    python benchmark.py --comparar-lote 200 --lotes 1 4 8
+    python benchmark.py --fonte ../dados_teste --gabarito ../dados_teste/gabarito.csv \\
+        --comparar-backends easyocr onnx tesseract \\
+        --ocr-opcoes '{"onnx": {"modelo": "../modelos/reconhecedor.onnx", "caracteres": "../modelos/reconhecedor.txt"}}'
+
+O gabarito é um CSV separado por ';' com as colunas 'arquivo;placa' (pasta de imagens)
+ou 'frame;placa' (vídeo, frame contado a partir de 0).
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from fontes import FontePastaImagens, FonteSintetica, abrir_fonte
+
+try:
+    import resource  # Só existe em Linux/macOS
+except ImportError:
+    resource = None
+
+ETAPAS = ["preprocessamento", "canny", "contornos", "recorte", "ocr"]
+
+
+def carregar_gabarito(caminho):
+    """Lê o CSV 'arquivo;placa' (ou 'frame;placa') num dicionário rótulo -> placa"""
+    with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+        leitor = csv.reader(arquivo, delimiter=";")
+        next(leitor, None)  # Cabeçalho
+        return {linha[0].strip(): linha[1].strip().upper() for linha in leitor if len(linha) >= 2}
+
+
+def resumir(valores_s):
+    """Média e percentis em milissegundos"""
+    if not valores_s:
+        return {"n": 0}
+    ms = np.asarray(valores_s) * 1000
+    return {
+        "n": len(ms),
+        "media": round(float(ms.mean()), 3),
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def memoria_pico_mb():
+    """Pico de memória do processo (RSS) ou, no Windows, o pico rastreado pelo tracemalloc"""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KiB, macOS em bytes
+        return round(pico / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+    return round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+
+
+def executar_benchmark(detector, fonte, gabarito=None, independente=False, limite=None, aquecimento=3):
+    """
+    Roda o detector em todos os frames da fonte e devolve o dicionário de resultados.
+
+    independente=True zera o rastreamento a cada frame (fotos sem relação entre si),
+    para medir o OCR de cada imagem em vez de reaproveitar a leitura anterior.
+    """
+    if resource is None:
+        tracemalloc.start()
+
+    tempos_etapas = {etapa: [] for etapa in ETAPAS}
+    latencias = []
+    acertos = lidas = com_gabarito = 0
+    erros = []
+    frames = 0
+    indice = -1
+    inicio_total = time.perf_counter()
+
+    while limite is None or frames < limite:
+        ok, frame = fonte.read()
+        if not ok:
+            break
+        indice += 1
+        rotulo = getattr(fonte, "rotulo_atual", None) or str(indice)
+        esperado = gabarito.get(rotulo) if gabarito else getattr(fonte, "placa_atual", None)
+
+        if independente:
+            detector.reiniciar_rastreamento()
+
+        inicio = time.perf_counter()
+        _, texto, _ = detector.processar(frame)
+        duracao = time.perf_counter() - inicio
+
+        frames += 1
+        # Os primeiros frames pagam a inicialização preguiçosa do modelo; ficam fora das estatísticas
+        if indice >= aquecimento:
+            latencias.append(duracao)
+            for etapa, valor in detector.tempos_etapas.items():
+                tempos_etapas.setdefault(etapa, []).append(valor)
+
+        if esperado:
+            com_gabarito += 1
+            # Melhor leitura disponível: a confirmada ou, se ainda em votação, a parcial da trilha
+            trilha = detector.ultima_trilha
+            leitura = texto or (trilha.texto if trilha is not None else None)
+            if leitura:
+                lidas += 1
+            if leitura == esperado:
+                acertos += 1
+            elif len(erros) < 20:
+                erros.append({"rotulo": rotulo, "esperado": esperado, "lido": leitura})
+
+    duracao_total = time.perf_counter() - inicio_total
+    resultado = {
+        "frames": frames,
+        "duracao_s": round(duracao_total, 3),
+        "fps": round(frames / duracao_total, 2) if duracao_total > 0 else 0.0,
+        "latencia_ms": resumir(latencias),
+        "etapas_ms": {etapa: resumir(valores) for etapa, valores in tempos_etapas.items()},
+        "memoria_pico_mb": memoria_pico_mb(),
+        "ocr": {
+            "executados": detector.rastreador.ocr_executados,
+            "evitados": detector.rastreador.ocr_evitados,
+        },
+    }
+    if com_gabarito:
+        resultado["acuracia"] = {
+            "frames_com_gabarito": com_gabarito,
+            "placas_lidas": lidas,
+            "acertos": acertos,
+            "taxa_leitura": round(lidas / com_gabarito, 4),
+            "taxa_acerto": round(acertos / com_gabarito, 4),
+            "exemplos_de_erro": erros,
+        }
+
+    if resource is None:
+        tracemalloc.stop()
+    return resultado
+
+
+def comparar_deteccao(detector, resolucoes=((1280, 720), (1920, 1080)), quantidade=30, repeticoes=3):
+    """
+    Mede só a localização da placa (sem OCR) nos modos "padrao" e "rapido",
+    com os mesmos frames sintéticos, e informa o ganho e se os dois acharam a mesma placa.
+    """
+    from gerador_placas import desenhar_frame, gerar_texto_placa
+    from rastreador import calcular_iou
+
+    resultado = {}
+    for largura, altura in resolucoes:
+        rng = random.Random(42)
+        frames = [desenhar_frame(gerar_texto_placa(rng), largura, altura, rng) for _ in range(quantidade)]
+        tempos = {"padrao": [], "rapido": []}
+        caixas = {"padrao": [], "rapido": []}
+        for modo, localizar in (("padrao", detector._localizar_padrao), ("rapido", detector._localizar_rapido)):
+            for frame, _ in frames:
+                melhor = None
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    location = localizar(frame, {})
+                    duracao = time.perf_counter() - inicio
+                    melhor = duracao if melhor is None else min(melhor, duracao)
+                tempos[modo].append(melhor)
+                caixas[modo].append(cv2.boundingRect(location) if location is not None else None)
+
+        def acertos(modo):
+            return sum(1 for caixa, (_, gabarito) in zip(caixas[modo], frames)
+                       if caixa is not None and calcular_iou(caixa, gabarito) > 0.5)
+
+        iguais = sum(1 for a, b in zip(caixas["padrao"], caixas["rapido"])
+                     if (a is None and b is None) or (a is not None and b is not None and calcular_iou(a, b) > 0.5))
+        padrao, rapido = resumir(tempos["padrao"]), resumir(tempos["rapido"])
+        resultado[f"{largura}x{altura}"] = {
+            "padrao_ms": padrao,
+            "rapido_ms": rapido,
+            "ganho": round(padrao["media"] / rapido["media"], 2) if rapido["media"] else None,
+            "placas_encontradas": {"padrao": acertos("padrao"), "rapido": acertos("rapido"), "total": quantidade},
+            "concordancia": round(iguais / quantidade, 4),
+        }
+    return resultado
+
+
+def comparar_previa(resolucoes=((1280, 720), (1920, 1080)), quantidade=30, area=(700, 500), repeticoes=3):
+    """
+    Tempo na thread da interface por frame exibido: o caminho antigo (cópia, conversão de cor
+    e imagem nova no tamanho da câmera) contra o RenderizadorPrevia (reduz antes, buffers reaproveitados).
+    Sem tela (servidor, CI), mede só a parte OpenCV/PIL, sem a entrega ao Tkinter.
+    """
+    from PIL import Image, ImageTk
+
+    from gerador_placas import desenhar_frame, gerar_texto_placa
+    from previa import RenderizadorPrevia
+
+    try:
+        import tkinter as tk
+        raiz = tk.Tk()
+        raiz.withdraw()
+    except Exception:
+        raiz = None
+
+    resultado = {"com_tkinter": raiz is not None, "area": list(area)}
+    for largura, altura in resolucoes:
+        rng = random.Random(42)
+        frames = []
+        for _ in range(quantidade):
+            frame, (x, y, w, h) = desenhar_frame(gerar_texto_placa(rng), largura, altura, rng)
+            location = np.array([[[x, y]], [[x + w, y]], [[x + w, y + h]], [[x, y + h]]], np.int32)
+            frames.append((frame, {"localizacao": location, "texto": "ABC1234"}))
+
+        def antigo(frame, deteccao):
+            frame = frame.copy()
+            cv2.drawContours(frame, [deteccao["localizacao"]], -1, (0, 255, 0), 2)
+            imagem = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if raiz is not None:
+                ImageTk.PhotoImage(image=imagem)
+
+        previa = RenderizadorPrevia(None)
+        foto = []
+
+        def novo(frame, deteccao):
+            imagem = previa.preparar(frame, deteccao, *area)
+            if raiz is not None:
+                if not foto:
+                    foto.append(ImageTk.PhotoImage("RGBA", imagem.size))
+                foto[0].paste(imagem)
+
+        tempos = {}
+        for nome, exibir in (("antigo", antigo), ("previa", novo)):
+            tempos[nome] = []
+            for frame, deteccao in frames:
+                melhor = None
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    exibir(frame, deteccao)
+                    duracao = time.perf_counter() - inicio
+                    melhor = duracao if melhor is None else min(melhor, duracao)
+                tempos[nome].append(melhor)
+
+        antes, depois = resumir(tempos["antigo"]), resumir(tempos["previa"])
+        resultado[f"{largura}x{altura}"] = {
+            "antigo_ms": antes,
+            "previa_ms": depois,
+            "economia_ms_por_frame": round(antes["media"] - depois["media"], 3),
+            "ganho": round(antes["media"] / depois["media"], 2) if depois["media"] else None,
+        }
+    if raiz is not None:
+        raiz.destroy()
+    return resultado
+
+
+def criar_fonte(args):
+    if args.sintetico:
+        return FonteSintetica(args.sintetico, args.frames_por_placa, args.largura, args.altura)
+    if os.path.isdir(args.fonte):
+        return FontePastaImagens(args.fonte)
+    return abrir_fonte(args.fonte)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do reconhecimento de placas")
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument("--fonte", help="Pasta de imagens ou arquivo de vídeo")
+    origem.add_argument("--sintetico", type=int, metavar="N", help="Gera N placas sintéticas (sem dados externos)")
+    origem.add_argument("--comparar-deteccao", type=int, metavar="N",
+                        help="Compara a detecção padrão e a rápida em N frames sintéticos 720p e 1080p")
+    origem.add_argument("--comparar-previa", type=int, metavar="N",
+                        help="Mede o tempo da interface por frame exibido (antigo x prévia reduzida) em N frames")
+    origem.add_argument("--comparar-processos", type=int, metavar="N",
+                        help="Lê N recortes sintéticos com o OCR em 0 (processo atual), 1, 2... processos")
+    origem.add_argument("--comparar-lote", type=int, metavar="N",
+                        help="Lê N recortes sintéticos um por chamada e em lotes (--lotes) e compara placas/s")
+    parser.add_argument("--gabarito", help="CSV 'arquivo;placa' ou 'frame;placa'")
+    parser.add_argument("--saida", help="Grava o resultado JSON neste arquivo (padrão: só imprime)")
+    parser.add_argument("--limite", type=int, help="Processa no máximo N frames")
+    parser.add_argument("--aquecimento", type=int, default=3, help="Frames iniciais fora das estatísticas")
+    parser.add_argument("--frames-por-placa", type=int, default=5, help="Sintético: frames seguidos de cada placa")
+    parser.add_argument("--largura", type=int, default=1280)
+    parser.add_argument("--altura", type=int, default=720)
+    parser.add_argument("--independente", action="store_true",
+                        help="Zera o rastreamento a cada frame (padrão para pasta de imagens)")
+    parser.add_argument("--modo-deteccao", choices=["padrao", "rapido"], default="padrao")
+    parser.add_argument("--roi", type=float, nargs=4, metavar=("X", "Y", "L", "A"),
+                        help="Região de busca em frações do frame (modo rápido), ex.: 0 0.3 1 0.7")
+    parser.add_argument("--escala-busca", type=float, default=0.5, help="Redução da imagem no modo rápido")
+    parser.add_argument("--gpu", action="store_true")
+    parser.add_argument("--quantizado", action="store_true", help="Usa o modelo de OCR quantizado (CPU)")
+    parser.add_argument("--backend", choices=["easyocr", "onnx", "tesseract"], default="easyocr",
+                        help="Motor de OCR (ver backends_ocr.py)")
+    parser.add_argument("--comparar-backends", nargs="+", choices=["easyocr", "onnx", "tesseract"],
+                        help="Roda a mesma fonte com cada motor e compara latência, memória e acerto")
+    parser.add_argument("--ocr-opcoes", type=json.loads,
+                        help='Opções de cada motor em JSON, ex.: \'{"onnx": {"modelo": "../modelos/reconhecedor.onnx", '
+                             '"caracteres": "../modelos/reconhecedor.txt", "threads": 2}}\'')
+    parser.add_argument("--processos", type=int, nargs="+", default=[0, 1, 2, 4],
+                        help="Com --comparar-processos: quantidades de processos de OCR a medir")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 4, 8],
+                        help="Com --comparar-lote: tamanhos de lote a medir")
+    args = parser.parse_args()
+
+    if args.comparar_deteccao:
+        resultado = {"data": time.strftime("%Y-%m-%d %H:%M:%S"), "roi": args.roi,
+                     "escala_busca": args.escala_busca,
+                     "comparacao_deteccao": comparar_deteccao(criar_detector(args, None),
+                                                              quantidade=args.comparar_deteccao)}
+    elif args.comparar_previa:
+        resultado = {"data": time.strftime("%Y-%m-%d %H:%M:%S"),
+                     "comparacao_previa": comparar_previa(quantidade=args.comparar_previa)}
+    elif args.comparar_processos:
+        resultado = {"data": time.strftime("%Y-%m-%d %H:%M:%S"), "backend": args.backend,
+                     "comparacao_processos": comparar_processos(args, args.processos)}
+    elif args.comparar_lote:
+        resultado = {"data": time.strftime("%Y-%m-%d %H:%M:%S"), "backend": args.backend,
+                     "comparacao_lote": comparar_lote(args, args.lotes)}
+    elif args.comparar_backends:
+        resultado = cabecalho(args)
+        resultado["comparacao_backends"] = comparar_backends(args)
+    else:
+        resultado = cabecalho(args)
+        resultado.update(executar_com_backend(args, args.backend))
+    gravar_resultado(resultado, args.saida)
+
+
+def cabecalho(args):
+    return {
+        "fonte": args.fonte or f"sintetico:{args.sintetico}x{args.frames_por_placa}",
+        "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(),
+                    "processador": platform.processor()},
+        "modo_deteccao": args.modo_deteccao,
+        "quantizado": args.quantizado,
+    }
+
+
+class LeitorNulo:
+    """Reader que não lê nada: para medir só a localização sem carregar (nem instalar) um motor de OCR"""
+
+    def readtext(self, imagem, **kwargs):
+        return []
+
+
+def criar_detector(args, backend):
+    """Detector com o motor 'backend'; com backend=None usa o LeitorNulo (nenhum modelo é carregado)"""
+    # Importado aqui para o --help responder sem carregar o modelo
+    from reconhecimento import DetectorPlaca
+
+    return DetectorPlaca(gpu=args.gpu, quantizado=args.quantizado, modo_deteccao=args.modo_deteccao, roi=args.roi,
+                         escala_busca=args.escala_busca, backend_ocr=backend,
+                         opcoes_ocr=(args.ocr_opcoes or {}).get(backend),
+                         reader=LeitorNulo() if backend is None else None)
+
+
+def executar_com_backend(args, backend):
+    """Carrega o motor de OCR, roda a fonte inteira e devolve os resultados (com o tempo de carga)"""
+    inicio = time.perf_counter()
+    detector = criar_detector(args, backend)
+    carga = time.perf_counter() - inicio
+
+    fonte = criar_fonte(args)
+    gabarito = carregar_gabarito(args.gabarito) if args.gabarito else None
+    independente = args.independente or isinstance(fonte, FontePastaImagens)
+    if independente:
+        # Cada foto é julgada sozinha: uma leitura basta para confirmar
+        detector.consenso_min_leituras = 1
+
+    resultado = {"backend": backend, "carga_modelo_s": round(carga, 2), "independente": independente}
+    resultado.update(executar_benchmark(detector, fonte, gabarito, independente, args.limite, args.aquecimento))
+    fonte.release()
+    return resultado
+
+
+def comparar_backends(args):
+    """
+    Roda a mesma fonte com cada motor de OCR, cada um num processo novo:
+    assim a memória de pico e o tempo de carga de um não contaminam o outro.
+    """
+    contexto = multiprocessing.get_context("spawn")
+    comparacao = {}
+    for backend in args.comparar_backends:
+        print(f"Medindo o motor '{backend}'...")
+        with contexto.Pool(1) as processo:
+            try:
+                resultado = processo.apply(executar_com_backend, (args, backend))
+            except Exception as e:
+                # Motor não instalado (ou modelo ausente): registra e segue com os outros
+                comparacao[backend] = {"erro": f"{type(e).__name__}: {e}"}
+                continue
+        comparacao[backend] = {
+            "carga_modelo_s": resultado["carga_modelo_s"],
+            "fps": resultado["fps"],
+            "latencia_ms": resultado["latencia_ms"],
+            "ocr_ms": resultado["etapas_ms"].get("ocr", {"n": 0}),
+            "memoria_pico_mb": resultado["memoria_pico_mb"],
+            "acuracia": {chave: valor for chave, valor in resultado.get("acuracia", {}).items()
+                         if chave != "exemplos_de_erro"} or None,
+        }
+    return comparacao
+
+
+def recortes_sinteticos(quantidade, semente=42):
+    """Recortes de placa já tratados como no DetectorPlaca (cinza, 3x maior, Otsu)"""
+    from gerador_placas import desenhar_frame, gerar_texto_placa
+
+    rng = random.Random(semente)
+    recortes = []
+    for _ in range(quantidade):
+        frame, (x, y, w, h) = desenhar_frame(gerar_texto_placa(rng), rng=rng)
+        cinza = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+        cinza = cv2.resize(cinza, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+        recortes.append(cv2.threshold(cinza, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1])
+    return recortes
+
+
+def comparar_processos(args, quantidades):
+    """
+    Placas lidas por segundo com o OCR num processo só (0) e com N processos
+    (PoolProcessosOCR), mandando todos os recortes de uma vez para ocupar os núcleos.
+    """
+    from backends_ocr import carregar_backend
+    from processos_ocr import PoolProcessosOCR
+
+    recortes = recortes_sinteticos(args.comparar_processos)
+    opcoes = (args.ocr_opcoes or {}).get(args.backend) or {}
+    comparacao = {"recortes": len(recortes), "nucleos": os.cpu_count()}
+    for quantidade in quantidades:
+        print(f"Medindo com {quantidade or 'nenhum'} processo(s) extra...")
+        if quantidade == 0:
+            reader = carregar_backend(args.backend, **opcoes)
+            reader.readtext(recortes[0])  # Aquecimento
+            inicio = time.perf_counter()
+            for recorte in recortes:
+                reader.readtext(recorte)
+            duracao = time.perf_counter() - inicio
+            comparacao["0"] = {"placas_por_segundo": round(len(recortes) / duracao, 2)}
+            continue
+
+        pool = PoolProcessosOCR(args.backend, opcoes, processos=quantidade)
+        try:
+            if not pool.aguardar_pronto(timeout=300):
+                comparacao[str(quantidade)] = {"erro": pool.erro_carga or "tempo esgotado carregando o modelo"}
+                continue
+            pool.readtext(recortes[0])
+            pool.pegar_resultados()
+            inicio = time.perf_counter()
+            futuros = [pool.enviar(recorte, frame_id=i) for i, recorte in enumerate(recortes)]
+            for futuro in futuros:
+                futuro.result()
+            duracao = time.perf_counter() - inicio
+            ordem = [leitura.frame_id for leitura in pool.pegar_resultados()]
+            comparacao[str(quantidade)] = {
+                "placas_por_segundo": round(len(recortes) / duracao, 2),
+                "threads_por_processo": pool.threads_por_processo,
+                "entregues_em_ordem": ordem == list(range(len(recortes))),
+            }
+        finally:
+            pool.encerrar()
+    return comparacao
+
+
+def comparar_lote(args, tamanhos):
+    """
+    Placas lidas por segundo com um recorte por chamada (readtext, como sem o PoolOCR) e em lotes
+    (reconhecer_lote, como o PoolOCR com max_lote > 1), no mesmo motor e com os mesmos recortes.
+    """
+    from backends_ocr import carregar_backend
+
+    recortes = recortes_sinteticos(args.comparar_lote)
+    reader = carregar_backend(args.backend, **((args.ocr_opcoes or {}).get(args.backend) or {}))
+    reader.readtext(recortes[0])  # Aquecimento
+    inicio = time.perf_counter()
+    individuais = ["".join(texto for _, texto, _ in reader.readtext(recorte)) for recorte in recortes]
+    individual = len(recortes) / (time.perf_counter() - inicio)
+    comparacao = {"recortes": len(recortes), "individual": {"placas_por_segundo": round(individual, 2)}}
+    if not hasattr(reader, "reconhecer_lote"):
+        comparacao["erro"] = f"o motor '{args.backend}' não tem leitura em lote"
+        return comparacao
+
+    reader.reconhecer_lote(recortes[:2])
+    for tamanho in tamanhos:
+        inicio = time.perf_counter()
+        textos = []
+        for i in range(0, len(recortes), tamanho):
+            textos.extend("".join(texto for _, texto, _ in leitura)
+                          for leitura in reader.reconhecer_lote(recortes[i:i + tamanho]))
+        por_segundo = len(recortes) / (time.perf_counter() - inicio)
+        comparacao[f"lote_{tamanho}"] = {
+            "placas_por_segundo": round(por_segundo, 2),
+            "ganho": round(por_segundo / individual, 2),
+            # Mesmo texto da leitura individual (o lote não passa pelo detector de texto)
+            "concordancia": round(sum(a == b for a, b in zip(textos, individuais)) / len(recortes), 4),
+        }
+    return comparacao
+
+
+def gravar_resultado(resultado, saida=None):
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+        print(f"Resultado salvo em {saida}")
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
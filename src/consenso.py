@@ -0,0 +1,75 @@
+import time
+from collections import defaultdict, deque
+
+
+class VotacaoPlaca:
+    """
+    Junta as leituras de OCR de uma mesma placa e decide por votação.
+
+    Cada caractere é votado por posição, com peso igual à confiança da leitura
+    (o EasyOCR só devolve a confiança da palavra inteira, então ela vale para
+    todos os caracteres daquela leitura). Assim um 'O' lido uma vez perde para
+    o '0' lido três vezes, em vez de ir direto para o banco.
+    """
+
+    def __init__(self, min_leituras=3, janela_ms=1500, limiar=0.6, max_leituras=10):
+        self.min_leituras = min_leituras  # Leituras necessárias para confirmar
+        self.janela_ms = janela_ms  # Depois desse tempo, confirma com menos leituras
+        self.limiar = limiar  # Concordância mínima (0 a 1) em cada posição
+        self.leituras = deque(maxlen=max_leituras)
+        self.inicio = None
+
+    def adicionar(self, texto, confianca, agora=None):
+        agora = time.time() if agora is None else agora
+        if self.inicio is None:
+            self.inicio = agora
+        self.leituras.append((texto, confianca))
+
+    def cheia(self):
+        """Já juntou o máximo de leituras sem chegar a um consenso"""
+        return len(self.leituras) == self.leituras.maxlen
+
+    def resultado(self):
+        """Retorna (texto, concordancia) da votação atual ou (None, 0.0)"""
+        if not self.leituras:
+            return None, 0.0
+
+        # 1) Vota o tamanho da placa, para não misturar leituras com caracteres a mais
+        peso_tamanho = defaultdict(float)
+        for texto, confianca in self.leituras:
+            peso_tamanho[len(texto)] += confianca
+        tamanho = max(peso_tamanho, key=peso_tamanho.get)
+        validas = [(t, c) for t, c in self.leituras if len(t) == tamanho]
+
+        # 2) Vota cada posição separadamente, ponderando pela confiança
+        texto = []
+        concordancia = 1.0
+        for pos in range(tamanho):
+            votos = defaultdict(float)
+            for t, c in validas:
+                votos[t[pos]] += c
+            total = sum(votos.values())
+            vencedor = max(votos, key=votos.get)
+            texto.append(vencedor)
+            # A placa inteira só é tão confiável quanto a posição mais disputada
+            if total > 0:
+                concordancia = min(concordancia, votos[vencedor] / total)
+
+        return "".join(texto), concordancia
+
+    def decidir(self, agora=None):
+        """Retorna o texto confirmado ou None se ainda não há consenso"""
+        agora = time.time() if agora is None else agora
+        n = len(self.leituras)
+        if n == 0:
+            return None
+
+        # Espera 'min_leituras' leituras; passada a janela, aceita com pelo menos duas
+        janela_vencida = (agora - self.inicio) * 1000 >= self.janela_ms
+        if n < self.min_leituras and not (janela_vencida and n >= 2):
+            return None
+
+        texto, concordancia = self.resultado()
+        if concordancia >= self.limiar:
+            return texto
+        return None
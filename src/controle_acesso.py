@@ -0,0 +1,76 @@
+import time
+
+import database_manager
+from metricas import metricas
+
+# Sentido da faixa: "entrada" e "saida" só registram aquele movimento;
+# "auto" é o comportamento da guarita única (tenta entrada e, se já estiver dentro, saída)
+SENTIDOS = ("auto", "entrada", "saida")
+
+# Status do cadastro que geram alerta para o vigia (o SUSPEITO passa, mas avisa)
+STATUS_ALERTA = {"BLOQUEADO": "bloqueado", "SUSPEITO": "suspeito"}
+
+
+class ControleAcesso:
+    """Regra de negócio do portão: decide o que fazer com uma placa lida"""
+
+    def __init__(self, sentido="auto", intervalo_repeticao=5):
+        if sentido not in SENTIDOS:
+            raise ValueError(f"Sentido inválido: {sentido} (use {', '.join(SENTIDOS)})")
+        self.sentido = sentido
+        self.intervalo_repeticao = intervalo_repeticao
+        self.placa_atual = None
+        self.ultimo_registro_tempo = 0
+
+    def processar(self, placa):
+        """
+        Retorna um dicionário com a decisão:
+        - acao: "entrada", "saida", "bloqueado", "desconhecido", "recusado" ou None (leitura repetida)
+        - mensagem: texto para o log
+        - veiculo: tupla do cadastro (ou None)
+        - alerta: "bloqueado", "suspeito" ou None
+        """
+        decisao = self._decidir(placa)
+        veiculo = decisao["veiculo"]
+        decisao["alerta"] = STATUS_ALERTA.get(veiculo[4]) if decisao["acao"] and veiculo else None
+        if decisao["acao"] is not None:
+            metricas.incrementar("guarita_decisoes_total", acao=decisao["acao"])
+        return decisao
+
+    def _decidir(self, placa):
+        # Filtro de tempo: Se for a mesma placa que lemos há pouco, ignora
+        if placa == self.placa_atual and (time.time() - self.ultimo_registro_tempo < self.intervalo_repeticao):
+            return {"placa": placa, "acao": None, "mensagem": "", "veiculo": None}
+
+        self.placa_atual = placa
+        self.ultimo_registro_tempo = time.time()
+
+        # Busca no cadastro (cache em memória)
+        veiculo = database_manager.buscar_veiculo(placa)
+        if not veiculo:
+            return {"placa": placa, "acao": "desconhecido", "mensagem": "Não Cadastrado", "veiculo": None}
+
+        status = veiculo[4]  # Coluna 4 é o status
+        if status == "BLOQUEADO":
+            return {"placa": placa, "acao": "bloqueado", "mensagem": "Veículo BLOQUEADO", "veiculo": veiculo}
+
+        # O acesso é gravado com a placa como está no cadastro (ex.: 'ABC-1234'), não como o OCR leu:
+        # é por ela que o histórico se liga ao veículo (categoria, relatório, exclusão)
+        placa_cadastro = veiculo[0]
+        if self.sentido == "saida":
+            sucesso, msg = database_manager.registrar_saida(placa_cadastro)
+            acao = "saida"
+        elif self.sentido == "entrada":
+            sucesso, msg = database_manager.registrar_entrada(placa_cadastro)
+            acao = "entrada"
+        else:
+            # Tenta registrar entrada. Se já estiver dentro, registra saída.
+            sucesso, msg = database_manager.registrar_entrada(placa_cadastro)
+            acao = "entrada"
+            if not sucesso:
+                sucesso, msg = database_manager.registrar_saida(placa_cadastro)
+                acao = "saida"
+
+        if not sucesso:
+            acao = "recusado"
+        return {"placa": placa, "acao": acao, "mensagem": msg, "veiculo": veiculo}
@@ -1,28 +1,102 @@
 import sqlite3
+import threading
+import time
+import atexit
+import queue
+import csv
+import gzip
+import logging
 from datetime import datetime
-import pandas as pd
 import os
 
+import estatisticas
+from metricas import metricas
+
 # --- Configuração de Caminhos ---
 # Pega o caminho absoluto da pasta onde este arquivo .py está
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Define que o banco ficará na pasta 'data', um nível acima (../)
 DB_NAME = os.path.join(BASE_DIR, "../data/estacionamento.db")
 
+log = logging.getLogger("guarita.banco")
+
+
+# --- Conexões Persistentes ---
+# Abrir o arquivo a cada consulta custa caro. Cada thread (interface, reconhecimento...)
+# guarda a sua própria conexão e reaproveita em todas as chamadas.
+_local = threading.local()
+_conexoes = {}  # conexão -> thread dona
+_lock_conexoes = threading.Lock()
+
 
 def conectar():
     """Cria a conexão com o arquivo do banco SQLite"""
-    return sqlite3.connect(DB_NAME)
+    # timeout: espera o outro escritor terminar em vez de falhar com "database is locked"
+    # cached_statements: guarda os comandos SQL já compilados para reaproveitar nas próximas chamadas
+    # check_same_thread=False: só para o fechar_conexoes() poder fechar no final;
+    # durante o uso cada conexão fica presa à thread que a abriu
+    conn = sqlite3.connect(DB_NAME, timeout=10, cached_statements=256, check_same_thread=False)
+    # WAL: leitores não bloqueiam o escritor (monitor gravando enquanto a interface lê)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL é seguro com WAL e evita um fsync a cada commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Cache de ~8 MB por conexão (valor negativo = KiB)
+    conn.execute("PRAGMA cache_size=-8000")
+    return conn
+
+
+def obter_conexao():
+    """Retorna a conexão persistente da thread atual (abre na primeira vez)"""
+    conn = getattr(_local, "conn", None)
+    # Reabre se a conexão foi fechada pelo fechar_conexoes() ou se o DB_NAME mudou
+    # (ex.: banco de testes), para não continuar gravando no arquivo antigo
+    if conn is None or conn not in _conexoes or _local.caminho != DB_NAME:
+        if conn is not None:
+            _descartar(conn)
+        _fechar_de_threads_encerradas()
+        conn = conectar()
+        _local.conn = conn
+        _local.caminho = DB_NAME
+        with _lock_conexoes:
+            _conexoes[conn] = threading.current_thread()
+    return conn
+
+
+def _descartar(conn):
+    with _lock_conexoes:
+        _conexoes.pop(conn, None)
+    conn.close()
 
 
-def inicializar_banco():
-    """Cria a pasta e as tabelas necessárias se elas não existirem"""
-    # Cria a pasta '../data' se ela não existir
-    os.makedirs(os.path.dirname(DB_NAME), exist_ok=True)
+def _fechar_de_threads_encerradas():
+    # Threads do pipeline são recriadas ao trocar de aba; fecha o que elas deixaram para trás
+    with _lock_conexoes:
+        orfas = [c for c, t in _conexoes.items() if not t.is_alive()]
+        for conn in orfas:
+            del _conexoes[conn]
+    for conn in orfas:
+        conn.close()
 
-    conn = conectar()
-    cursor = conn.cursor()
 
+def fechar_conexoes():
+    """Fecha as conexões de todas as threads (chamar ao encerrar o programa)"""
+    with _lock_conexoes:
+        conexoes = list(_conexoes)
+        _conexoes.clear()
+    for conn in conexoes:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+# ================= MIGRAÇÕES =================
+# Cada função leva o banco da versão N-1 para a versão N (guardada em PRAGMA user_version).
+# Bancos antigos são atualizados no próprio arquivo ao abrir o programa.
+# Para mudar o esquema: crie uma nova função no fim da lista, nunca altere as antigas.
+
+def _migracao_1(cursor):
+    """Esquema original: tabelas de veículos e de acessos"""
     # Tabela de Veículos (Cadastro)
     # A Placa é a chave primária (não pode repetir)
     cursor.execute('''
@@ -73,12 +147,245 @@ def inicializar_banco():
                    )
                        )
                    ''')
-    conn.commit()
-    conn.close()
+
+
+def _migracao_2(cursor):
+    """Data/hora completas nos acessos e índices das consultas de entrada e saída"""
+    # entrada_em/saida_em guardam 'AAAA-MM-DD HH:MM:SS': ordenam certo como texto
+    # e permitem visitas que passam da meia-noite
+    cursor.execute("ALTER TABLE acessos ADD COLUMN entrada_em TEXT")
+    cursor.execute("ALTER TABLE acessos ADD COLUMN saida_em TEXT")
+
+    # Preenche os registros antigos (até aqui a saída era sempre no mesmo dia da entrada)
+    cursor.execute('''
+                   UPDATE acessos
+                   SET entrada_em = data_entrada || ' ' || hora_entrada,
+                       saida_em   = CASE
+                                        WHEN hora_saida IS NOT NULL
+                                            THEN data_entrada || ' ' || hora_saida
+                                        END
+                   ''')
+
+    # Índice parcial: só as visitas abertas (poucas linhas, mesmo com anos de histórico).
+    # Inclui entrada_em para o registrar_saida nem precisar ler a tabela
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_abertos ON acessos (placa, entrada_em) WHERE saida_em IS NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_placa_data ON acessos (placa, data_entrada)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_entrada_em ON acessos (entrada_em)")
+
+
+def _migracao_3(cursor):
+    """Índice para a busca por começo do nome do proprietário (a placa já tem o da chave primária)"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_proprietario ON veiculos (proprietario COLLATE NOCASE)")
+
+
+def _migracao_4(cursor):
+    """Categoria gravada no acesso e tabelas de resumo das estatísticas (preenchidas com o histórico)"""
+    # A categoria do momento da entrada: recategorizar o veículo depois não muda as visitas antigas
+    cursor.execute("ALTER TABLE acessos ADD COLUMN categoria TEXT")
+    cursor.execute("UPDATE acessos SET categoria = (SELECT v.categoria FROM veiculos v WHERE v.placa = acessos.placa)")
+
+    # hora = 'AAAA-MM-DD HH'; dia = 'AAAA-MM-DD' (da saída, quando a permanência fica conhecida)
+    cursor.execute('''
+                   CREATE TABLE estat_hora
+                   (
+                       hora      TEXT,
+                       categoria TEXT,
+                       entradas  INTEGER NOT NULL DEFAULT 0,
+                       saidas    INTEGER NOT NULL DEFAULT 0,
+                       PRIMARY KEY (hora, categoria)
+                   ) WITHOUT ROWID
+                   ''')
+    cursor.execute('''
+                   CREATE TABLE estat_permanencia
+                   (
+                       dia       TEXT,
+                       categoria TEXT,
+                       visitas   INTEGER NOT NULL DEFAULT 0,
+                       soma_s    INTEGER NOT NULL DEFAULT 0,
+                       maximo_s  INTEGER NOT NULL DEFAULT 0,
+                       PRIMARY KEY (dia, categoria)
+                   ) WITHOUT ROWID
+                   ''')
+    cursor.execute('''
+                   CREATE TABLE estat_permanencia_faixa
+                   (
+                       dia       TEXT,
+                       categoria TEXT,
+                       faixa     INTEGER,
+                       visitas   INTEGER NOT NULL DEFAULT 0,
+                       PRIMARY KEY (dia, categoria, faixa)
+                   ) WITHOUT ROWID
+                   ''')
+    cursor.execute('''
+                   CREATE TABLE estat_ocupacao
+                   (
+                       categoria TEXT PRIMARY KEY,
+                       dentro    INTEGER NOT NULL DEFAULT 0
+                   ) WITHOUT ROWID
+                   ''')
+    # Backfill: uma vez só, na mesma transação da migração; daqui em diante o GravadorAcessos mantém em dia
+    estatisticas.recalcular(cursor)
+
+
+def _migracao_5(cursor):
+    """Contador de alterações do cadastro, mantido por gatilhos (o cache de veículos confere só ele)"""
+    cursor.execute('''
+                   CREATE TABLE versao_veiculos
+                   (
+                       id     INTEGER PRIMARY KEY CHECK (id = 1),
+                       versao INTEGER NOT NULL
+                   )
+                   ''')
+    cursor.execute("INSERT INTO versao_veiculos (id, versao) VALUES (1, 0)")
+    # Qualquer conexão (inclusive de outro processo) que mexer em 'veiculos' soma 1
+    for operacao in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''
+                       CREATE TRIGGER versao_veiculos_{operacao.lower()}
+                           AFTER {operacao}
+                           ON veiculos
+                       BEGIN
+                           UPDATE versao_veiculos SET versao = versao + 1 WHERE id = 1;
+                       END
+                       ''')
+
+
+MIGRACOES = [_migracao_1, _migracao_2, _migracao_3, _migracao_4, _migracao_5]
+
+
+def versao_banco():
+    """Retorna a versão do esquema gravada no arquivo do banco"""
+    return obter_conexao().execute("PRAGMA user_version").fetchone()[0]
+
+
+def inicializar_banco():
+    """Cria a pasta e aplica as migrações que faltam no banco"""
+    # Cria a pasta '../data' se ela não existir
+    os.makedirs(os.path.dirname(DB_NAME), exist_ok=True)
+
+    conn = obter_conexao()
+    cursor = conn.cursor()
+
+    while True:
+        # Uma transação por migração: se falhar no meio, o banco fica na versão anterior.
+        # A versão é relida dentro da transação para dois processos não migrarem juntos.
+        with conn:
+            cursor.execute("BEGIN IMMEDIATE")
+            versao = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if versao >= len(MIGRACOES):
+                break
+            MIGRACOES[versao](cursor)
+            cursor.execute(f"PRAGMA user_version = {versao + 1}")
+            print(f"Banco de dados migrado para a versão {versao + 1}")
+
+
+# ================= CACHE DE VEÍCULOS =================
+def normalizar_placa(placa):
+    """Deixa a placa só com letras e números maiúsculos ('abc-1234' -> 'ABC1234')"""
+    return "".join(c for c in placa.upper() if c.isalnum())
+
+
+class CacheVeiculos:
+    """
+    Cópia em memória da tabela 'veiculos' para o reconhecimento não ir ao banco a cada placa.
+
+    O cadastro muda pouco e só pelas funções deste módulo, que mantêm o cache em dia.
+    Para edições feitas por outro processo, a cada 'ttl' segundos o contador da tabela
+    'versao_veiculos' (somado por gatilhos a cada alteração do cadastro) é conferido e,
+    se mudou, a tabela é recarregada. Gravar acessos não mexe no contador.
+    """
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self.recargas = 0
+        self._dados = None  # placa normalizada -> tupla completa do veículo
+        self._lock = threading.Lock()
+        self._caminho = None
+        self._versao = None
+        self._proxima_verificacao = 0
+        self.geracao = 0  # Muda a cada alteração do conteúdo (quem indexa as placas sabe quando refazer)
+
+    def carregar(self):
+        """Lê a tabela inteira de uma vez (chamar ao iniciar o programa); retorna o dicionário carregado"""
+        with self._lock:
+            cursor = obter_conexao().cursor()
+            # Contador lido antes da tabela: uma alteração entre as duas leituras só causa uma recarga a mais
+            versao = cursor.execute("SELECT versao FROM versao_veiculos").fetchone()[0]
+            cursor.execute("SELECT placa, proprietario, tipo, categoria, status, observacao FROM veiculos")
+            dados = {normalizar_placa(row[0]): row for row in cursor.fetchall()}
+            self._dados = dados
+            self._versao = versao
+            self._caminho = DB_NAME
+            self._proxima_verificacao = time.monotonic() + self.ttl
+            self.recargas += 1
+            self.geracao += 1
+            return dados
+
+    def garantir_atualizado(self):
+        """
+        Carrega na primeira vez e, a cada 'ttl' segundos, confere se outro processo mudou o cadastro.
+        Retorna o dicionário em uso: quem lê usa esta referência (um invalidar() no meio não a apaga).
+        """
+        dados = self._dados
+        if dados is None or self._caminho != DB_NAME:
+            return self.carregar()
+        if self.ttl is not None and time.monotonic() >= self._proxima_verificacao:
+            if self._verificar_alteracoes_externas():
+                return self.carregar()
+        return dados
+
+    def buscar(self, placa):
+        veiculo = self.garantir_atualizado().get(normalizar_placa(placa))
+        if veiculo is None:
+            self.falhas += 1
+        else:
+            self.acertos += 1
+        return veiculo
+
+    def placas(self):
+        """Placas cadastradas (normalizadas)"""
+        return list(self.garantir_atualizado())
+
+    def atualizar(self, veiculo):
+        with self._lock:
+            if self._dados is not None:
+                self._dados[normalizar_placa(veiculo[0])] = veiculo
+                self.geracao += 1
+
+    def remover(self, placa):
+        with self._lock:
+            if self._dados is not None:
+                self._dados.pop(normalizar_placa(placa), None)
+                self.geracao += 1
+
+    def invalidar(self):
+        """Força a recarga completa na próxima busca"""
+        with self._lock:
+            self._dados = None
+
+    def estatisticas(self):
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "recargas": self.recargas,
+            "veiculos": len(self._dados or {}),
+        }
+
+    def _verificar_alteracoes_externas(self):
+        with self._lock:
+            self._proxima_verificacao = time.monotonic() + self.ttl
+            versao = obter_conexao().execute("SELECT versao FROM versao_veiculos").fetchone()[0]
+            # As alterações feitas por este processo também somam no contador: depois de um
+            # cadastro a próxima conferência recarrega uma vez (o cadastro muda pouco)
+            return versao != self._versao
+
+
+cache_veiculos = CacheVeiculos()
 
 
 def cadastrar_veiculo(placa, proprietario, tipo, categoria, status="AUTORIZADO", obs=""):
-    conn = conectar()
+    conn = obter_conexao()
     cursor = conn.cursor()
     try:
         # INSERT OR REPLACE: Um truque ótimo do SQLite.
@@ -89,159 +396,530 @@ def cadastrar_veiculo(placa, proprietario, tipo, categoria, status="AUTORIZADO",
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (placa.upper(), proprietario, tipo, categoria, status, obs))
         conn.commit()
+        cache_veiculos.atualizar((placa.upper(), proprietario, tipo, categoria, status, obs))
         return True
     except Exception as e:
+        conn.rollback()
         print(f"Erro: {e}")
         return False
-    finally:
-        conn.close()
+
+
+def aplicar_frota(gravar, remover=()):
+    """
+    Importação em lote: grava (insere ou atualiza) as tuplas completas de 'gravar' e remove as placas
+    de 'remover', tudo numa transação só. O histórico de acessos das placas removidas é mantido.
+    """
+    conn = obter_conexao()
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Upsert em vez de INSERT OR REPLACE: o REPLACE apaga e recria a linha a cada placa
+            conn.executemany('''
+                             INSERT INTO veiculos (placa, proprietario, tipo, categoria, status, observacao)
+                             VALUES (?, ?, ?, ?, ?, ?)
+                             ON CONFLICT (placa) DO UPDATE
+                                 SET proprietario = excluded.proprietario,
+                                     tipo         = excluded.tipo,
+                                     categoria    = excluded.categoria,
+                                     status       = excluded.status,
+                                     observacao   = excluded.observacao
+                             ''', gravar)
+            conn.executemany("DELETE FROM veiculos WHERE placa = ?", [(placa,) for placa in remover])
+    except sqlite3.Error as e:
+        print(f"Erro na importação da frota: {e}")
+        return False, f"Nada foi gravado: {e}"
+    # Milhares de placas mudaram: recarregar o cache inteiro é mais simples que atualizar uma a uma
+    cache_veiculos.carregar()
+    return True, f"{len(gravar)} veículos gravados e {len(remover)} removidos"
 
 
 def buscar_veiculo(placa):
-    conn = conectar()
-    cursor = conn.cursor()
-    # Busca simples pela placa
-    cursor.execute("SELECT * FROM veiculos WHERE placa = ?", (placa.upper(),))
-    veiculo = cursor.fetchone()
-    conn.close()
+    # Consulta o cache em memória (não vai ao banco no caminho do portão)
+    with metricas.cronometro("guarita_etapa_segundos", etapa="db_consulta"):
+        veiculo = cache_veiculos.buscar(placa)
     return veiculo  # Retorna uma Tupla (placa, dono, tipo...) ou None
 
 
+def listar_veiculos_completos():
+    """Todas as colunas de todos os veículos (comparação da importação da frota)"""
+    return obter_conexao().execute(
+        "SELECT placa, proprietario, tipo, categoria, status, observacao FROM veiculos").fetchall()
+
+
 def listar_todos_veiculos():
     """Retorna uma lista com todos os veículos para a aba manual"""
-    conn = conectar()
-    cursor = conn.cursor()
+    cursor = obter_conexao().cursor()
     cursor.execute("SELECT placa, proprietario, categoria, status FROM veiculos ORDER BY placa")
     veiculos = cursor.fetchall()
-    conn.close()
     return veiculos
 
 
+def _fim_do_prefixo(prefixo):
+    """Menor texto maior que todos os que começam com 'prefixo' ('ABC' -> 'ABD')"""
+    return prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+
+def _filtro_busca_veiculos(busca):
+    """
+    Busca pelo começo da placa ou do nome do proprietário.
+    Comparar com um intervalo (>= prefixo e < fim do prefixo) em vez de LIKE deixa o
+    SQLite usar o índice da chave primária (placa) e o idx_veiculos_proprietario.
+    """
+    busca = (busca or "").strip()
+    if not busca:
+        return "", []
+    prefixo_placa = normalizar_placa(busca) or busca.upper()
+    return ("(placa >= ? AND placa < ? OR "
+            "proprietario COLLATE NOCASE >= ? AND proprietario COLLATE NOCASE < ?)",
+            [prefixo_placa, _fim_do_prefixo(prefixo_placa), busca, _fim_do_prefixo(busca)])
+
+
+def listar_veiculos(depois_de=None, limite=200, busca=None):
+    """
+    Uma página de veículos em ordem de placa (paginação por chave: a próxima página
+    começa depois da última placa recebida, sem OFFSET percorrendo as anteriores).
+    """
+    filtro, params = _filtro_busca_veiculos(busca)
+    condicoes = [filtro] if filtro else []
+    if depois_de is not None:
+        condicoes.append("placa > ?")
+        params.append(depois_de)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    cursor = obter_conexao().cursor()
+    cursor.execute(f"SELECT placa, proprietario, categoria, status FROM veiculos {where} ORDER BY placa LIMIT ?",
+                   params + [limite])
+    return cursor.fetchall()
+
+
+def contar_veiculos(busca=None):
+    filtro, params = _filtro_busca_veiculos(busca)
+    cursor = obter_conexao().cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM veiculos {'WHERE ' + filtro if filtro else ''}", params)
+    return cursor.fetchone()[0]
+
+
+def obter_veiculo(placa, busca=None):
+    """
+    Linha da aba manual (placa, proprietario, categoria, status) de um veículo, direto do banco.
+    Com 'busca', retorna None se o veículo não aparece nessa busca.
+    """
+    filtro, params = _filtro_busca_veiculos(busca)
+    cursor = obter_conexao().cursor()
+    cursor.execute(f"SELECT placa, proprietario, categoria, status FROM veiculos "
+                   f"WHERE placa = ? {'AND ' + filtro if filtro else ''}", [placa.upper()] + params)
+    return cursor.fetchone()
+
+
 def excluir_veiculo(placa):
     """Remove um veículo e seus históricos do banco de dados"""
-    conn = conectar()
+    # Os acessos da placa ainda na fila precisam estar no banco para serem apagados junto,
+    # e a visita aberta sai da memória (senão a próxima saída gravaria um acesso órfão)
+    gravador_acessos.esquecer(placa)
+    conn = obter_conexao()
     cursor = conn.cursor()
     try:
-        # Primeiro removemos o histórico de acessos para manter a consistência
-        cursor.execute("DELETE FROM acessos WHERE placa = ?", (placa.upper(),))
-        # Depois removemos o cadastro do carro
-        cursor.execute("DELETE FROM veiculos WHERE placa = ?", (placa.upper(),))
-        conn.commit()
+        with conn:
+            cursor.execute("BEGIN IMMEDIATE")
+            # As visitas apagadas saem também das tabelas de resumo, na mesma transação
+            estatisticas.descontar(cursor, placa.upper())
+            # Primeiro removemos o histórico de acessos para manter a consistência
+            cursor.execute("DELETE FROM acessos WHERE placa = ?", (placa.upper(),))
+            # Depois removemos o cadastro do carro
+            cursor.execute("DELETE FROM veiculos WHERE placa = ?", (placa.upper(),))
+        cache_veiculos.remover(placa)
         return True
-    except Exception as e:
-        print(f"Erro ao excluir: {e}")
+    except Exception:
+        log.exception("Erro ao excluir o veículo %s", placa)
         return False
-    finally:
-        conn.close()
 
 
-def registrar_entrada(placa):
-    conn = conectar()
-    cursor = conn.cursor()
+class GravadorAcessos:
+    """
+    Entradas e saídas com gravação em segundo plano (write-behind).
+
+    A decisão (está dentro ou não?) é tomada num dicionário em memória com as
+    visitas abertas, então a thread da câmera/interface não espera o disco.
+    Os eventos vão para uma fila e uma thread própria grava vários de uma vez,
+    numa única transação (um fsync por lote em vez de um por carro).
+
+    Só este processo deve registrar acessos no banco: o dicionário é lido do
+    banco uma vez e depois mantido pelos próprios eventos.
+    Use gravar_pendentes() para esperar a gravação e encerrar() ao fechar o programa.
+    """
+
+    def __init__(self, max_lote=200, espera_lote=0.05, max_tentativas_encerrando=3):
+        self.max_lote = max_lote  # Eventos no máximo por transação
+        self.espera_lote = espera_lote  # Quanto esperar mais eventos chegarem antes de gravar
+        self.max_tentativas_encerrando = max_tentativas_encerrando
+
+        self.gravados = 0
+        self.lotes = 0
+        self.erros = 0
+
+        self._dentro = None  # placa -> entrada_em das visitas abertas
+        self._caminho = None
+        self._lock = threading.Lock()
+        self._fila = queue.Queue()
+        self._thread = None
+        self._encerrando = False
+
+    # ================= DECISÃO (MEMÓRIA) =================
+    def entrada(self, placa):
+        placa = placa.upper()
+        agora = datetime.now()
+        hora_atual = agora.strftime("%H:%M:%S")
+        momento = agora.strftime("%Y-%m-%d %H:%M:%S")
+
+        # O mesmo lock decide e põe na fila: a ordem da fila é a ordem das decisões
+        with self._lock:
+            self._carregar_se_preciso()
+            # REGRA DE NEGÓCIO: não registra duas entradas sem uma saída no meio
+            if placa in self._dentro:
+                return False, "Veículo já está no campus"
+            self._dentro[placa] = momento
+            # (data_entrada/hora_entrada continuam sendo gravadas para o relatório)
+            self._enfileirar(("entrada", placa, agora.strftime("%Y-%m-%d"), hora_atual, momento))
+
+        return True, f"Entrada: {hora_atual}"
+
+    def saida(self, placa):
+        placa = placa.upper()
+        agora = datetime.now()
+        hora_atual = agora.strftime("%H:%M:%S")
+        momento = agora.strftime("%Y-%m-%d %H:%M:%S")
+
+        with self._lock:
+            self._carregar_se_preciso()
+            entrada_em = self._dentro.pop(placa, None)
+            if entrada_em is None:
+                return False, "Nenhuma entrada aberta"
+            self._enfileirar(("saida", placa, hora_atual, momento))
+
+        # Calcula quanto tempo o carro ficou (com a data junto, passar da meia-noite não dá negativo)
+        permanencia = agora.replace(microsecond=0) - datetime.strptime(entrada_em, "%Y-%m-%d %H:%M:%S")
+        return True, f"Permanência: {permanencia}"
 
-    # Captura data e hora atuais do sistema
-    agora = datetime.now()
-    data_atual = agora.strftime("%Y-%m-%d")
-    hora_atual = agora.strftime("%H:%M:%S")
+    def dentro(self):
+        """Placas com visita aberta (carros no campus agora)"""
+        with self._lock:
+            self._carregar_se_preciso()
+            return dict(self._dentro)
+
+    def recarregar(self):
+        """Relê as visitas abertas do banco (depois de gravar o que está pendente)"""
+        self.gravar_pendentes()
+        with self._lock:
+            self._dentro = None
+            self._carregar_se_preciso()
+
+    def esquecer(self, placa):
+        """Grava o que está na fila e tira a placa das visitas abertas (antes de excluir o veículo)"""
+        self.gravar_pendentes()
+        with self._lock:
+            if self._dentro is not None:
+                self._dentro.pop(placa.upper(), None)
+
+    def _carregar_se_preciso(self):
+        if self._dentro is not None and self._caminho == DB_NAME:
+            return
+        cursor = obter_conexao().cursor()
+        cursor.execute("SELECT placa, entrada_em FROM acessos INDEXED BY idx_acessos_abertos "
+                       "WHERE saida_em IS NULL")
+        self._dentro = dict(cursor.fetchall())
+        self._caminho = DB_NAME
+
+    # ================= GRAVAÇÃO (THREAD) =================
+    def gravar_pendentes(self, timeout=None):
+        """Espera tudo o que já foi decidido estar gravado no banco; retorna False se o tempo acabar"""
+        if self._thread is None or not self._thread.is_alive():
+            return self._fila.empty()
+        pronto = threading.Event()
+        self._fila.put(("marca", pronto))
+        return pronto.wait(timeout)
+
+    def encerrar(self, timeout=10):
+        """Grava o que falta e para a thread (chamar ao fechar o programa)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                return True
+            self._encerrando = True
+            self._fila.put(("parar",))
+            thread = self._thread
+        thread.join(timeout)
+        self._thread = None
+        self._encerrando = False
+        if self._fila.qsize():
+            print(f"AVISO: {self._fila.qsize()} eventos de acesso não foram gravados")
+            return False
+        return True
 
-    # REGRA DE NEGÓCIO:
-    # Verifica se já existe uma entrada hoje que ainda não tem saída (hora_saida IS NULL)
-    cursor.execute('''
-                   SELECT id
-                   FROM acessos
-                   WHERE placa = ?
-                     AND data_entrada = ?
-                     AND hora_saida IS NULL
-                   ''', (placa.upper(), data_atual))
-
-    if cursor.fetchone():
-        conn.close()
-        return False, "Veículo já está no campus"
+    def estatisticas(self):
+        return {
+            "pendentes": self._fila.qsize(),
+            "gravados": self.gravados,
+            "lotes": self.lotes,
+            "tamanho_medio_lote": self.gravados / self.lotes if self.lotes else 0.0,
+            "erros": self.erros,
+            "dentro": len(self._dentro or {}),
+        }
+
+    def _enfileirar(self, evento):
+        self._fila.put(evento)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="gravador-acessos", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            lote = [self._fila.get()]
+            # Junta o que chegar em seguida (rajada de carros na troca de turno) na mesma transação
+            prazo = time.monotonic() + self.espera_lote
+            while len(lote) < self.max_lote:
+                try:
+                    lote.append(self._fila.get(timeout=max(0.0, prazo - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            self._gravar([e for e in lote if e[0] in ("entrada", "saida")])
+            # Marcas do gravar_pendentes: tudo o que veio antes delas já está no banco
+            for evento in lote:
+                if evento[0] == "marca":
+                    evento[1].set()
+            if any(evento[0] == "parar" for evento in lote):
+                # Pode ter sobrado algo na fila depois do pedido de parada
+                restantes = []
+                while not self._fila.empty():
+                    restantes.append(self._fila.get_nowait())
+                self._gravar([e for e in restantes if e[0] in ("entrada", "saida")])
+                for evento in restantes:
+                    if evento[0] == "marca":
+                        evento[1].set()
+                return
+
+    def _gravar(self, eventos):
+        tentativas = 0
+        while eventos:
+            inicio = time.perf_counter()
+            try:
+                conn = obter_conexao()
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    entradas, saidas = [], []  # Para as tabelas de resumo (estatisticas.py)
+                    for evento in eventos:
+                        if evento[0] == "entrada":
+                            _, placa, data_atual, hora_atual, momento = evento
+                            veiculo = conn.execute("SELECT categoria FROM veiculos WHERE placa = ?",
+                                                   (placa,)).fetchone()
+                            categoria = veiculo[0] if veiculo else None
+                            conn.execute('''
+                                         INSERT INTO acessos (placa, data_entrada, hora_entrada, entrada_em, categoria)
+                                         VALUES (?, ?, ?, ?, ?)
+                                         ''', (placa, data_atual, hora_atual, momento, categoria))
+                            entradas.append((categoria, momento))
+                        else:
+                            _, placa, hora_atual, momento = evento
+                            # Fecha a visita aberta deste carro, mesmo que de ontem.
+                            # INDEXED BY força o índice parcial das visitas abertas (sem estatísticas o
+                            # SQLite às vezes prefere o índice por data, que percorre todo o histórico da placa)
+                            aberta = conn.execute('''
+                                                  SELECT id, entrada_em, categoria
+                                                  FROM acessos INDEXED BY idx_acessos_abertos
+                                                  WHERE placa = ?
+                                                    AND saida_em IS NULL
+                                                  ''', (placa,)).fetchone()
+                            if aberta is None:
+                                continue
+                            conn.execute("UPDATE acessos SET hora_saida = ?, saida_em = ? WHERE id = ?",
+                                         (hora_atual, momento, aberta[0]))
+                            saidas.append((aberta[2], aberta[1], momento))
+                    estatisticas.aplicar(conn.cursor(), entradas, saidas)
+                self.gravados += len(eventos)
+                self.lotes += 1
+                metricas.observar("guarita_etapa_segundos", time.perf_counter() - inicio, etapa="db_gravacao")
+                return
+            except sqlite3.Error as e:
+                # Banco travado ou disco cheio: os eventos continuam na memória e a gravação é repetida
+                self.erros += 1
+                tentativas += 1
+                log.warning("Erro ao gravar %d acessos (tentativa %d): %s", len(eventos), tentativas, e)
+                if self._encerrando and tentativas >= self.max_tentativas_encerrando:
+                    log.error("%d eventos de acesso perdidos: %s", len(eventos), eventos)
+                    return
+                time.sleep(min(5.0, 0.5 * tentativas))
+            except Exception:
+                # Erro que repetir não resolve (dado inválido no lote): o lote é descartado,
+                # mas a thread continua viva e as marcas do gravar_pendentes são liberadas
+                self.erros += 1
+                log.exception("Lote de %d acessos descartado: %s", len(eventos), eventos)
+                return
+
+
+gravador_acessos = GravadorAcessos()
+metricas.funcao("guarita_fila", gravador_acessos._fila.qsize, fila="acessos_pendentes")
+metricas.funcao("guarita_acessos_gravados_total", lambda: gravador_acessos.gravados, tipo_serie="counter")
+# Rede de segurança: se o programa terminar sem chamar encerrar(), grava o que ficou na fila
+atexit.register(gravador_acessos.encerrar)
 
-    # Se não está dentro, insere o registro de entrada
-    cursor.execute('''
-                   INSERT INTO acessos (placa, data_entrada, hora_entrada)
-                   VALUES (?, ?, ?)
-                   ''', (placa.upper(), data_atual, hora_atual))
 
-    conn.commit()
-    conn.close()
-    return True, f"Entrada: {hora_atual}"
+def registrar_entrada(placa):
+    """Registra a entrada na memória na hora; a gravação no banco é feita em segundo plano"""
+    return gravador_acessos.entrada(placa)
 
 
 def registrar_saida(placa):
-    conn = conectar()
-    cursor = conn.cursor()
-    agora = datetime.now()
-    data_atual = agora.strftime("%Y-%m-%d")
-    hora_atual = agora.strftime("%H:%M:%S")
-
-    # Procura um registro "aberto" (sem hora de saída) para este carro hoje
-    cursor.execute('''
-                   SELECT id, hora_entrada
-                   FROM acessos
-                   WHERE placa = ?
-                     AND data_entrada = ?
-                     AND hora_saida IS NULL
-                   ''', (placa.upper(), data_atual))
-
-    registro = cursor.fetchone()
-
-    if registro:
-        registro_id, hora_entrada_str = registro
-
-        # Atualiza a linha existente colocando a hora da saída
-        cursor.execute('''
-                       UPDATE acessos
-                       SET hora_saida = ?
-                       WHERE id = ?
-                       ''', (hora_atual, registro_id))
-        conn.commit()
-        conn.close()
-
-        # Calcula quanto tempo o carro ficou
-        fmt = '%H:%M:%S'
-        t_entrada = datetime.strptime(hora_entrada_str, fmt)
-        t_saida = datetime.strptime(hora_atual, fmt)
-        permanencia = t_saida - t_entrada
-
-        return True, f"Permanência: {permanencia}"
-    else:
-        conn.close()
-        return False, "Nenhuma entrada aberta"
-
-
-def exportar_relatorio():
-    conn = conectar()
+    """Registra a saída na memória na hora; a gravação no banco é feita em segundo plano"""
+    return gravador_acessos.saida(placa)
+
+
+def estatisticas_acessos(dia=None):
+    """Ocupação, movimento por hora e permanência lidos só das tabelas de resumo (ver estatisticas.py)"""
+    return estatisticas.resumo(obter_conexao(), dia)
+
+
+def recalcular_estatisticas():
+    """Refaz as tabelas de resumo com todo o histórico; retorna quanto tempo levou (s)"""
+    # Sem esperar a fila do gravador: cada lote grava os acessos e o resumo na mesma transação,
+    # então o que for gravado depois do recálculo é somado a ele (nada conta duas vezes)
+    inicio = time.perf_counter()
+    conn = obter_conexao()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        estatisticas.recalcular(conn.cursor())
+    return time.perf_counter() - inicio
+
+
+COLUNAS_RELATORIO = ["id", "placa", "proprietario", "categoria", "data_entrada", "hora_entrada", "hora_saida"]
+FORMATOS_RELATORIO = ["csv", "csv.gz", "parquet"]
+
+
+def _filtros_relatorio(data_inicio, data_fim, placa, categoria):
+    """Monta o WHERE do relatório (datas no formato 'AAAA-MM-DD', ambas inclusivas)"""
+    condicoes, params = [], []
+    if data_inicio:
+        condicoes.append("a.entrada_em >= ?")
+        params.append(f"{data_inicio} 00:00:00")
+    if data_fim:
+        condicoes.append("a.entrada_em <= ?")
+        params.append(f"{data_fim} 23:59:59")
+    if placa:
+        condicoes.append("a.placa = ?")
+        params.append(placa.upper())
+    if categoria:
+        # A categoria gravada no acesso (a do momento da entrada); acessos antigos sem ela usam a do cadastro
+        condicoes.append("COALESCE(a.categoria, v.categoria) = ?")
+        params.append(categoria)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return where, params
+
+
+def exportar_relatorio(data_inicio=None, data_fim=None, placa=None, categoria=None, formato="csv",
+                       progresso=None, tamanho_lote=5000):
+    """
+    Exporta o histórico de acessos lendo o banco em lotes de 'tamanho_lote' linhas,
+    então a memória usada não cresce com o tamanho do histórico.
+
+    progresso(linhas_escritas, total) é chamado a cada lote; se retornar False a
+    exportação é cancelada e o arquivo parcial é apagado.
+    """
+    if formato not in FORMATOS_RELATORIO:
+        return False, f"Formato desconhecido: {formato}"
+
+    # O relatório inclui os acessos que ainda estavam na fila de gravação
+    gravador_acessos.gravar_pendentes(timeout=5)
+    cursor = obter_conexao().cursor()
+    where, params = _filtros_relatorio(data_inicio, data_fim, placa, categoria)
+
+    # Gera nome único com data e hora
+    filename = os.path.join(BASE_DIR, "..", f"relatorio_acessos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}")
     try:
+        # Conta antes para a barra de progresso (usa o índice de entrada_em quando há filtro de data)
+        cursor.execute(f"SELECT COUNT(*) FROM acessos a LEFT JOIN veiculos v ON a.placa = v.placa {where}", params)
+        total = cursor.fetchone()[0]
+
         # Query complexa (JOIN):
         # Pega dados da tabela acessos (a) e junta com tabela veiculos (v)
         # LEFT JOIN garante que traga o acesso mesmo se o veículo tiver sido deletado
-        query = """
+        query = f"""
                 SELECT a.id, \
                        a.placa, \
                        v.proprietario, \
-                       v.categoria,
+                       COALESCE(a.categoria, v.categoria),
                        a.data_entrada, \
                        a.hora_entrada, \
                        a.hora_saida
                 FROM acessos a
                          LEFT JOIN veiculos v ON a.placa = v.placa
-                ORDER BY a.data_entrada DESC, a.hora_entrada DESC \
+                {where}
+                ORDER BY a.entrada_em DESC \
                 """
-        # Pandas executa o SQL e já transforma em DataFrame
-        df = pd.read_sql_query(query, conn)
-
-        # Gera nome único com data e hora
-        filename = f"../relatorio_acessos_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-
-        # encoding='utf-8-sig' é vital para o Excel no Brasil ler acentos corretamente
-        df.to_csv(filename, index=False, sep=';', encoding='utf-8-sig')
-        return True, filename
+        cursor.execute(query, params)
+
+        if formato == "parquet":
+            escritas = _escrever_parquet(cursor, filename, total, progresso, tamanho_lote)
+        else:
+            escritas = _escrever_csv(cursor, filename, formato == "csv.gz", total, progresso, tamanho_lote)
+
+        if escritas is None:
+            _apagar_parcial(filename)
+            return False, "Exportação cancelada"
+        return True, os.path.abspath(filename)
+    except ImportError:
+        _apagar_parcial(filename)
+        return False, "Exportar em Parquet precisa do pacote 'pyarrow' (pip install pyarrow)"
     except Exception as e:
+        # Um arquivo pela metade pareceria um relatório completo
+        _apagar_parcial(filename)
         return False, str(e)
     finally:
-        conn.close()
+        cursor.close()
+
+
+def _apagar_parcial(filename):
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+def _escrever_csv(cursor, filename, compactar, total, progresso, tamanho_lote):
+    # encoding='utf-8-sig' é vital para o Excel no Brasil ler acentos corretamente
+    abrir = gzip.open if compactar else open
+    escritas = 0
+    with abrir(filename, "wt", encoding="utf-8-sig", newline="") as arquivo:
+        writer = csv.writer(arquivo, delimiter=";")
+        writer.writerow(COLUNAS_RELATORIO)
+        while True:
+            lote = cursor.fetchmany(tamanho_lote)
+            if not lote:
+                break
+            writer.writerows(lote)
+            escritas += len(lote)
+            if progresso is not None and progresso(escritas, total) is False:
+                return None
+    return escritas
+
+
+def _escrever_parquet(cursor, filename, total, progresso, tamanho_lote):
+    # Dependência opcional: só é importada quando alguém pede Parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(coluna, pa.int64() if coluna == "id" else pa.string()) for coluna in COLUNAS_RELATORIO])
+    escritas = 0
+    with pq.ParquetWriter(filename, schema) as writer:
+        while True:
+            lote = cursor.fetchmany(tamanho_lote)
+            if not lote:
+                break
+            colunas = list(zip(*lote))
+            # Tipo explícito: uma coluna toda vazia no lote viraria o tipo 'null' e não casaria com o schema
+            writer.write_table(pa.Table.from_arrays([pa.array(c, type=schema.field(i).type)
+                                                     for i, c in enumerate(colunas)], schema=schema))
+            escritas += len(lote)
+            if progresso is not None and progresso(escritas, total) is False:
+                return None
+    return escritas
 
 
 if __name__ == "__main__":
@@ -0,0 +1,323 @@
+"""
+Estatísticas de ocupação e permanência mantidas em tabelas de resumo.
+
+Em vez de varrer a tabela 'acessos' (que cresce para sempre), cada entrada e
+saída gravada pelo GravadorAcessos também atualiza, na mesma transação:
+
+    estat_hora               entradas e saídas por hora ('AAAA-MM-DD HH') e categoria
+    estat_permanencia        visitas encerradas, soma e máximo da permanência por dia (da saída) e categoria
+    estat_permanencia_faixa  histograma da permanência (faixas de LIMITES_PERMANENCIA)
+    estat_ocupacao           veículos no campus agora, por categoria
+
+Assim "quantos estão dentro", "entradas por hora hoje" e "permanência média por
+categoria" leem poucas linhas, seja qual for o tamanho do histórico.
+
+As tabelas são criadas e preenchidas com o histórico pela migração 4 do banco.
+Para refazer tudo a partir de 'acessos' (ex.: depois de corrigir registros à mão):
+    cd src
+    python estatisticas.py --recalcular
+"""
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+
+SEM_CATEGORIA = "SEM CATEGORIA"  # Veículo excluído do cadastro ou acesso anterior à coluna categoria
+
+# Limite superior (em segundos) de cada faixa do histograma; a última faixa é "acima do último"
+LIMITES_PERMANENCIA = [15 * 60, 30 * 60, 3600, 2 * 3600, 4 * 3600, 8 * 3600, 12 * 3600, 24 * 3600]
+ROTULOS_PERMANENCIA = ["até 15 min", "15-30 min", "30 min-1 h", "1-2 h", "2-4 h", "4-8 h", "8-12 h", "12-24 h",
+                       "mais de 24 h"]
+
+
+def faixa_permanencia(segundos):
+    """Índice da faixa do histograma para uma permanência"""
+    for i, limite in enumerate(LIMITES_PERMANENCIA):
+        if segundos <= limite:
+            return i
+    return len(LIMITES_PERMANENCIA)
+
+
+def _sql_faixa(coluna):
+    # Mesma regra do faixa_permanencia, para o recálculo feito todo dentro do SQLite
+    casos = " ".join(f"WHEN {coluna} <= {limite} THEN {i}" for i, limite in enumerate(LIMITES_PERMANENCIA))
+    return f"CASE {casos} ELSE {len(LIMITES_PERMANENCIA)} END"
+
+
+def _segundos(entrada_em, saida_em):
+    # Registros antigos (antes das datas completas) podem ter saída "antes" da entrada
+    inicio = datetime.strptime(entrada_em, "%Y-%m-%d %H:%M:%S")
+    fim = datetime.strptime(saida_em, "%Y-%m-%d %H:%M:%S")
+    return max(0, int((fim - inicio).total_seconds()))
+
+
+# ================= ATUALIZAÇÃO INCREMENTAL =================
+def _agrupar(entradas, saidas):
+    # Totais do lote por chave de cada tabela de resumo
+    por_hora = Counter()  # (hora, categoria, tipo) -> quantidade
+    ocupacao = Counter()
+    permanencia = {}  # (dia, categoria) -> [visitas, soma, maximo]
+    faixas = Counter()
+
+    for categoria, entrada_em in entradas:
+        categoria = categoria or SEM_CATEGORIA
+        por_hora[(entrada_em[:13], categoria, "entradas")] += 1
+        ocupacao[categoria] += 1
+
+    for categoria, entrada_em, saida_em in saidas:
+        categoria = categoria or SEM_CATEGORIA
+        por_hora[(saida_em[:13], categoria, "saidas")] += 1
+        ocupacao[categoria] -= 1
+        segundos = _segundos(entrada_em, saida_em)
+        dados = permanencia.setdefault((saida_em[:10], categoria), [0, 0, 0])
+        dados[0] += 1
+        dados[1] += segundos
+        dados[2] = max(dados[2], segundos)
+        faixas[(saida_em[:10], categoria, faixa_permanencia(segundos))] += 1
+    return por_hora, ocupacao, permanencia, faixas
+
+
+def aplicar(cursor, entradas, saidas):
+    """
+    Soma um lote de acessos nas tabelas de resumo (chamar na transação que grava os acessos).
+    - entradas: [(categoria, entrada_em)]
+    - saidas: [(categoria, entrada_em, saida_em)]
+    """
+    por_hora, ocupacao, permanencia, faixas = _agrupar(entradas, saidas)
+
+    # Um comando por chave do lote (não por acesso): a rajada da troca de turno vira poucas linhas
+    cursor.executemany('''
+                       INSERT INTO estat_hora (hora, categoria, entradas, saidas)
+                       VALUES (?, ?, ?, ?)
+                       ON CONFLICT (hora, categoria) DO UPDATE
+                           SET entradas = entradas + excluded.entradas,
+                               saidas   = saidas + excluded.saidas
+                       ''', [(hora, categoria, quantidade if tipo == "entradas" else 0,
+                              quantidade if tipo == "saidas" else 0)
+                             for (hora, categoria, tipo), quantidade in por_hora.items()])
+    cursor.executemany('''
+                       INSERT INTO estat_ocupacao (categoria, dentro)
+                       VALUES (?, ?)
+                       ON CONFLICT (categoria) DO UPDATE SET dentro = dentro + excluded.dentro
+                       ''', [(categoria, quantidade) for categoria, quantidade in ocupacao.items() if quantidade])
+    cursor.executemany('''
+                       INSERT INTO estat_permanencia (dia, categoria, visitas, soma_s, maximo_s)
+                       VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT (dia, categoria) DO UPDATE
+                           SET visitas  = visitas + excluded.visitas,
+                               soma_s   = soma_s + excluded.soma_s,
+                               maximo_s = MAX(maximo_s, excluded.maximo_s)
+                       ''', [(dia, categoria, *dados) for (dia, categoria), dados in permanencia.items()])
+    cursor.executemany('''
+                       INSERT INTO estat_permanencia_faixa (dia, categoria, faixa, visitas)
+                       VALUES (?, ?, ?, ?)
+                       ON CONFLICT (dia, categoria, faixa) DO UPDATE SET visitas = visitas + excluded.visitas
+                       ''', [(dia, categoria, faixa, quantidade)
+                             for (dia, categoria, faixa), quantidade in faixas.items()])
+
+
+def descontar(cursor, placa):
+    """
+    Tira das tabelas de resumo os acessos de uma placa (exclusão do veículo).
+    Chamar na transação que apaga os acessos, antes do DELETE.
+    """
+    visitas = cursor.execute("SELECT categoria, entrada_em, saida_em FROM acessos "
+                             "WHERE placa = ? AND entrada_em IS NOT NULL", (placa,)).fetchall()
+    entradas = [(categoria, entrada_em) for categoria, entrada_em, _ in visitas]
+    saidas = [visita for visita in visitas if visita[2] is not None]
+    por_hora, ocupacao, permanencia, faixas = _agrupar(entradas, saidas)
+
+    cursor.executemany("UPDATE estat_hora SET entradas = entradas - ?, saidas = saidas - ? "
+                       "WHERE hora = ? AND categoria = ?",
+                       [(quantidade if tipo == "entradas" else 0, quantidade if tipo == "saidas" else 0,
+                         hora, categoria) for (hora, categoria, tipo), quantidade in por_hora.items()])
+    cursor.executemany("UPDATE estat_ocupacao SET dentro = dentro - ? WHERE categoria = ?",
+                       [(quantidade, categoria) for categoria, quantidade in ocupacao.items() if quantidade])
+    cursor.executemany("UPDATE estat_permanencia SET visitas = visitas - ?, soma_s = soma_s - ? "
+                       "WHERE dia = ? AND categoria = ?",
+                       [(dados[0], dados[1], dia, categoria) for (dia, categoria), dados in permanencia.items()])
+    cursor.executemany("UPDATE estat_permanencia_faixa SET visitas = visitas - ? "
+                       "WHERE dia = ? AND categoria = ? AND faixa = ?",
+                       [(quantidade, dia, categoria, faixa)
+                        for (dia, categoria, faixa), quantidade in faixas.items()])
+
+    # O máximo não dá para descontar: é refeito só nos dias em que uma visita apagada era o próprio máximo
+    for (dia, categoria), (_, _, maximo) in permanencia.items():
+        atual = cursor.execute("SELECT maximo_s FROM estat_permanencia WHERE dia = ? AND categoria = ?",
+                               (dia, categoria)).fetchone()
+        if atual is None or atual[0] > maximo:
+            continue
+        cursor.execute(f'''
+                       UPDATE estat_permanencia
+                       SET maximo_s = (SELECT COALESCE(MAX(MAX(0, CAST(strftime('%s', saida_em) AS INTEGER)
+                                                              - CAST(strftime('%s', entrada_em) AS INTEGER))), 0)
+                                       FROM acessos
+                                       WHERE substr(saida_em, 1, 10) = :dia
+                                         AND entrada_em IS NOT NULL
+                                         AND COALESCE(categoria, '{SEM_CATEGORIA}') = :categoria
+                                         AND placa <> :placa)
+                       WHERE dia = :dia
+                         AND categoria = :categoria
+                       ''', {"dia": dia, "categoria": categoria, "placa": placa})
+
+    # Chaves zeradas saem da tabela, como se o histórico nunca as tivesse tido (igual ao recalcular)
+    cursor.execute("DELETE FROM estat_hora WHERE entradas <= 0 AND saidas <= 0")
+    cursor.execute("DELETE FROM estat_ocupacao WHERE dentro <= 0")
+    cursor.execute("DELETE FROM estat_permanencia WHERE visitas <= 0")
+    cursor.execute("DELETE FROM estat_permanencia_faixa WHERE visitas <= 0")
+
+
+# ================= RECÁLCULO (BACKFILL) =================
+def recalcular(cursor):
+    """Apaga e refaz as tabelas de resumo a partir de todo o histórico de 'acessos'"""
+    for tabela in ("estat_hora", "estat_ocupacao", "estat_permanencia", "estat_permanencia_faixa"):
+        cursor.execute(f"DELETE FROM {tabela}")
+
+    categoria = f"COALESCE(categoria, '{SEM_CATEGORIA}')"
+    cursor.execute(f'''
+                   INSERT INTO estat_hora (hora, categoria, entradas, saidas)
+                   SELECT hora, categoria, SUM(entrada), SUM(saida)
+                   FROM (SELECT substr(entrada_em, 1, 13) AS hora, {categoria} AS categoria, 1 AS entrada, 0 AS saida
+                         FROM acessos
+                         WHERE entrada_em IS NOT NULL
+                         UNION ALL
+                         SELECT substr(saida_em, 1, 13), {categoria}, 0, 1
+                         FROM acessos
+                         WHERE saida_em IS NOT NULL)
+                   GROUP BY hora, categoria
+                   ''')
+    cursor.execute(f'''
+                   INSERT INTO estat_ocupacao (categoria, dentro)
+                   SELECT {categoria}, COUNT(*)
+                   FROM acessos
+                   WHERE saida_em IS NULL
+                     AND entrada_em IS NOT NULL
+                   GROUP BY 1
+                   ''')
+
+    # Permanência em segundos de cada visita encerrada (negativa nos registros antigos vira 0)
+    visitas = f'''
+              SELECT substr(saida_em, 1, 10) AS dia, {categoria} AS categoria,
+                     MAX(0, CAST(strftime('%s', saida_em) AS INTEGER) - CAST(strftime('%s', entrada_em) AS INTEGER))
+                         AS segundos
+              FROM acessos
+              WHERE saida_em IS NOT NULL
+                AND entrada_em IS NOT NULL
+              '''
+    cursor.execute(f'''
+                   INSERT INTO estat_permanencia (dia, categoria, visitas, soma_s, maximo_s)
+                   SELECT dia, categoria, COUNT(*), SUM(segundos), MAX(segundos)
+                   FROM ({visitas})
+                   GROUP BY dia, categoria
+                   ''')
+    cursor.execute(f'''
+                   INSERT INTO estat_permanencia_faixa (dia, categoria, faixa, visitas)
+                   SELECT dia, categoria, {_sql_faixa("segundos")}, COUNT(*)
+                   FROM ({visitas})
+                   GROUP BY 1, 2, 3
+                   ''')
+
+
+# ================= CONSULTAS =================
+def ocupacao(conn):
+    """Veículos no campus agora: {categoria: quantidade}"""
+    cursor = conn.execute("SELECT categoria, dentro FROM estat_ocupacao WHERE dentro > 0 ORDER BY dentro DESC")
+    return dict(cursor.fetchall())
+
+
+def por_hora(conn, dia):
+    """Entradas e saídas de cada hora do dia ('AAAA-MM-DD'): lista de 24 tuplas (entradas, saidas)"""
+    horas = [(0, 0)] * 24
+    cursor = conn.execute('''
+                          SELECT CAST(substr(hora, 12, 2) AS INTEGER), SUM(entradas), SUM(saidas)
+                          FROM estat_hora
+                          WHERE hora BETWEEN ? AND ?
+                          GROUP BY hora
+                          ''', (f"{dia} 00", f"{dia} 23"))
+    for hora, entradas, saidas in cursor:
+        horas[hora] = (entradas, saidas)
+    return horas
+
+
+def permanencia(conn, inicio, fim):
+    """Visitas encerradas entre os dias 'inicio' e 'fim' (inclusive): {categoria: {visitas, media_s, maximo_s}}"""
+    cursor = conn.execute('''
+                          SELECT categoria, SUM(visitas), SUM(soma_s), MAX(maximo_s)
+                          FROM estat_permanencia
+                          WHERE dia BETWEEN ? AND ?
+                          GROUP BY categoria
+                          ORDER BY SUM(visitas) DESC
+                          ''', (inicio, fim))
+    return {categoria: {"visitas": visitas, "media_s": soma / visitas, "maximo_s": maximo}
+            for categoria, visitas, soma, maximo in cursor}
+
+
+def histograma_permanencia(conn, inicio, fim, categoria=None):
+    """Quantidade de visitas em cada faixa de ROTULOS_PERMANENCIA"""
+    sql = "SELECT faixa, SUM(visitas) FROM estat_permanencia_faixa WHERE dia BETWEEN ? AND ?"
+    params = [inicio, fim]
+    if categoria:
+        sql += " AND categoria = ?"
+        params.append(categoria)
+    contagem = dict(conn.execute(sql + " GROUP BY faixa", params).fetchall())
+    return [(rotulo, contagem.get(i, 0)) for i, rotulo in enumerate(ROTULOS_PERMANENCIA)]
+
+
+def resumo(conn, dia=None, dias_permanencia=7):
+    """Tudo o que a aba de estatísticas mostra: ocupação, movimento por hora do dia e permanência"""
+    dia = dia or datetime.now().strftime("%Y-%m-%d")
+    inicio = (datetime.strptime(dia, "%Y-%m-%d") - timedelta(days=dias_permanencia - 1)).strftime("%Y-%m-%d")
+    dentro = ocupacao(conn)
+    horas = por_hora(conn, dia)
+    return {
+        "dia": dia,
+        "dentro": sum(dentro.values()),
+        "dentro_por_categoria": dentro,
+        "por_hora": horas,
+        "entradas_dia": sum(entradas for entradas, _ in horas),
+        "saidas_dia": sum(saidas for _, saidas in horas),
+        "periodo_permanencia": (inicio, dia),
+        "permanencia": permanencia(conn, inicio, dia),
+        "histograma_permanencia": histograma_permanencia(conn, inicio, dia),
+    }
+
+
+def formatar_duracao(segundos):
+    """'1 h 05 min', '12 min', '40 s'"""
+    segundos = int(segundos)
+    if segundos < 60:
+        return f"{segundos} s"
+    horas, minutos = divmod(segundos // 60, 60)
+    return f"{horas} h {minutos:02d} min" if horas else f"{minutos} min"
+
+
+def main():
+    # Importado aqui: o database_manager usa este módulo ao gravar os acessos
+    import database_manager
+
+    parser = argparse.ArgumentParser(description="Estatísticas de ocupação e permanência")
+    parser.add_argument("--recalcular", action="store_true",
+                        help="Refaz as tabelas de resumo a partir de todo o histórico de acessos")
+    parser.add_argument("--dia", help="Dia do resumo (AAAA-MM-DD, padrão: hoje)")
+    parser.add_argument("--banco", default=database_manager.DB_NAME)
+    args = parser.parse_args()
+
+    database_manager.DB_NAME = args.banco
+    database_manager.inicializar_banco()
+    if args.recalcular:
+        print(f"Tabelas de resumo refeitas em {database_manager.recalcular_estatisticas():.2f} s")
+
+    dados = database_manager.estatisticas_acessos(args.dia)
+    print(f"No campus agora: {dados['dentro']} {dados['dentro_por_categoria']}")
+    print(f"{dados['dia']}: {dados['entradas_dia']} entradas, {dados['saidas_dia']} saídas")
+    for hora, (entradas, saidas) in enumerate(dados["por_hora"]):
+        if entradas or saidas:
+            print(f"  {hora:02d}h  {entradas:4d} entradas  {saidas:4d} saídas")
+    print("Permanência de {} a {}:".format(*dados["periodo_permanencia"]))
+    for categoria, valores in dados["permanencia"].items():
+        print(f"  {categoria}: {valores['visitas']} visitas, média {formatar_duracao(valores['media_s'])}, "
+              f"máxima {formatar_duracao(valores['maximo_s'])}")
+    database_manager.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Fontes de frames com a mesma interface do cv2.VideoCapture (read, isOpened, release).
+
+Assim o DetectorPlaca, o pipeline e o benchmark funcionam igual com webcam,
+RTSP, arquivo de vídeo, pasta de imagens ou placas sintéticas.
+A FonteReplay toca qualquer uma delas no ritmo de uma câmera (tempo real, Nx ou o mais rápido possível).
+A CapturaRecente lê a câmera numa thread e sempre entrega o frame mais novo (modo de baixa latência).
+"""
+import os
+import random
+import threading
+import time
+
+import cv2
+
+from gerador_placas import desenhar_frame, gerar_texto_placa
+
+EXTENSOES_IMAGEM = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FontePastaImagens:
+    """Lê as imagens de uma pasta em ordem alfabética, como se fossem frames de uma câmera"""
+
+    def __init__(self, pasta, repetir=False):
+        self.pasta = pasta
+        self.repetir = repetir
+        self.arquivos = sorted(a for a in os.listdir(pasta) if a.lower().endswith(EXTENSOES_IMAGEM))
+        self.posicao = 0
+        self.rotulo_atual = None  # Nome do arquivo do último frame (chave do gabarito)
+        self._aberta = True
+
+    def isOpened(self):
+        return self._aberta
+
+    def read(self):
+        if self.posicao >= len(self.arquivos):
+            if not self.repetir or not self.arquivos:
+                return False, None
+            self.posicao = 0
+
+        nome = self.arquivos[self.posicao]
+        self.posicao += 1
+        self.rotulo_atual = nome
+        frame = cv2.imread(os.path.join(self.pasta, nome))
+        return frame is not None, frame
+
+    def grab(self):
+        """Pula uma imagem sem ler o arquivo"""
+        if self.posicao >= len(self.arquivos):
+            if not self.repetir or not self.arquivos:
+                return False
+            self.posicao = 0
+        self.posicao += 1
+        return True
+
+    def release(self):
+        self._aberta = False
+
+
+class FonteSintetica:
+    """
+    Gera frames com placas aleatórias. Cada placa aparece em 'frames_por_placa'
+    frames seguidos, andando um pouco, como um carro chegando no portão.
+    Com 'placas', usa essas placas em sequência (ex.: as do cadastro) em vez de sortear.
+    """
+
+    def __init__(self, quantidade=50, frames_por_placa=1, largura=1280, altura=720, semente=42, placas=None):
+        self.quantidade = quantidade
+        self.placas = placas
+        self.frames_por_placa = frames_por_placa
+        self.largura = largura
+        self.altura = altura
+        self.rng = random.Random(semente)
+        self.posicao = 0
+        self.rotulo_atual = None
+        self.placa_atual = None  # Gabarito do último frame
+        self._aberta = True
+        self._cena = None
+
+    def isOpened(self):
+        return self._aberta
+
+    def read(self):
+        if self.posicao >= self.quantidade * self.frames_por_placa:
+            return False, None
+
+        passo = self.posicao % self.frames_por_placa
+        if passo == 0:
+            if self.placas:
+                texto = self.placas[(self.posicao // self.frames_por_placa) % len(self.placas)]
+            else:
+                texto = gerar_texto_placa(self.rng)
+            escala = self.rng.uniform(0.8, 1.3) * self.largura / 1280
+            x = self.rng.randint(50, max(51, self.largura // 2))
+            y = self.rng.randint(self.altura // 3, max(self.altura // 3 + 1, self.altura // 2))
+            self._cena = (texto, x, y, escala)
+
+        texto, x, y, escala = self._cena
+        frame, _ = desenhar_frame(texto, self.largura, self.altura, self.rng,
+                                  posicao=(x + 4 * passo, y + 2 * passo), escala=escala)
+        self.rotulo_atual = str(self.posicao)
+        self.placa_atual = texto
+        self.posicao += 1
+        return True, frame
+
+    def release(self):
+        self._aberta = False
+
+
+class FonteReplay:
+    """
+    Toca um vídeo, uma pasta de imagens (ou outra fonte) no ritmo de uma câmera.
+
+    velocidade=1 é o tempo real (pelo fps do vídeo ou 'fps'), 4 é 4x mais rápido e
+    0 é o mais rápido possível. Como numa câmera de verdade, se quem lê atrasar os
+    frames vencidos são pulados ('pulados'), em vez de a gravação ficar mais lenta.
+    """
+
+    def __init__(self, origem, velocidade=1.0, fps=None, repetir=False, pular_atrasados=True):
+        self.origem = origem
+        self.velocidade = velocidade
+        self.repetir = repetir
+        self.pular_atrasados = pular_atrasados
+        self.fonte = origem if hasattr(origem, "read") else abrir_fonte(origem)
+
+        if fps is None and hasattr(self.fonte, "get"):
+            fps = self.fonte.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 30.0  # Pasta de imagens ou vídeo sem essa informação
+
+        self.lidos = 0
+        self.pulados = 0
+        self.voltas = 0
+        self._inicio = None
+
+    def isOpened(self):
+        return self.fonte.isOpened()
+
+    def read(self):
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+        if self.velocidade:
+            self._esperar_vez()
+
+        ret, frame = self.fonte.read()
+        if not ret and self.repetir and self._voltar_ao_inicio():
+            ret, frame = self.fonte.read()
+        if ret:
+            self.lidos += 1
+        return ret, frame
+
+    def release(self):
+        self.fonte.release()
+
+    def _esperar_vez(self):
+        # Momento em que o próximo frame "sai da câmera"
+        frames_por_segundo = self.fps * self.velocidade
+        espera = self._inicio + self.lidos / frames_por_segundo - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        elif self.pular_atrasados:
+            for _ in range(int(-espera * frames_por_segundo)):
+                # grab() avança sem decodificar a imagem (bem mais barato que read)
+                pular = getattr(self.fonte, "grab", None)
+                ok = pular() if pular is not None else self.fonte.read()[0]
+                if not ok and not (self.repetir and self._voltar_ao_inicio()):
+                    break
+                self.lidos += 1
+                self.pulados += 1
+
+    def _voltar_ao_inicio(self):
+        self.voltas += 1
+        if hasattr(self.fonte, "posicao"):
+            self.fonte.posicao = 0
+            return True
+        return bool(self.fonte.set(cv2.CAP_PROP_POS_FRAMES, 0))
+
+
+# API de captura do OpenCV por nome ("api" nas opções da CapturaRecente)
+APIS_CAPTURA = {"padrao": cv2.CAP_ANY, "v4l2": cv2.CAP_V4L2, "dshow": cv2.CAP_DSHOW, "msmf": cv2.CAP_MSMF,
+                "ffmpeg": cv2.CAP_FFMPEG, "gstreamer": cv2.CAP_GSTREAMER}
+
+
+class CapturaRecente:
+    """
+    Modo de baixa latência: a câmera é lida numa thread própria e o read() devolve
+    sempre um frame capturado *depois* de ele ser chamado, nunca um que ficou na fila.
+
+    Sem isso, com o reconhecimento mais lento que a câmera, o buffer do OpenCV/driver
+    enche e o portão decide em cima de frames com segundos de atraso.
+
+    - largura/altura/fps/fourcc (ex.: "MJPG") e buffer (CAP_PROP_BUFFERSIZE) são pedidos à
+      câmera ao abrir; nem toda câmera aceita, os valores que ela usou ficam em 'configuracao'.
+    - A thread faz grab() em todos os frames (o buffer nunca acumula) e só decodifica
+      (retrieve) quando alguém está esperando; os outros contam como 'descartados'.
+    - timestamp_atual: momento (time.time) em que o frame entregue saiu da câmera,
+      para medir a latência da câmera até a decisão.
+    """
+
+    def __init__(self, fonte=0, largura=None, altura=None, fps=None, fourcc=None, buffer=1, api="padrao",
+                 timeout=2.0):
+        self.fonte = fonte
+        self.timeout = timeout  # Sem frame novo nesse tempo, read() devolve (False, None)
+        if hasattr(fonte, "read"):
+            self.cap = fonte
+        else:
+            if isinstance(fonte, str) and fonte.isdigit():
+                fonte = int(fonte)
+            self.cap = cv2.VideoCapture(fonte, APIS_CAPTURA[api])
+        self.configuracao = self._configurar(largura, altura, fps, fourcc, buffer)
+        # Fontes sem grab/retrieve (replay, sintética) decodificam sempre
+        self._separa_decodificacao = hasattr(self.cap, "grab") and hasattr(self.cap, "retrieve")
+
+        self.capturados = 0
+        self.entregues = 0
+        self.descartados = 0  # Capturados e jogados fora porque ninguém pediu a tempo
+        self.falhas = 0
+        self.timestamp_atual = None
+
+        self._cond = threading.Condition()
+        self._pedido = False
+        self._frame = None  # (numero, timestamp, frame) do último frame decodificado
+        self._numero_entregue = 0
+        self._rodando = self.cap.isOpened()
+        self._thread = threading.Thread(target=self._loop, name="captura-camera", daemon=True)
+        if self._rodando:
+            self._thread.start()
+
+    def _configurar(self, largura, altura, fps, fourcc, buffer):
+        if not hasattr(self.cap, "set"):
+            return {}
+        # O FOURCC vem antes da resolução: em várias webcams USB o MJPG é o que libera 720p/1080p a 30 fps
+        pedidos = [
+            (cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc) if fourcc else None),
+            (cv2.CAP_PROP_FRAME_WIDTH, largura),
+            (cv2.CAP_PROP_FRAME_HEIGHT, altura),
+            (cv2.CAP_PROP_FPS, fps),
+            (cv2.CAP_PROP_BUFFERSIZE, buffer),
+        ]
+        for propriedade, valor in pedidos:
+            if valor:
+                self.cap.set(propriedade, valor)
+        codigo = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        return {
+            "largura": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "altura": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": self.cap.get(cv2.CAP_PROP_FPS),
+            "fourcc": "".join(chr((codigo >> 8 * i) & 0xFF) for i in range(4)) if codigo > 0 else None,
+            "buffer": int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        }
+
+    def isOpened(self):
+        return self._rodando
+
+    def read(self):
+        """Espera o próximo frame da câmera (o mais novo possível)"""
+        with self._cond:
+            self._pedido = True
+            limite = time.perf_counter() + self.timeout
+            while self._rodando and (self._frame is None or self._frame[0] <= self._numero_entregue):
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    return False, None
+                self._cond.wait(restante)
+            if self._frame is None or self._frame[0] <= self._numero_entregue:
+                return False, None  # Câmera fechou ou o vídeo acabou
+            numero, self.timestamp_atual, frame = self._frame
+            self._numero_entregue = numero
+            self.entregues += 1
+            return True, frame
+
+    def release(self):
+        with self._cond:
+            self._rodando = False
+            self._cond.notify_all()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self.cap.release()
+
+    def estatisticas(self):
+        return {
+            "capturados": self.capturados,
+            "entregues": self.entregues,
+            "descartados": self.descartados,
+            "falhas": self.falhas,
+            **self.configuracao,
+        }
+
+    def _loop(self):
+        while self._rodando:
+            if self._separa_decodificacao:
+                ok = self.cap.grab()
+                frame = None
+            else:
+                ok, frame = self.cap.read()
+            momento = time.time()
+            if not ok:
+                self.falhas += 1
+                if self.capturados == 0 and self.falhas < 100 and self.cap.isOpened():
+                    time.sleep(0.01)  # Câmera ainda acordando
+                    continue
+                break  # Fim do vídeo/replay ou câmera caiu: quem está no read() é liberado
+            self.capturados += 1
+
+            with self._cond:
+                pedido = self._pedido
+            if not pedido:
+                self.descartados += 1
+                continue
+            if frame is None:
+                ok, frame = self.cap.retrieve()
+                if not ok:
+                    self.falhas += 1
+                    continue
+            with self._cond:
+                self._frame = (self.capturados, momento, frame)
+                self._pedido = False
+                self._cond.notify_all()
+
+        with self._cond:
+            self._rodando = False
+            self._cond.notify_all()
+
+
+def fonte_ao_vivo(fonte):
+    """Webcam (número) ou câmera de rede (URL): os frames chegam sozinhos e acumulam no buffer se ninguém ler"""
+    if isinstance(fonte, int):
+        return True
+    return isinstance(fonte, str) and (fonte.isdigit() or ("://" in fonte and not fonte.startswith("file:")))
+
+
+def abrir_fonte(fonte, captura=None):
+    """
+    Abre a fonte certa para o valor informado:
+    número -> webcam, pasta -> FontePastaImagens, qualquer outro texto -> arquivo/URL no OpenCV,
+    dicionário -> FonteReplay (ex.: {"origem": "../videos/portao.mp4", "velocidade": 4}),
+    objeto com read() -> ele mesmo.
+    Com 'captura' (opções da CapturaRecente, ex.: {"largura": 1280, "altura": 720, "fourcc": "MJPG"})
+    a câmera é lida no modo de baixa latência.
+    """
+    if captura is not None:
+        # Pasta e replay são abertos aqui; webcam e URL a CapturaRecente abre com a API pedida
+        if isinstance(fonte, dict) or (isinstance(fonte, str) and os.path.isdir(fonte)):
+            fonte = abrir_fonte(fonte)
+        return CapturaRecente(fonte, **captura)
+    if hasattr(fonte, "read"):
+        return fonte
+    if isinstance(fonte, dict):
+        return FonteReplay(**fonte)
+    if isinstance(fonte, str) and fonte.isdigit():
+        fonte = int(fonte)
+    if isinstance(fonte, str) and os.path.isdir(fonte):
+        return FontePastaImagens(fonte)
+    return cv2.VideoCapture(fonte)
@@ -0,0 +1,88 @@
+"""
+Gerador de placas sintéticas para testes e benchmark (não precisa de câmera nem de fotos).
+
+Uso (gera uma pasta de imagens e o gabarito.csv):
+    python gerador_placas.py --saida ../dados_teste --quantidade 100
+"""
+import argparse
+import csv
+import os
+import random
+import string
+
+import cv2
+import numpy as np
+
+
+def gerar_texto_placa(rng=random, mercosul=None):
+    """Placa aleatória no padrão antigo (AAA9999) ou Mercosul (AAA9A99)"""
+    if mercosul is None:
+        mercosul = rng.random() < 0.5
+    letras = "".join(rng.choice(string.ascii_uppercase) for _ in range(3))
+    if mercosul:
+        return f"{letras}{rng.randint(0, 9)}{rng.choice(string.ascii_uppercase)}{rng.randint(0, 99):02d}"
+    return f"{letras}{rng.randint(0, 9999):04d}"
+
+
+def desenhar_frame(texto, largura=1280, altura=720, rng=random, posicao=None, escala=None):
+    """
+    Desenha uma cena simples: fundo com ruído, um "carro" escuro e a placa branca
+    com borda preta. Retorna (frame, (x, y, w, h) da placa).
+    """
+    frame = np.full((altura, largura, 3), rng.randint(60, 140), np.uint8)
+    ruido = np.random.default_rng(rng.randint(0, 2 ** 31)).integers(0, 25, frame.shape, dtype=np.uint8)
+    cv2.add(frame, ruido, dst=frame)
+
+    escala = escala if escala is not None else rng.uniform(0.8, 1.3) * largura / 1280
+    w, h = int(300 * escala), int(95 * escala)
+    if posicao is None:
+        x = rng.randint(w // 2, max(w // 2 + 1, largura - int(1.5 * w)))
+        y = rng.randint(h * 2, max(h * 2 + 1, altura - 2 * h))
+    else:
+        x, y = posicao
+
+    # Carro: região escura em volta da placa que continua até a borda de baixo,
+    # como na câmera do portão (o contorno do carro fica aberto e não "engole" a placa)
+    cv2.rectangle(frame, (x - w // 2, y - 2 * h), (x + int(1.5 * w), altura), (40, 40, 45), -1)
+
+    # Placa branca com borda preta (é o contorno de 4 pontos que o detector procura)
+    cv2.rectangle(frame, (x, y), (x + w, y + h), (250, 250, 250), -1)
+    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 0), max(2, int(3 * escala)))
+    if texto[4].isalpha():
+        # Mercosul: faixa azul no topo
+        cv2.rectangle(frame, (x + 3, y + 3), (x + w - 3, y + h // 4), (160, 80, 0), -1)
+
+    fonte_escala = 1.9 * escala
+    espessura = max(2, int(5 * escala))
+    (tw, th), _ = cv2.getTextSize(texto, cv2.FONT_HERSHEY_SIMPLEX, fonte_escala, espessura)
+    origem = (x + (w - tw) // 2, y + h // 2 + th // 2 + int(8 * escala))
+    cv2.putText(frame, texto, origem, cv2.FONT_HERSHEY_SIMPLEX, fonte_escala, (0, 0, 0), espessura, cv2.LINE_AA)
+    return frame, (x, y, w, h)
+
+
+def gerar_conjunto(pasta, quantidade, largura=1280, altura=720, semente=42):
+    """Grava 'quantidade' imagens em 'pasta' e um gabarito.csv (arquivo;placa)"""
+    rng = random.Random(semente)
+    os.makedirs(pasta, exist_ok=True)
+    caminho_gabarito = os.path.join(pasta, "gabarito.csv")
+    with open(caminho_gabarito, "w", newline="", encoding="utf-8") as arquivo:
+        writer = csv.writer(arquivo, delimiter=";")
+        writer.writerow(["arquivo", "placa"])
+        for i in range(quantidade):
+            texto = gerar_texto_placa(rng)
+            frame, _ = desenhar_frame(texto, largura, altura, rng)
+            nome = f"placa_{i:05d}.png"
+            cv2.imwrite(os.path.join(pasta, nome), frame)
+            writer.writerow([nome, texto])
+    return caminho_gabarito
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera imagens de placas sintéticas com gabarito")
+    parser.add_argument("--saida", required=True, help="Pasta onde as imagens serão gravadas")
+    parser.add_argument("--quantidade", type=int, default=100)
+    parser.add_argument("--largura", type=int, default=1280)
+    parser.add_argument("--altura", type=int, default=720)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    print(f"Gabarito: {gerar_conjunto(args.saida, args.quantidade, args.largura, args.altura, args.semente)}")
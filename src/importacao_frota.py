@@ -0,0 +1,222 @@
+"""
+Importação da frota em lote (CSV ou XLSX), para a lista de veículos que a administração manda no semestre.
+
+Cada linha é validada (placa no formato antigo ou Mercosul, status conhecido) e comparada
+com o cadastro atual: o resultado diz quais placas serão adicionadas, alteradas e, com
+'sincronizar', removidas (as que não estão na lista). Tudo é gravado numa transação só
+(ou nada, se der erro); com 'simular' nada é gravado e só o relatório é gerado.
+
+Colunas reconhecidas (a ordem não importa, maiúsculas/acentos tanto faz):
+    placa, proprietario (ou nome/dono), tipo, categoria, status, observacao (ou obs)
+Coluna ausente ou célula vazia mantém o valor atual do veículo (ou o padrão, se for novo).
+
+Exemplos:
+    cd src
+    python importacao_frota.py ../frota_2025_2.xlsx --simular
+    python importacao_frota.py ../frota_2025_2.csv --sincronizar --categoria OFICIAL --relatorio ../diff.csv
+"""
+import argparse
+import csv
+import os
+import time
+import unicodedata
+from datetime import datetime
+
+import database_manager
+from validacao_placa import limpar_texto, placa_valida
+
+COLUNAS = ["placa", "proprietario", "tipo", "categoria", "status", "observacao"]
+SINONIMOS = {"nome": "proprietario", "dono": "proprietario", "responsavel": "proprietario",
+             "obs": "observacao", "observacoes": "observacao", "veiculo": "tipo"}
+STATUS_VALIDOS = ("AUTORIZADO", "BLOQUEADO", "SUSPEITO")
+PADROES = {"proprietario": "", "tipo": "CARRO", "categoria": "VISITANTE", "status": "AUTORIZADO", "observacao": ""}
+
+
+def _nome_coluna(cabecalho):
+    # 'Proprietário ' -> 'proprietario'
+    texto = unicodedata.normalize("NFKD", str(cabecalho or "")).encode("ascii", "ignore").decode()
+    texto = texto.strip().lower().replace(" ", "_")
+    return SINONIMOS.get(texto, texto)
+
+
+def ler_arquivo(caminho):
+    """Linhas da planilha como (número da linha, dicionário coluna -> texto)"""
+    if caminho.lower().endswith((".xlsx", ".xlsm")):
+        linhas = _linhas_xlsx(caminho)
+    else:
+        linhas = _linhas_csv(caminho)
+    cabecalho = [_nome_coluna(c) for c in next(linhas, [])]
+    if "placa" not in cabecalho:
+        raise ValueError("A planilha precisa de uma coluna 'placa'")
+    for numero, valores in enumerate(linhas, start=2):
+        if not any(valores):
+            continue
+        yield numero, {coluna: "" if valor is None else str(valor).strip()
+                       for coluna, valor in zip(cabecalho, valores) if coluna in COLUNAS}
+
+
+def _linhas_csv(caminho):
+    # utf-8-sig: arquivos salvos pelo Excel começam com BOM; o separador (; ou ,) é descoberto na primeira linha
+    with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+        primeira = arquivo.readline()
+        arquivo.seek(0)
+        separador = ";" if primeira.count(";") >= primeira.count(",") else ","
+        yield from csv.reader(arquivo, delimiter=separador)
+
+
+def _linhas_xlsx(caminho):
+    # Dependência opcional: só é importada quando alguém abre uma planilha do Excel
+    import openpyxl
+
+    # read_only lê a planilha em fluxo (não carrega dezenas de milhares de células de uma vez)
+    livro = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        yield from livro.active.iter_rows(values_only=True)
+    finally:
+        livro.close()
+
+
+def validar(linhas):
+    """
+    Normaliza as linhas; retorna (frota, erros).
+    - frota: placa normalizada -> {coluna: valor} só com as colunas preenchidas
+    - erros: [(número da linha, texto da placa, motivo)]
+    Placa repetida na planilha: vale a última linha (e a repetição entra nos erros como aviso).
+    """
+    frota, erros, linha_da_placa = {}, [], {}
+    for numero, dados in linhas:
+        original = dados.get("placa", "")
+        placa = limpar_texto(original)
+        if not placa_valida(placa):
+            erros.append((numero, original, "placa inválida"))
+            continue
+        valores = {coluna: valor for coluna, valor in dados.items() if valor and coluna != "placa"}
+        for coluna in ("tipo", "categoria", "status"):
+            if coluna in valores:
+                valores[coluna] = valores[coluna].upper()
+        if valores.get("status", "AUTORIZADO") not in STATUS_VALIDOS:
+            erros.append((numero, original, f"status desconhecido: {valores['status']}"))
+            continue
+        if placa in frota:
+            erros.append((numero, original, f"placa repetida (linha {linha_da_placa[placa]} substituída)"))
+        frota[placa] = valores
+        linha_da_placa[placa] = numero
+    return frota, erros
+
+
+def comparar(atuais, frota, sincronizar=False, categorias=None):
+    """
+    Compara a planilha com o cadastro ('atuais': placa normalizada -> tupla do banco).
+    Com 'sincronizar', os veículos fora da planilha são removidos (só os das 'categorias', se informadas).
+    """
+    adicionados, alterados, iguais = [], [], 0
+    for placa, valores in frota.items():
+        atual = atuais.get(placa)
+        if atual is None:
+            adicionados.append((placa, *(valores.get(c, PADROES[c]) for c in COLUNAS[1:])))
+            continue
+        # Mantém a placa como está gravada (ex.: 'ABC-1234'): é a chave do histórico de acessos
+        novo = (atual[0], *(valores.get(c, atual[i]) for i, c in enumerate(COLUNAS[1:], start=1)))
+        if novo != tuple(atual):
+            alterados.append((tuple(atual), novo))
+        else:
+            iguais += 1
+
+    removidos = []
+    if sincronizar:
+        escopo = {c.upper() for c in categorias} if categorias else None
+        removidos = [atual for placa, atual in atuais.items()
+                     if placa not in frota and (escopo is None or (atual[3] or "").upper() in escopo)]
+    return {"adicionados": adicionados, "alterados": alterados, "removidos": removidos, "iguais": iguais}
+
+
+def importar_frota(caminho, sincronizar=False, simular=False, categorias=None, relatorio=None):
+    """
+    Lê, valida, compara e (sem 'simular') grava numa transação.
+    Retorna (True, resultado) ou (False, mensagem de erro); 'relatorio' grava as diferenças em CSV.
+    """
+    inicio = time.perf_counter()
+    try:
+        frota, erros = validar(ler_arquivo(caminho))
+    except ImportError:
+        return False, "Ler planilhas .xlsx precisa do pacote 'openpyxl' (pip install openpyxl)"
+    except (OSError, ValueError, csv.Error) as e:
+        return False, f"Erro ao ler {caminho}: {e}"
+
+    atuais = {database_manager.normalizar_placa(v[0]): v for v in database_manager.listar_veiculos_completos()}
+    diferencas = comparar(atuais, frota, sincronizar, categorias)
+    resultado = {**diferencas, "erros": erros, "linhas_validas": len(frota), "simulacao": simular}
+
+    if not simular and (diferencas["adicionados"] or diferencas["alterados"] or diferencas["removidos"]):
+        gravar = diferencas["adicionados"] + [novo for _, novo in diferencas["alterados"]]
+        ok, msg = database_manager.aplicar_frota(gravar, [v[0] for v in diferencas["removidos"]])
+        if not ok:
+            return False, msg
+    if relatorio:
+        escrever_relatorio(resultado, relatorio)
+    resultado["segundos"] = time.perf_counter() - inicio
+    return True, resultado
+
+
+def escrever_relatorio(resultado, caminho):
+    """Uma linha por placa adicionada, alterada, removida ou com erro (CSV ';' que o Excel abre)"""
+    with open(caminho, "w", encoding="utf-8-sig", newline="") as arquivo:
+        writer = csv.writer(arquivo, delimiter=";")
+        writer.writerow(["acao", "placa", "campo", "antes", "depois"])
+        for veiculo in resultado["adicionados"]:
+            writer.writerow(["adicionado", veiculo[0], "", "", " | ".join(veiculo[1:])])
+        for antigo, novo in resultado["alterados"]:
+            for coluna, antes, depois in zip(COLUNAS[1:], antigo[1:], novo[1:]):
+                if antes != depois:
+                    writer.writerow(["alterado", novo[0], coluna, antes, depois])
+        for veiculo in resultado["removidos"]:
+            writer.writerow(["removido", veiculo[0], "", " | ".join(str(v or "") for v in veiculo[1:]), ""])
+        for numero, placa, motivo in resultado["erros"]:
+            writer.writerow(["erro", placa, f"linha {numero}", motivo, ""])
+
+
+def resumir(resultado):
+    """Texto curto para o console e para a janela de importação"""
+    acao = "seriam" if resultado["simulacao"] else "foram"
+    linhas = [
+        f"{resultado['linhas_validas']} placas válidas na planilha ({len(resultado['erros'])} linhas com problema)",
+        f"{len(resultado['adicionados'])} {acao} adicionadas, {len(resultado['alterados'])} alteradas, "
+        f"{len(resultado['removidos'])} removidas, {resultado['iguais']} sem mudança",
+    ]
+    for numero, placa, motivo in resultado["erros"][:10]:
+        linhas.append(f"  linha {numero}: {placa or '(vazia)'} - {motivo}")
+    if len(resultado["erros"]) > 10:
+        linhas.append(f"  ... e mais {len(resultado['erros']) - 10} (veja o relatório)")
+    return "\n".join(linhas)
+
+
+def nome_relatorio():
+    return os.path.join(database_manager.BASE_DIR, "..",
+                        f"importacao_frota_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa/sincroniza a frota a partir de CSV ou XLSX")
+    parser.add_argument("arquivo", help="Planilha .csv ou .xlsx com a coluna 'placa'")
+    parser.add_argument("--sincronizar", action="store_true",
+                        help="Remove do cadastro os veículos que não estão na planilha (o histórico de acessos fica)")
+    parser.add_argument("--categoria", nargs="+", default=None,
+                        help="Com --sincronizar, só remove veículos destas categorias (ex.: OFICIAL)")
+    parser.add_argument("--simular", action="store_true", help="Só mostra as diferenças, sem gravar nada")
+    parser.add_argument("--relatorio", help="CSV com as diferenças (padrão: importacao_frota_<data>.csv)")
+    parser.add_argument("--banco", default=database_manager.DB_NAME)
+    args = parser.parse_args()
+
+    database_manager.DB_NAME = args.banco
+    database_manager.inicializar_banco()
+    relatorio = args.relatorio or nome_relatorio()
+    ok, resultado = importar_frota(args.arquivo, args.sincronizar, args.simular, args.categoria, relatorio)
+    database_manager.fechar_conexoes()
+    if not ok:
+        raise SystemExit(resultado)
+    print(resumir(resultado))
+    print(f"Relatório: {os.path.abspath(relatorio)} ({resultado['segundos']:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,62 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-import cv2
-from PIL import Image, ImageTk  # Biblioteca para manipular imagens no Tkinter
 import time
 
+INICIO = time.perf_counter()  # Marca o começo da abertura do programa (medição do tempo de início)
+
+import argparse
+import bisect
+import json
+import os
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import threading
+from datetime import datetime
+
 # Importação dos módulos personalizados do seu projeto
 import database_manager
-from reconhecimento import DetectorPlaca
+import estatisticas
+import importacao_frota
+from alertas import CentralAlertas, SinkFila, criar_sinks, descrever
+from controle_acesso import ControleAcesso
+from metricas import metricas, GravadorArquivoMetricas, ServidorMetricas
+from validacao_placa import CorretorPlaca
+
+
+TAMANHO_PAGINA_TABELA = 200  # Veículos lidos do banco por vez na aba de cadastro
+CORES_ALERTA = {"bloqueado": "#C62828", "suspeito": "#EF6C00"}
 
 
 class GuaritaApp:
-    def __init__(self, window, window_title):
+    def __init__(self, window, window_title, ocr_quantizado=False, ocr_backend="easyocr", ocr_opcoes=None,
+                 ocr_processos=0, opcoes_alertas=None, fonte=0, captura=None):
         self.window = window
         self.window.title(window_title)
         self.window.geometry("1100x650")  # Tamanho inicial da janela
 
         # Garante que o banco de dados (tabelas) exista antes de começar
         database_manager.inicializar_banco()
+        # Carrega o cadastro de veículos na memória (as consultas do portão não vão ao banco)
+        database_manager.cache_veiculos.carregar()
 
         # --- Sistema de Visão (Carrega IA) ---
-        # Instancia a classe que comentamos anteriormente
-        self.detector = DetectorPlaca()
+        # OpenCV, OCR e prévia só são importados depois que a janela aparece (iniciar_visao):
+        # o cadastro e as estatísticas já podem ser usados enquanto isso
+        self.opcoes_visao = {"ocr_quantizado": ocr_quantizado, "ocr_backend": ocr_backend, "ocr_opcoes": ocr_opcoes,
+                             "ocr_processos": ocr_processos, "fonte": fonte, "captura": captura}
+        self.pool_ocr = None
+        self.detector = None
+        self.pipeline = None
+        self.previa = None
+        self.estado_modelo = None
+        self.tempo_exibicao = metricas.histograma("guarita_etapa_segundos", etapa="exibicao", faixa="monitor")
         self.camera_ativa = False
+        self.ultimo_frame_exibido = None
+
+        # Alertas de segurança sem janela modal: o reconhecimento continua enquanto o aviso está na tela.
+        # A faixa de aviso recebe pelo SinkFila; arquivo, som e webhook (opcionais) têm threads próprias
+        self.sink_tela = SinkFila()
+        self.alertas = CentralAlertas([self.sink_tela] + criar_sinks(opcoes_alertas or {}),
+                                      intervalo_repeticao=(opcoes_alertas or {}).get("intervalo_repeticao", 60))
+        self.alertas_pendentes = []  # Ainda não confirmados pelo porteiro, o mais urgente primeiro
 
         # --- Configuração das Abas (Abas de navegação no topo) ---
         self.notebook = ttk.Notebook(window)
@@ -37,24 +72,83 @@ class GuaritaApp:
         self.notebook.add(self.tab_manual, text="📝 Cadastro Manual & Frotas")
         self.setup_cadastro_manual()  # Chama função que desenha os botões dessa aba
 
+        # Aba 3: Ocupação e permanência (lidas das tabelas de resumo, não do histórico)
+        self.tab_estatisticas = tk.Frame(self.notebook)
+        self.notebook.add(self.tab_estatisticas, text="📊 Estatísticas")
+        self.setup_estatisticas()
+
         # Evento: Sempre que mudar de aba, chama a função 'on_tab_change'
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_change)
 
         # Variáveis de controle para não spamar o banco de dados
         self.delay = 15  # Atualização a cada 15ms
-        self.ultimo_registro_tempo = 0
-        self.placa_atual = None
+        self.delay_ocioso = 100  # Com a faixa vazia a câmera só entrega ~5 fps, não precisa olhar tão rápido
+        self.controle = ControleAcesso(sentido="auto", intervalo_repeticao=5)
+        self.ultima_atualizacao_stats = 0
 
         # Inicia o "Game Loop" da câmera
         self.update_camera()
+        # O after_idle só agenda: a janela termina de desenhar antes das importações pesadas
+        self.window.after_idle(self.window.after, 0, self.iniciar_visao)
         # Garante que a câmera feche se o usuário clicar no X da janela
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    def iniciar_visao(self):
+        """Cria o detector, o pipeline e a prévia (importa OpenCV/PIL e começa a carregar o OCR)"""
+        from reconhecimento import DetectorPlaca
+        from pipeline import PipelineReconhecimento
+        from movimento import DetectorMovimento
+        from previa import RenderizadorPrevia
+
+        opcoes_visao = self.opcoes_visao
+        # O modelo de OCR carrega numa thread: a janela abre na hora e o cadastro já pode ser usado
+        # O corretor confere as leituras com o cadastro (placa quase igual a uma cadastrada é ajustada)
+        corretor = CorretorPlaca(cadastro=database_manager.cache_veiculos)
+        if opcoes_visao["ocr_processos"]:
+            from processos_ocr import PoolProcessosOCR
+
+            # OCR em outros processos: o modelo carrega lá e o GIL desta janela fica livre para a interface
+            opcoes = dict(opcoes_visao["ocr_opcoes"] or {})
+            if opcoes_visao["ocr_backend"] == "easyocr":
+                opcoes.setdefault("quantizado", opcoes_visao["ocr_quantizado"])
+            self.pool_ocr = PoolProcessosOCR(opcoes_visao["ocr_backend"], opcoes,
+                                             processos=opcoes_visao["ocr_processos"])
+            self.detector = DetectorPlaca(reader=self.pool_ocr, corretor=corretor, fonte=opcoes_visao["fonte"],
+                                          captura=opcoes_visao["captura"])
+        else:
+            self.detector = DetectorPlaca(quantizado=opcoes_visao["ocr_quantizado"], carregar_em_segundo_plano=True,
+                                          backend_ocr=opcoes_visao["ocr_backend"],
+                                          opcoes_ocr=opcoes_visao["ocr_opcoes"], corretor=corretor,
+                                          fonte=opcoes_visao["fonte"], captura=opcoes_visao["captura"])
+        # Captura e OCR rodam em threads próprias; a interface só consome os resultados.
+        # Com a faixa vazia (sem movimento) o reconhecimento para e a câmera é lida mais devagar
+        self.pipeline = PipelineReconhecimento(self.detector, movimento=DetectorMovimento(roi=self.detector.roi),
+                                               nome="monitor")
+        # Reduz o frame para o tamanho da área e reaproveita a mesma imagem (prévia limitada a 20 fps)
+        self.previa = RenderizadorPrevia(self.video_label, area=self.vid_frame, fps_max=20)
+        print(f"Visão carregada {time.perf_counter() - INICIO:.1f} s após o início")
+        # A aba de monitoramento já estava aberta esperando: liga a câmera agora
+        if self.notebook.index(self.notebook.select()) == 0:
+            self.on_tab_change(None)
+
     # ================= ABA 1: MONITORAMENTO (LAYOUT) =================
     def setup_monitoramento(self):
+        # Faixa de aviso no topo (só aparece quando há alerta pendente)
+        self.frame_alerta = tk.Frame(self.tab_monitor, bg=CORES_ALERTA["bloqueado"])
+        self.lbl_alerta = tk.Label(self.frame_alerta, text="", font=("Arial", 13, "bold"), fg="white",
+                                   bg=CORES_ALERTA["bloqueado"], anchor="w")
+        self.lbl_alerta.pack(side=tk.LEFT, fill="x", expand=True, padx=10, pady=6)
+        tk.Button(self.frame_alerta, text="Ciente", command=self.confirmar_alerta,
+                  font=("Arial", 10, "bold"), width=10).pack(side=tk.RIGHT, padx=10, pady=6)
+        self.lbl_alertas_restantes = tk.Label(self.frame_alerta, text="", font=("Arial", 11, "bold"), fg="white",
+                                              bg=CORES_ALERTA["bloqueado"])
+        self.lbl_alertas_restantes.pack(side=tk.RIGHT, padx=5)
+
         # Cria o quadrado preto onde o vídeo vai aparecer
         self.vid_frame = tk.Frame(self.tab_monitor, width=700, height=500, bg="black")
         self.vid_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        # O tamanho da área vem da janela, não da imagem (a prévia se ajusta a ela)
+        self.vid_frame.pack_propagate(False)
 
         # O Label é quem segura a imagem dentro do frame
         self.video_label = tk.Label(self.vid_frame, bg="black", text="Câmera Desativada", fg="white")
@@ -70,6 +164,11 @@ class GuaritaApp:
         self.lbl_placa.pack(pady=5)
         self.lbl_info = tk.Label(self.ctrl_frame, text="Aguardando veículo...", font=("Arial", 11), bg="#f0f0f0")
         self.lbl_info.pack(pady=5)
+        self.lbl_fps = tk.Label(self.ctrl_frame, text="", font=("Arial", 9), fg="gray", bg="#f0f0f0")
+        self.lbl_fps.pack(pady=2)
+        self.lbl_modelo = tk.Label(self.ctrl_frame, text="⏳ Carregando modelo de OCR...", font=("Arial", 9, "bold"),
+                                   fg="#E65100", bg="#f0f0f0")
+        self.lbl_modelo.pack(pady=2)
 
         # Caixa de texto (Log) para histórico rápido na tela
         tk.Label(self.ctrl_frame, text="Últimos Eventos:", bg="#f0f0f0", anchor="w").pack(fill="x", padx=10)
@@ -116,6 +215,20 @@ class GuaritaApp:
                                 width=15)
         btn_excluir.pack(pady=2)
 
+        btn_importar = tk.Button(btn_frame, text="📥 Importar Frota", command=self.importar_frota, bg="#2196F3",
+                                 fg="white", width=15)
+        btn_importar.pack(pady=2)
+
+        # Busca (começo da placa ou do nome); espera o usuário parar de digitar para consultar
+        busca_frame = tk.Frame(self.tab_manual)
+        busca_frame.pack(fill="x", padx=10)
+        tk.Label(busca_frame, text="🔍 Buscar placa ou proprietário:").pack(side=tk.LEFT)
+        self.busca_tabela = tk.StringVar()
+        tk.Entry(busca_frame, textvariable=self.busca_tabela, width=30).pack(side=tk.LEFT, padx=5)
+        self.busca_tabela.trace_add("write", lambda *_: self.agendar_busca_tabela())
+        self.lbl_total_tabela = tk.Label(busca_frame, text="", fg="gray")
+        self.lbl_total_tabela.pack(side=tk.RIGHT)
+
         # Tabela (Treeview) para listar o banco de dados
         table_frame = tk.LabelFrame(self.tab_manual, text="Veículos Cadastrados", padx=10, pady=10)
         table_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -127,10 +240,16 @@ class GuaritaApp:
             self.tree.column(col, width=150)
         self.tree.pack(fill="both", expand=True, side=tk.LEFT)
 
-        # Barra de rolagem lateral
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill="y")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Barra de rolagem lateral (ao chegar perto do fim, carrega a próxima página)
+        self.scroll_tabela = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.scroll_tabela.pack(side=tk.RIGHT, fill="y")
+        self.tree.configure(yscrollcommand=self.on_rolagem_tabela)
+
+        # A tabela guarda só as páginas já vistas (linhas identificadas pela placa)
+        self.tabela_ultima_placa = None
+        self.tabela_completa = False
+        self.pagina_agendada = False
+        self.busca_agendada = None
 
         btn_refresh = tk.Button(self.tab_manual, text="🔄 Atualizar Lista", command=self.atualizar_tabela)
         btn_refresh.pack(pady=5)
@@ -138,85 +257,243 @@ class GuaritaApp:
         # Evento: Se der duplo clique na linha da tabela, preenche o formulário
         self.tree.bind("<Double-1>", self.on_tabela_click)
 
+    # ================= ABA 3: ESTATÍSTICAS (LAYOUT) =================
+    def setup_estatisticas(self):
+        topo = tk.Frame(self.tab_estatisticas)
+        topo.pack(fill="x", padx=10, pady=10)
+        self.lbl_ocupacao = tk.Label(topo, text="No campus agora: ---", font=("Arial", 20, "bold"), fg="blue")
+        self.lbl_ocupacao.pack(side=tk.LEFT)
+        tk.Button(topo, text="🔄 Atualizar", command=self.atualizar_estatisticas).pack(side=tk.RIGHT)
+        self.lbl_ocupacao_categorias = tk.Label(self.tab_estatisticas, text="", font=("Arial", 11), anchor="w")
+        self.lbl_ocupacao_categorias.pack(fill="x", padx=10)
+
+        # Gráfico de barras: entradas (azul) e saídas (laranja) de cada hora de hoje
+        self.frame_horas = tk.LabelFrame(self.tab_estatisticas, text="Movimento por hora (hoje)", padx=10, pady=5)
+        self.frame_horas.pack(fill="both", expand=True, padx=10, pady=5)
+        self.canvas_horas = tk.Canvas(self.frame_horas, height=180, bg="white", highlightthickness=0)
+        self.canvas_horas.pack(fill="both", expand=True)
+        self.canvas_horas.bind("<Configure>", lambda _: self.desenhar_horas())
+        self.movimento_horas = [(0, 0)] * 24
+        self.estatisticas_agendada = None
+
+        baixo = tk.Frame(self.tab_estatisticas)
+        baixo.pack(fill="both", expand=True, padx=10, pady=5)
+        self.frame_permanencia = tk.LabelFrame(baixo, text="Permanência por categoria (7 dias)", padx=10, pady=5)
+        self.frame_permanencia.pack(side=tk.LEFT, fill="both", expand=True)
+        cols = ("Categoria", "Visitas", "Média", "Máxima")
+        self.tree_permanencia = ttk.Treeview(self.frame_permanencia, columns=cols, show="headings", height=6)
+        for col in cols:
+            self.tree_permanencia.heading(col, text=col)
+            self.tree_permanencia.column(col, width=110)
+        self.tree_permanencia.pack(fill="both", expand=True)
+
+        frame_faixas = tk.LabelFrame(baixo, text="Tempo de permanência (7 dias)", padx=10, pady=5)
+        frame_faixas.pack(side=tk.RIGHT, fill="both", padx=(10, 0))
+        self.tree_faixas = ttk.Treeview(frame_faixas, columns=("Faixa", "Visitas"), show="headings", height=9)
+        for col in ("Faixa", "Visitas"):
+            self.tree_faixas.heading(col, text=col)
+            self.tree_faixas.column(col, width=100)
+        self.tree_faixas.pack(fill="both", expand=True)
+
+    def atualizar_estatisticas(self):
+        """Relê os resumos (poucas linhas, instantâneo mesmo com anos de histórico)"""
+        dados = database_manager.estatisticas_acessos()
+        self.lbl_ocupacao.config(text=f"No campus agora: {dados['dentro']}")
+        por_categoria = dados["dentro_por_categoria"].items()
+        self.lbl_ocupacao_categorias.config(text="   ".join(f"{categoria}: {quantidade}"
+                                                           for categoria, quantidade in por_categoria))
+        self.frame_horas.config(text=f"Movimento por hora (hoje): {dados['entradas_dia']} entradas, "
+                                     f"{dados['saidas_dia']} saídas")
+        self.movimento_horas = dados["por_hora"]
+        self.desenhar_horas()
+
+        self.tree_permanencia.delete(*self.tree_permanencia.get_children())
+        for categoria, valores in dados["permanencia"].items():
+            self.tree_permanencia.insert("", "end", values=(categoria, valores["visitas"],
+                                                            estatisticas.formatar_duracao(valores["media_s"]),
+                                                            estatisticas.formatar_duracao(valores["maximo_s"])))
+        self.tree_faixas.delete(*self.tree_faixas.get_children())
+        for rotulo, visitas in dados["histograma_permanencia"]:
+            self.tree_faixas.insert("", "end", values=(rotulo, visitas))
+
+        # Enquanto a aba estiver aberta, acompanha o movimento (um agendamento só, mesmo clicando em Atualizar)
+        if self.estatisticas_agendada is not None:
+            self.window.after_cancel(self.estatisticas_agendada)
+        self.estatisticas_agendada = self.window.after(5000, self.atualizar_estatisticas_se_visivel)
+
+    def atualizar_estatisticas_se_visivel(self):
+        self.estatisticas_agendada = None
+        if self.notebook.index(self.notebook.select()) == 2:
+            self.atualizar_estatisticas()
+
+    def desenhar_horas(self):
+        canvas = self.canvas_horas
+        canvas.delete("all")
+        largura, altura = canvas.winfo_width(), canvas.winfo_height()
+        if largura <= 1:
+            return
+        maior = max(1, max(max(hora) for hora in self.movimento_horas))
+        passo = largura / 24
+        base = altura - 15  # Espaço para as horas embaixo
+        for hora, (entradas, saidas) in enumerate(self.movimento_horas):
+            x = hora * passo
+            for i, (valor, cor) in enumerate(((entradas, "#2196F3"), (saidas, "#FF9800"))):
+                topo = base - (base - 10) * valor / maior
+                canvas.create_rectangle(x + 2 + i * passo / 2.5, topo, x + (i + 1) * passo / 2.5, base,
+                                        fill=cor, outline="")
+            canvas.create_text(x + passo / 2.5, altura - 7, text=f"{hora:02d}", font=("Arial", 7))
+
     # ================= LÓGICA DE CONTROLE =================
     def on_tab_change(self, event):
         """Gerencia performance: Liga a câmera só na aba certa"""
         tab_id = self.notebook.index(self.notebook.select())
 
         if tab_id == 0:  # Aba Monitoramento
+            if self.pipeline is None:
+                return  # Visão ainda carregando: o iniciar_visao liga a câmera quando terminar
             print("Entrando em Monitoramento: Ligando Câmera...")
-            self.detector.conectar_camera()
-            self.camera_ativa = True
+            self.camera_ativa = self.pipeline.iniciar()
+            if not self.camera_ativa:
+                # A captura anterior ainda está saindo (câmera de rede travada): tenta de novo daqui a pouco
+                self.window.after(500, self.on_tab_change, None)
         else:  # Aba Manual (ou qualquer outra)
             print("Entrando em Cadastro Manual: Desligando Câmera...")
-            self.detector.desconectar_camera()
             self.camera_ativa = False
-            # Limpa a imagem da tela
-            self.video_label.config(image='', text="Câmera Pausada (Economia de Energia)", bg="#101010")
-            # Aproveita para atualizar a lista de carros cadastrados
-            self.atualizar_tabela()
+            self.ultimo_frame_exibido = None
+            if self.pipeline is not None:
+                self.pipeline.parar()
+                # Limpa a imagem da tela
+                self.previa.limpar("Câmera Pausada (Economia de Energia)")
+            self.video_label.config(bg="#101010")
+            # Aproveita para atualizar a lista de carros cadastrados (ou as estatísticas)
+            if tab_id == 2:
+                self.atualizar_estatisticas()
+            else:
+                self.atualizar_tabela()
 
     def update_camera(self):
-        """Loop principal que roda a cada 15ms"""
+        """Loop principal que roda a cada 15ms (só exibe; captura e OCR estão no pipeline)"""
         if self.camera_ativa:
-            # Pede para a classe DetectorPlaca pegar um frame
-            frame = self.detector.ler_frame()
-
-            if frame is not None:
-                # Chama a IA para processar (Detectar retângulo e ler texto)
-                frame_processado, texto, _ = self.detector.processar(frame)
-
-                # --- Conversão Importante ---
-                # OpenCV usa BGR (Blue Green Red)
-                # Tkinter usa RGB (Red Green Blue)
-                cv2image = cv2.cvtColor(frame_processado, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(cv2image)
-                imgtk = ImageTk.PhotoImage(image=img)
-
-                # Atualiza o Label da interface com a nova foto
-                self.video_label.imgtk = imgtk
-                self.video_label.configure(image=imgtk)
-
-                # Se leu algum texto, roda a lógica de acesso
-                if texto:
-                    self.processar_logica_monitor(texto)
+            # Placas que a thread de reconhecimento leu desde a última volta
+            for resultado in self.pipeline.pegar_resultados():
+                self.processar_logica_monitor(resultado["texto"])
+
+            item = self.pipeline.ultimo_frame()
+            if item is not None:
+                frame_id, _, frame = item
+                # Só redesenha se a câmera entregou um frame novo (e a prévia não estiver no limite de fps)
+                if frame_id != self.ultimo_frame_exibido:
+                    inicio = time.perf_counter()
+                    if self.exibir_frame(frame):
+                        self.ultimo_frame_exibido = frame_id
+                        self.tempo_exibicao.observar(time.perf_counter() - inicio)
             else:
                 self.video_label.config(text="Câmera Conectada - Aguardando Imagem...")
 
+            self.atualizar_stats()
+
+        self.atualizar_alertas()
+        self.atualizar_estado_modelo()
         # Agenda a própria função para rodar novamente em 'self.delay' ms
-        self.window.after(self.delay, self.update_camera)
+        delay = self.delay_ocioso if self.camera_ativa and self.pipeline.ocioso else self.delay
+        self.window.after(delay, self.update_camera)
+
+    def exibir_frame(self, frame):
+        """Mostra o frame com a última detecção; retorna False se a prévia pulou este frame (limite de fps)"""
+        deteccao = self.pipeline.ultima_deteccao()
+        if deteccao and time.time() - deteccao["timestamp"] >= 0.5:
+            deteccao = None  # Detecção velha: o carro já pode ter saído dali
+        if not self.previa.exibir(frame, deteccao):
+            return False
+        self.pipeline.registrar_exibicao()
+        return True
+
+    def atualizar_alertas(self):
+        """Traz os alertas novos da central para a faixa de aviso (sem bloquear a janela)"""
+        novos = self.sink_tela.pegar()
+        if not novos:
+            return
+        self.alertas_pendentes.extend(novos)
+        self.alertas_pendentes.sort(key=lambda alerta: (alerta.prioridade, alerta.momento))
+        self.window.bell()
+        self.mostrar_alerta()
+
+    def mostrar_alerta(self):
+        if not self.alertas_pendentes:
+            self.frame_alerta.pack_forget()
+            return
+        alerta = self.alertas_pendentes[0]
+        cor = CORES_ALERTA.get(alerta.tipo, CORES_ALERTA["suspeito"])
+        icone = "🚨" if alerta.tipo == "bloqueado" else "⚠️"
+        for widget in (self.frame_alerta, self.lbl_alerta, self.lbl_alertas_restantes):
+            widget.config(bg=cor)
+        self.lbl_alerta.config(text=f"{icone} {descrever(alerta)}")
+        restantes = len(self.alertas_pendentes) - 1
+        self.lbl_alertas_restantes.config(text=f"+{restantes}" if restantes else "")
+        if not self.frame_alerta.winfo_ismapped():
+            self.frame_alerta.pack(side=tk.TOP, fill="x", before=self.vid_frame)
+
+    def confirmar_alerta(self):
+        """Botão 'Ciente': tira o alerta da tela e mostra o próximo, se houver"""
+        if self.alertas_pendentes:
+            self.alertas_pendentes.pop(0)
+        self.mostrar_alerta()
+
+    def atualizar_estado_modelo(self):
+        """Troca o aviso de 'carregando' quando a thread do modelo termina"""
+        if self.estado_modelo is not None or self.detector is None:
+            return
+        if self.detector.modelo_pronto:
+            self.estado_modelo = "pronto"
+            print(f"Modelo OCR pronto {time.perf_counter() - INICIO:.1f} s após o início")
+            self.lbl_modelo.pack_forget()
+        elif self.detector.erro_modelo is not None or getattr(self.pool_ocr, "erro_carga", None):
+            self.estado_modelo = "erro"
+            self.lbl_modelo.config(text="⚠ OCR indisponível (veja o console)", fg="red")
+
+    def atualizar_stats(self):
+        # Atualiza o rodapé de FPS no máximo uma vez por segundo
+        if time.time() - self.ultima_atualizacao_stats < 1:
+            return
+        self.ultima_atualizacao_stats = time.time()
+        stats = self.pipeline.estatisticas()
+        self.lbl_fps.config(text=f"Câmera: {stats['fps_captura']:.0f} fps | "
+                                 f"OCR: {stats['fps_processamento']:.1f} fps | "
+                                 f"Tela: {stats['fps_exibicao']:.0f} fps ({self.previa.tempo_medio_ms:.1f} ms)"
+                                 f"{' | Faixa vazia' if stats['ocioso'] else ''}")
 
     def processar_logica_monitor(self, placa):
-        # Filtro de tempo: Se for a mesma placa que lemos há menos de 5 segundos, ignora
-        if placa == self.placa_atual and (time.time() - self.ultimo_registro_tempo < 5):
+        # A regra de negócio (filtro de repetição, cadastro, entrada/saída) fica no ControleAcesso
+        decisao = self.controle.processar(placa)
+        acao = decisao["acao"]
+        if acao is None:
             return
 
-        self.placa_atual = placa
-        self.ultimo_registro_tempo = time.time()
         self.lbl_placa.config(text=placa)
 
-        # Busca no banco
-        veiculo = database_manager.buscar_veiculo(placa)
-
-        if veiculo:
-            status = veiculo[4]  # Coluna 4 é o status
-            self.lbl_info.config(text=f"Status: {status}", fg="red" if status == "BLOQUEADO" else "green")
-
-            if status == "BLOQUEADO":
-                self.log(f"🚨 ALERTA: VEÍCULO BLOQUEADO {placa}")
-                messagebox.showwarning("SEGURANÇA", f"Veículo {placa} BLOQUEADO tentou acessar!")
-            else:
-                # Tenta registrar entrada. Se já estiver dentro, registra saída.
-                sucesso, msg = database_manager.registrar_entrada(placa)
-                if not sucesso:
-                    # Se falhou a entrada (provavelmente porque já está dentro), tenta saída
-                    sucesso_saida, msg_saida = database_manager.registrar_saida(placa)
-                    self.log(f"⬅️ Saída {placa}: {msg_saida}")
-                else:
-                    self.log(f"➡️ Entrada {placa}: {msg}")
-        else:
+        if acao == "desconhecido":
             self.lbl_info.config(text="Não Cadastrado", fg="orange")
             self.log(f"⚠️ Visitante desconhecido: {placa}")
+            return
+
+        status = decisao["veiculo"][4]  # Coluna 4 é o status
+        cor = {"BLOQUEADO": "red", "SUSPEITO": "orange"}.get(status, "green")
+        self.lbl_info.config(text=f"Status: {status}", fg=cor)
+
+        if decisao["alerta"]:
+            # Vai para a faixa de aviso (e som/arquivo/webhook); repetições da mesma placa são filtradas
+            self.alertas.emitir(decisao["alerta"], placa, decisao["mensagem"])
+        if acao == "bloqueado":
+            self.log(f"🚨 ALERTA: VEÍCULO BLOQUEADO {placa}")
+        elif acao == "entrada":
+            self.log(f"➡️ Entrada {placa}: {decisao['mensagem']}")
+        elif acao == "saida":
+            self.log(f"⬅️ Saída {placa}: {decisao['mensagem']}")
+        elif acao == "recusado":
+            # O banco não aceitou o movimento (ex.: entrada de quem já está dentro na faixa só de entrada)
+            self.log(f"⛔ Recusado {placa}: {decisao['mensagem']}")
+        else:
+            self.log(f"❔ {acao} {placa}: {decisao['mensagem']}")
 
     # ================= LÓGICA MANUAL =================
     def salvar_manual(self):
@@ -233,7 +510,7 @@ class GuaritaApp:
         # Chama o banco de dados
         if database_manager.cadastrar_veiculo(placa, prop, "CARRO", cat, status):
             messagebox.showinfo("Sucesso", f"Veículo {placa} salvo!")
-            self.atualizar_tabela()
+            self.atualizar_linha_tabela(placa)
             # Limpar campos
             self.ent_man_placa.delete(0, tk.END)
             self.ent_man_prop.delete(0, tk.END)
@@ -253,20 +530,70 @@ class GuaritaApp:
         if resposta:
             if database_manager.excluir_veiculo(placa):
                 messagebox.showinfo("Sucesso", f"Veículo {placa} removido.")
-                self.atualizar_tabela()
+                self.atualizar_linha_tabela(placa)
                 self.ent_man_placa.delete(0, tk.END)
                 self.ent_man_prop.delete(0, tk.END)
             else:
                 messagebox.showerror("Erro", "Falha ao excluir. Verifique se a placa está correta.")
 
     def atualizar_tabela(self):
-        # Remove tudo da tabela visual e preenche de novo com dados do banco
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-
-        dados = database_manager.listar_todos_veiculos()
-        for row in dados:
-            self.tree.insert("", tk.END, values=row)
+        """Recomeça a tabela do início: só a primeira página vem do banco, o resto ao rolar"""
+        self.tree.delete(*self.tree.get_children())
+        self.tabela_ultima_placa = None
+        self.tabela_completa = False
+        self.carregar_proxima_pagina()
+
+    def carregar_proxima_pagina(self):
+        self.pagina_agendada = False
+        if self.tabela_completa:
+            return
+        linhas = database_manager.listar_veiculos(self.tabela_ultima_placa, TAMANHO_PAGINA_TABELA,
+                                                  self.busca_tabela.get())
+        for row in linhas:
+            self.tree.insert("", tk.END, iid=row[0], values=row)
+        if linhas:
+            self.tabela_ultima_placa = linhas[-1][0]
+        self.tabela_completa = len(linhas) < TAMANHO_PAGINA_TABELA
+        self.atualizar_total_tabela()
+
+    def atualizar_linha_tabela(self, placa):
+        """Depois de salvar ou excluir, mexe só na linha desse veículo"""
+        placa = placa.upper()
+        row = database_manager.obter_veiculo(placa, self.busca_tabela.get())
+        if row is None:
+            # Excluído (ou não aparece mais na busca atual)
+            if self.tree.exists(placa):
+                self.tree.delete(placa)
+        elif self.tree.exists(placa):
+            self.tree.item(placa, values=row)
+        elif self.tabela_completa or (self.tabela_ultima_placa is not None and placa < self.tabela_ultima_placa):
+            # Veículo novo dentro do trecho já carregado: entra na posição certa (ordem de placa).
+            # Depois do trecho carregado ele aparece sozinho quando a página dele for lida
+            posicao = bisect.bisect(self.tree.get_children(), placa)
+            self.tree.insert("", posicao, iid=placa, values=row)
+            self.tree.see(placa)
+        self.atualizar_total_tabela()
+
+    def atualizar_total_tabela(self):
+        total = database_manager.contar_veiculos(self.busca_tabela.get())
+        self.lbl_total_tabela.config(text=f"Mostrando {len(self.tree.get_children())} de {total} veículos")
+
+    def on_rolagem_tabela(self, primeiro, ultimo):
+        self.scroll_tabela.set(primeiro, ultimo)
+        # Falta pouco para o fim do que já foi carregado: busca mais uma página
+        if float(ultimo) > 0.9 and not self.tabela_completa and not self.pagina_agendada:
+            self.pagina_agendada = True
+            self.window.after_idle(self.carregar_proxima_pagina)
+
+    def agendar_busca_tabela(self):
+        # Só consulta 300 ms depois da última tecla (não a cada letra digitada)
+        if self.busca_agendada is not None:
+            self.window.after_cancel(self.busca_agendada)
+        self.busca_agendada = self.window.after(300, self.executar_busca_tabela)
+
+    def executar_busca_tabela(self):
+        self.busca_agendada = None
+        self.atualizar_tabela()
 
     def on_tabela_click(self, event):
         # Pega a linha clicada e joga os dados nos campos de edição
@@ -287,19 +614,225 @@ class GuaritaApp:
         self.txt_log.see(tk.END)
 
     def gerar_relatorio(self):
-        sucesso, msg = database_manager.exportar_relatorio()
-        if sucesso:
-            messagebox.showinfo("Relatório", f"Salvo em:\n{msg}")
-        else:
-            messagebox.showerror("Erro", msg)
+        """Abre a janela de filtros; a exportação roda em segundo plano"""
+        janela = tk.Toplevel(self.window)
+        janela.title("Relatório de Acessos")
+        janela.transient(self.window)
+        janela.resizable(False, False)
+
+        filtros = tk.LabelFrame(janela, text="Filtros (deixe em branco para trazer tudo)", padx=10, pady=10)
+        filtros.pack(fill="x", padx=10, pady=10)
+
+        tk.Label(filtros, text="Data inicial (AAAA-MM-DD):").grid(row=0, column=0, sticky="w")
+        ent_inicio = tk.Entry(filtros, width=12)
+        ent_inicio.grid(row=0, column=1, sticky="w", padx=5, pady=2)
+
+        tk.Label(filtros, text="Data final (AAAA-MM-DD):").grid(row=1, column=0, sticky="w")
+        ent_fim = tk.Entry(filtros, width=12)
+        ent_fim.grid(row=1, column=1, sticky="w", padx=5, pady=2)
+
+        tk.Label(filtros, text="Placa:").grid(row=2, column=0, sticky="w")
+        ent_placa = tk.Entry(filtros, width=12)
+        ent_placa.grid(row=2, column=1, sticky="w", padx=5, pady=2)
+
+        tk.Label(filtros, text="Categoria:").grid(row=3, column=0, sticky="w")
+        cb_categoria = ttk.Combobox(filtros, values=["", "VISITANTE", "PARTICULAR", "OFICIAL"], width=12)
+        cb_categoria.grid(row=3, column=1, sticky="w", padx=5, pady=2)
+
+        tk.Label(filtros, text="Formato:").grid(row=4, column=0, sticky="w")
+        cb_formato = ttk.Combobox(filtros, values=database_manager.FORMATOS_RELATORIO, width=12, state="readonly")
+        cb_formato.set("csv")
+        cb_formato.grid(row=4, column=1, sticky="w", padx=5, pady=2)
+
+        barra = ttk.Progressbar(janela, length=320, mode="determinate")
+        barra.pack(padx=10, pady=5)
+        lbl_status = tk.Label(janela, text="")
+        lbl_status.pack()
+
+        # Estado compartilhado com a thread de exportação (ela não pode mexer nos widgets)
+        estado = {"feitas": 0, "total": 0, "cancelar": False, "resultado": None}
+
+        def progresso(feitas, total):
+            estado["feitas"], estado["total"] = feitas, total
+            return not estado["cancelar"]
+
+        def acompanhar():
+            if estado["total"]:
+                barra["value"] = 100 * estado["feitas"] / estado["total"]
+                lbl_status.config(text=f"{estado['feitas']} de {estado['total']} registros")
+            if estado["resultado"] is None:
+                self.window.after(100, acompanhar)
+                return
+
+            sucesso, msg = estado["resultado"]
+            janela.destroy()
+            if sucesso:
+                messagebox.showinfo("Relatório", f"Salvo em:\n{msg}")
+            elif not estado["cancelar"]:
+                messagebox.showerror("Erro", msg)
+
+        def exportar():
+            inicio, fim = ent_inicio.get().strip(), ent_fim.get().strip()
+            for data in (inicio, fim):
+                if data:
+                    try:
+                        datetime.strptime(data, "%Y-%m-%d")
+                    except ValueError:
+                        messagebox.showerror("Erro", f"Data inválida: {data}", parent=janela)
+                        return
+
+            btn_exportar.config(state="disabled")
+            lbl_status.config(text="Exportando...")
+            opcoes = dict(data_inicio=inicio or None, data_fim=fim or None,
+                          placa=ent_placa.get().strip() or None, categoria=cb_categoria.get() or None,
+                          formato=cb_formato.get(), progresso=progresso)
+
+            def tarefa():
+                estado["resultado"] = database_manager.exportar_relatorio(**opcoes)
+
+            threading.Thread(target=tarefa, name="relatorio", daemon=True).start()
+            acompanhar()
+
+        def cancelar():
+            # Se estiver exportando, o progresso devolve False e a thread apaga o arquivo parcial
+            estado["cancelar"] = True
+            if btn_exportar["state"] != "disabled":
+                janela.destroy()
+
+        btn_frame = tk.Frame(janela)
+        btn_frame.pack(pady=10)
+        btn_exportar = tk.Button(btn_frame, text="📄 Exportar", command=exportar, bg="#2196F3", fg="white", width=12)
+        btn_exportar.pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cancelar", command=cancelar, width=12).pack(side=tk.LEFT, padx=5)
+        janela.protocol("WM_DELETE_WINDOW", cancelar)
+
+    def importar_frota(self):
+        """Importa/sincroniza a lista da frota (CSV ou XLSX): primeiro simula, depois aplica"""
+        caminho = filedialog.askopenfilename(parent=self.window, title="Lista da frota",
+                                             filetypes=[("Planilhas", "*.csv *.xlsx"), ("Todos os arquivos", "*.*")])
+        if not caminho:
+            return
+
+        janela = tk.Toplevel(self.window)
+        janela.title("Importar Frota")
+        janela.transient(self.window)
+
+        tk.Label(janela, text=caminho, fg="gray").pack(padx=10, pady=(10, 0), anchor="w")
+        opcoes = tk.LabelFrame(janela, text="Opções", padx=10, pady=5)
+        opcoes.pack(fill="x", padx=10, pady=5)
+        sincronizar = tk.BooleanVar(value=False)
+        tk.Checkbutton(opcoes, text="Remover do cadastro os veículos que não estão na lista",
+                       variable=sincronizar).grid(row=0, column=0, columnspan=2, sticky="w")
+        tk.Label(opcoes, text="Só remover das categorias (separadas por vírgula):").grid(row=1, column=0, sticky="w")
+        ent_categorias = tk.Entry(opcoes, width=25)
+        ent_categorias.grid(row=1, column=1, sticky="w", padx=5)
+
+        txt_resultado = tk.Text(janela, height=14, width=80)
+        txt_resultado.pack(padx=10, pady=5)
+        txt_resultado.insert(tk.END, "Clique em Simular para ver as diferenças antes de gravar.")
+
+        # Estado compartilhado com a thread (ela não pode mexer nos widgets)
+        estado = {"resultado": None}
+
+        def acompanhar(simular):
+            if estado["resultado"] is None:
+                self.window.after(100, acompanhar, simular)
+                return
+            ok, resultado = estado["resultado"]
+            txt_resultado.delete("1.0", tk.END)
+            btn_simular.config(state="normal")
+            if not ok:
+                txt_resultado.insert(tk.END, resultado)
+                return
+            txt_resultado.insert(tk.END, f"{importacao_frota.resumir(resultado)}\n\n"
+                                         f"Relatório: {os.path.abspath(resultado['relatorio'])}")
+            if simular:
+                btn_aplicar.config(state="normal")
+            else:
+                # Depois de gravar, só simulando de novo (evita aplicar duas vezes)
+                self.atualizar_tabela()
+
+        def executar(simular):
+            categorias = [c.strip() for c in ent_categorias.get().split(",") if c.strip()] or None
+            relatorio = importacao_frota.nome_relatorio()
+            argumentos = (caminho, sincronizar.get(), simular, categorias, relatorio)
+            if not simular and sincronizar.get():
+                if not messagebox.askyesno("Confirmar", "Remover do cadastro os veículos fora da lista?",
+                                           parent=janela):
+                    return
+            btn_simular.config(state="disabled")
+            btn_aplicar.config(state="disabled")
+            txt_resultado.delete("1.0", tk.END)
+            txt_resultado.insert(tk.END, "Simulando..." if simular else "Gravando...")
+            estado["resultado"] = None
+
+            def tarefa():
+                ok, resultado = importacao_frota.importar_frota(*argumentos)
+                if ok:
+                    resultado["relatorio"] = relatorio
+                estado["resultado"] = (ok, resultado)
+
+            threading.Thread(target=tarefa, name="importar-frota", daemon=True).start()
+            acompanhar(simular)
+
+        btn_frame = tk.Frame(janela)
+        btn_frame.pack(pady=10)
+        btn_simular = tk.Button(btn_frame, text="🔍 Simular", command=lambda: executar(True), width=12)
+        btn_simular.pack(side=tk.LEFT, padx=5)
+        btn_aplicar = tk.Button(btn_frame, text="💾 Aplicar", command=lambda: executar(False), bg="#4CAF50",
+                                fg="white", width=12, state="disabled")
+        btn_aplicar.pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Fechar", command=janela.destroy, width=12).pack(side=tk.LEFT, padx=5)
 
     def on_closing(self):
-        # Limpeza final ao fechar o app
-        self.detector.desconectar_camera()
+        # Limpeza final ao fechar o app (para as threads antes de soltar a câmera)
+        if self.pipeline is not None:
+            self.pipeline.parar()
+        # Garante que as entradas/saídas ainda na fila de gravação cheguem ao banco
+        database_manager.gravador_acessos.encerrar()
+        database_manager.fechar_conexoes()
+        if self.pool_ocr is not None:
+            self.pool_ocr.encerrar()
+        self.alertas.encerrar(timeout=1)
         self.window.destroy()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sistema Guarita - interface gráfica")
+    parser.add_argument("--ocr-quantizado", action="store_true",
+                        help="Usa o modelo de OCR quantizado (carrega e roda mais rápido na CPU)")
+    parser.add_argument("--ocr-backend", choices=["easyocr", "onnx", "tesseract"], default="easyocr",
+                        help="Motor de OCR (ver backends_ocr.py)")
+    parser.add_argument("--ocr-opcoes", type=json.loads, default=None,
+                        help='Opções do motor em JSON, ex.: \'{"modelo": "../modelos/reconhecedor.onnx", '
+                             '"caracteres": "../modelos/reconhecedor.txt"}\'')
+    parser.add_argument("--ocr-processos", type=int, default=0,
+                        help="Roda o OCR em N processos separados (libera a interface e usa mais núcleos)")
+    parser.add_argument("--metricas-porta", type=int, default=None,
+                        help="Publica as métricas em http://127.0.0.1:PORTA/metrics (formato Prometheus)")
+    parser.add_argument("--metricas-arquivo", default=None,
+                        help="Grava um resumo das métricas a cada minuto neste arquivo (com rotação)")
+    parser.add_argument("--fonte", default="0", help="Câmera (índice), URL RTSP, vídeo ou pasta de imagens")
+    parser.add_argument("--captura", type=json.loads, default=None,
+                        help='Modo de baixa latência, ex.: \'{"largura": 1280, "altura": 720, "fps": 30, '
+                             '"fourcc": "MJPG", "buffer": 1}\' (use \'{}\' só para ler sempre o frame mais novo)')
+    parser.add_argument("--alertas-arquivo", default=None,
+                        help="Grava os alertas (BLOQUEADO/SUSPEITO) neste arquivo, uma linha JSON por alerta")
+    parser.add_argument("--alertas-webhook", default=None,
+                        help="Envia cada alerta por POST (JSON) para este endereço, ex.: http://127.0.0.1:8080/alerta")
+    parser.add_argument("--alertas-som", nargs="?", const=True, default=None,
+                        help="Toca um som a cada alerta (sem valor: bipe do sistema; ou o comando a executar)")
+    args = parser.parse_args()
+
+    servidor_metricas = ServidorMetricas(porta=args.metricas_porta) if args.metricas_porta else None
+    arquivo_metricas = GravadorArquivoMetricas(args.metricas_arquivo) if args.metricas_arquivo else None
+
     root = tk.Tk()
-    app = GuaritaApp(root, "Sistema Guarita IFSULDEMINAS v2.0")
+    app = GuaritaApp(root, "Sistema Guarita IFSULDEMINAS v2.0", ocr_quantizado=args.ocr_quantizado,
+                     ocr_backend=args.ocr_backend, ocr_opcoes=args.ocr_opcoes, ocr_processos=args.ocr_processos,
+                     opcoes_alertas={"arquivo": args.alertas_arquivo, "webhook": args.alertas_webhook,
+                                     "som": args.alertas_som},
+                     fonte=args.fonte, captura=args.captura)
+    # Roda quando a janela terminou de desenhar pela primeira vez
+    root.after_idle(lambda: print(f"Interface pronta em {time.perf_counter() - INICIO:.2f} s"))
     root.mainloop()
\ No newline at end of file
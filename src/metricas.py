@@ -0,0 +1,240 @@
+"""
+Métricas internas da guarita (tempos por etapa, contadores e filas).
+
+Tudo fica num Registro em memória (o 'metricas' deste módulo). Gravar uma
+medida custa só um bisect e um lock, então pode ficar sempre ligado.
+Para ver os números:
+    - ServidorMetricas: endereço HTTP local no formato texto do Prometheus (/metrics)
+    - GravadorArquivoMetricas: uma linha JSON por intervalo num arquivo com rotação
+
+Exemplo:
+    with metricas.cronometro("guarita_etapa_segundos", etapa="ocr"):
+        reader.readtext(imagem)
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+# Limites dos baldes dos histogramas de tempo (segundos): de 0,5 ms a 5 s
+LIMITES_TEMPO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+AJUDA = {
+    "guarita_etapa_segundos": "Tempo de cada etapa do reconhecimento e do banco",
+    "guarita_frames_total": "Frames capturados, processados, descartados (fila e câmera) e sem movimento",
+    "guarita_candidatos_total": "Frames em que um retângulo de placa foi encontrado",
+    "guarita_ocr_total": "Chamadas ao OCR executadas e evitadas pelo rastreador",
+    "guarita_placas_total": "Leituras do OCR aceitas ou rejeitadas pela validação",
+    "guarita_decisoes_total": "Decisões do portão por ação",
+    "guarita_fila": "Itens esperando em cada fila",
+    "guarita_acessos_gravados_total": "Eventos de acesso gravados no banco",
+    "guarita_alertas_total": "Alertas de segurança emitidos por tipo",
+}
+
+
+def _rotulos_texto(rotulos):
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{chave}="{valor}"' for chave, valor in rotulos) + "}"
+
+
+class Histograma:
+    def __init__(self, limites=LIMITES_TEMPO):
+        self.limites = limites
+        self.baldes = [0] * (len(limites) + 1)  # O último é o "+Inf"
+        self.soma = 0.0
+        self.contagem = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            self.baldes[indice] += 1
+            self.soma += valor
+            self.contagem += 1
+
+    def copia(self):
+        with self._lock:
+            return list(self.baldes), self.soma, self.contagem
+
+
+class Contador:
+    def __init__(self):
+        self.valor = 0
+        self._lock = threading.Lock()
+
+    def incrementar(self, quantidade=1):
+        with self._lock:
+            self.valor += quantidade
+
+
+class Registro:
+    """
+    Guarda as séries por (nome, rótulos). Além de histogramas e contadores,
+    aceita funções que leem na hora um valor que já existe em outro objeto
+    (ex.: tamanho de uma fila), sem custo nenhum fora da coleta.
+    """
+
+    def __init__(self):
+        self._series = {}  # (nome, rótulos) -> (tipo, objeto)
+        self._lock = threading.Lock()
+
+    def histograma(self, nome, **rotulos):
+        return self._obter(nome, rotulos, "histogram", Histograma)
+
+    def contador(self, nome, **rotulos):
+        return self._obter(nome, rotulos, "counter", Contador)
+
+    def observar(self, nome, valor, **rotulos):
+        self.histograma(nome, **rotulos).observar(valor)
+
+    def incrementar(self, nome, quantidade=1, **rotulos):
+        self.contador(nome, **rotulos).incrementar(quantidade)
+
+    @contextmanager
+    def cronometro(self, nome, **rotulos):
+        histograma = self.histograma(nome, **rotulos)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            histograma.observar(time.perf_counter() - inicio)
+
+    def funcao(self, nome, funcao, tipo_serie="gauge", **rotulos):
+        """Registra (ou substitui) uma série cujo valor é lido chamando 'funcao' na coleta"""
+        with self._lock:
+            self._series[(nome, tuple(sorted(rotulos.items())))] = (tipo_serie, funcao)
+
+    def remover(self, **rotulos):
+        """Tira todas as séries com esses rótulos (ex.: uma câmera que foi desligada)"""
+        alvo = set(rotulos.items())
+        with self._lock:
+            for chave in [c for c in self._series if alvo <= set(c[1])]:
+                del self._series[chave]
+
+    def _obter(self, nome, rotulos, tipo, classe):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        serie = self._series.get(chave)
+        if serie is None:
+            with self._lock:
+                serie = self._series.setdefault(chave, (tipo, classe()))
+        return serie[1]
+
+    # ================= COLETA =================
+    def _itens(self):
+        with self._lock:
+            return sorted(self._series.items(), key=lambda item: item[0])
+
+    def texto_prometheus(self):
+        linhas = []
+        nome_anterior = None
+        for (nome, rotulos), (tipo, objeto) in self._itens():
+            if nome != nome_anterior:
+                linhas.append(f"# HELP {nome} {AJUDA.get(nome, nome)}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                nome_anterior = nome
+
+            if isinstance(objeto, Histograma):
+                baldes, soma, contagem = objeto.copia()
+                acumulado = 0
+                for limite, quantidade in zip(list(objeto.limites) + ["+Inf"], baldes):
+                    acumulado += quantidade
+                    linhas.append(f"{nome}_bucket{_rotulos_texto(rotulos + (('le', limite),))} {acumulado}")
+                linhas.append(f"{nome}_sum{_rotulos_texto(rotulos)} {soma:.6f}")
+                linhas.append(f"{nome}_count{_rotulos_texto(rotulos)} {contagem}")
+            else:
+                valor = objeto.valor if isinstance(objeto, Contador) else _ler(objeto)
+                linhas.append(f"{nome}{_rotulos_texto(rotulos)} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def resumo(self):
+        """Dicionário simples (para o arquivo JSON): média e contagem dos histogramas, valor dos demais"""
+        dados = {}
+        for (nome, rotulos), (_, objeto) in self._itens():
+            chave = nome + _rotulos_texto(rotulos)
+            if isinstance(objeto, Histograma):
+                _, soma, contagem = objeto.copia()
+                dados[chave] = {"n": contagem, "media_ms": round(1000 * soma / contagem, 3) if contagem else 0.0}
+            else:
+                dados[chave] = objeto.valor if isinstance(objeto, Contador) else _ler(objeto)
+        return dados
+
+
+def _ler(funcao):
+    try:
+        return funcao()
+    except Exception:
+        # Uma série quebrada (ex.: objeto já encerrado) não pode derrubar a coleta inteira
+        return float("nan")
+
+
+metricas = Registro()
+
+
+class ServidorMetricas:
+    """Responde GET /metrics no formato texto do Prometheus (por padrão só na própria máquina)"""
+
+    def __init__(self, registro=metricas, porta=9108, endereco="127.0.0.1"):
+        registro_servidor = registro
+
+        class Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                corpo = registro_servidor.texto_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass  # Sem uma linha no console a cada coleta
+
+        self.servidor = ThreadingHTTPServer((endereco, porta), Tratador)
+        self.servidor.daemon_threads = True
+        self.porta = self.servidor.server_address[1]
+        self._thread = threading.Thread(target=self.servidor.serve_forever, name="metricas-http", daemon=True)
+        self._thread.start()
+
+    def encerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+class GravadorArquivoMetricas:
+    """A cada 'intervalo' segundos grava uma linha JSON com o resumo; o arquivo gira ao passar de 'max_bytes'"""
+
+    def __init__(self, caminho, registro=metricas, intervalo=60, max_bytes=5 * 1024 * 1024, copias=3):
+        self.registro = registro
+        self.intervalo = intervalo
+        self._log = logging.getLogger(f"guarita.metricas.{caminho}")
+        self._log.propagate = False
+        self._log.setLevel(logging.INFO)
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._tratador = RotatingFileHandler(caminho, maxBytes=max_bytes, backupCount=copias, encoding="utf-8")
+        self._log.addHandler(self._tratador)
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metricas-arquivo", daemon=True)
+        self._thread.start()
+
+    def gravar(self):
+        linha = {"momento": time.strftime("%Y-%m-%d %H:%M:%S"), "metricas": self.registro.resumo()}
+        self._log.info(json.dumps(linha, ensure_ascii=False, default=str))
+
+    def encerrar(self):
+        self._parar.set()
+        self._thread.join(timeout=2)
+        self.gravar()
+        self._log.removeHandler(self._tratador)
+        self._tratador.close()
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self.gravar()
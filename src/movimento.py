@@ -0,0 +1,71 @@
+import time
+
+import cv2
+
+
+class DetectorMovimento:
+    """
+    Filtro barato que roda antes do DetectorPlaca.processar.
+
+    Compara uma versão pequena e em cinza do frame (só a região da faixa) com uma
+    média móvel do fundo. Enquanto nada se mexe, a detecção de placa e o OCR não
+    rodam; quando algo se mexe, a faixa fica "ativa" por mais 'manter_s' segundos
+    para o carro parado no portão ainda ser lido.
+    """
+
+    def __init__(self, roi=None, largura=160, limiar_pixel=25, fracao_minima=0.01, manter_s=2.0, alpha=0.1):
+        self.roi = roi  # (x, y, largura, altura) em frações do frame, igual ao DetectorPlaca
+        self.largura = largura  # Largura da imagem reduzida usada na comparação
+        self.limiar_pixel = limiar_pixel  # Diferença de cinza para um pixel contar como "mexeu"
+        self.fracao_minima = fracao_minima  # Fração de pixels que precisa mexer
+        self.manter_s = manter_s
+        self.alpha = alpha  # Velocidade com que o fundo absorve mudanças (carro estacionado, luz)
+
+        self.fundo = None
+        self.ultimo_movimento = 0.0
+        self.frames_analisados = 0
+        self.frames_com_movimento = 0
+
+    @property
+    def ocioso(self):
+        return time.monotonic() - self.ultimo_movimento > self.manter_s
+
+    def verificar(self, frame):
+        """Retorna True se a faixa está ativa (houve movimento há menos de 'manter_s')"""
+        self.frames_analisados += 1
+        pequeno = self._reduzir(frame)
+
+        if self.fundo is None or self.fundo.shape != pequeno.shape:
+            # Primeiro frame (ou mudou a resolução): não há com o que comparar, então processa
+            self.fundo = pequeno.astype("float32")
+            self.ultimo_movimento = time.monotonic()
+            return True
+
+        diferenca = cv2.absdiff(pequeno, cv2.convertScaleAbs(self.fundo))
+        mexeram = cv2.countNonZero(cv2.threshold(diferenca, self.limiar_pixel, 255, cv2.THRESH_BINARY)[1])
+        cv2.accumulateWeighted(pequeno, self.fundo, self.alpha)
+
+        if mexeram > self.fracao_minima * pequeno.size:
+            self.frames_com_movimento += 1
+            self.ultimo_movimento = time.monotonic()
+            return True
+        return not self.ocioso
+
+    def reiniciar(self):
+        self.fundo = None
+        self.ultimo_movimento = 0.0
+
+    def _reduzir(self, frame):
+        altura, largura = frame.shape[:2]
+        if self.roi is not None:
+            rx, ry, rw, rh = self.roi
+            x0, y0 = int(rx * largura), int(ry * altura)
+            frame = frame[y0:y0 + int(rh * altura), x0:x0 + int(rw * largura)]
+            altura, largura = frame.shape[:2]
+
+        escala = self.largura / largura
+        # INTER_NEAREST: só amostra pixels, quase de graça mesmo em 1080p
+        pequeno = cv2.resize(frame, (self.largura, max(1, int(altura * escala))), interpolation=cv2.INTER_NEAREST)
+        pequeno = cv2.cvtColor(pequeno, cv2.COLOR_BGR2GRAY)
+        # O blur tira o ruído do sensor, que senão pareceria movimento
+        return cv2.GaussianBlur(pequeno, (5, 5), 0)
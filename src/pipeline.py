@@ -0,0 +1,342 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from fontes import fonte_ao_vivo
+from metricas import metricas
+
+log = logging.getLogger("guarita.pipeline")
+
+
+class FilaDescarte:
+    """Fila limitada que descarta o item mais antigo quando está cheia"""
+
+    def __init__(self, capacidade=2):
+        self._itens = deque(maxlen=capacidade)
+        self._cond = threading.Condition()
+        self.descartados = 0
+
+    def colocar(self, item):
+        with self._cond:
+            # Fila cheia: o deque com maxlen joga fora o mais antigo sozinho,
+            # só contamos para saber quantos frames o OCR deixou passar
+            if len(self._itens) == self._itens.maxlen:
+                self.descartados += 1
+            self._itens.append(item)
+            self._cond.notify()
+
+    def pegar(self, timeout=None):
+        """Retorna o item mais antigo ou None se o tempo de espera acabar"""
+        with self._cond:
+            if not self._itens:
+                self._cond.wait(timeout)
+            if not self._itens:
+                return None
+            return self._itens.popleft()
+
+    def limpar(self):
+        with self._cond:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class MedidorFPS:
+    """Calcula a taxa de eventos por segundo numa janela deslizante"""
+
+    def __init__(self, janela=2.0):
+        self.janela = janela
+        self._tempos = deque()
+        self._lock = threading.Lock()
+
+    def marcar(self):
+        agora = time.perf_counter()
+        with self._lock:
+            self._tempos.append(agora)
+            self._descartar_antigos(agora)
+
+    def fps(self):
+        agora = time.perf_counter()
+        with self._lock:
+            self._descartar_antigos(agora)
+            if len(self._tempos) < 2:
+                return 0.0
+            # Mede até "agora" para a taxa cair quando os eventos param de chegar
+            intervalo = agora - self._tempos[0]
+            return (len(self._tempos) - 1) / intervalo if intervalo > 0 else 0.0
+
+    def _descartar_antigos(self, agora):
+        while self._tempos and agora - self._tempos[0] > self.janela:
+            self._tempos.popleft()
+
+
+class PipelineReconhecimento:
+    """
+    Separa captura, reconhecimento e exibição em etapas independentes.
+
+    - Thread de captura: lê a câmera na velocidade dela e guarda o frame mais novo.
+    - Fila com descarte: se o OCR estiver lento, os frames velhos são jogados fora.
+    - Thread de reconhecimento: roda o DetectorPlaca.processar e publica as placas lidas.
+
+    A interface só consome os resultados (pegar_resultados) e o último frame (ultimo_frame),
+    então o Tkinter nunca fica travado esperando o OCR.
+
+    Com um DetectorMovimento, frames sem movimento na faixa não vão para o reconhecimento
+    e a captura desacelera para um frame analisado a cada 'intervalo_ocioso' segundos
+    (numa câmera ao vivo os frames do meio continuam saindo do buffer, sem decodificar).
+
+    Tempos e contadores vão para o registro de métricas com o rótulo faixa='nome'.
+    """
+
+    def __init__(self, detector, capacidade_fila=2, movimento=None, intervalo_ocioso=0.2, nome="camera"):
+        self.detector = detector
+        self.nome = nome
+        self.movimento = movimento
+        self.intervalo_ocioso = intervalo_ocioso
+        self.frames_ociosos = 0  # Frames que nem chegaram ao reconhecimento (faixa vazia)
+        self._ao_vivo = False  # Câmera que enche o buffer do driver se ninguém ler (ver _esperar_ocioso)
+        self.fila_frames = FilaDescarte(capacidade_fila)
+        self.resultados = queue.Queue()
+
+        self.fps_captura = MedidorFPS()
+        self.fps_processamento = MedidorFPS()
+        self.fps_exibicao = MedidorFPS()
+
+        self._rodando = threading.Event()
+        self._threads = []
+        self._lock_frame = threading.Lock()
+        self._ultimo_frame = None  # Tupla (frame_id, timestamp, frame)
+        self._ultima_deteccao = None
+        self._frame_id = 0
+        # Última leitura publicada por trilha: a mesma placa parada só gera um resultado
+        self._publicados = {}
+        self._registrar_metricas()
+
+    def _registrar_metricas(self):
+        faixa = self.nome
+        # Histogramas pegos uma vez só: no laço fica só o observar()
+        self._tempo_captura = metricas.histograma("guarita_etapa_segundos", etapa="captura", faixa=faixa)
+        self._tempos_etapas = {}
+        self._frames_capturados = metricas.contador("guarita_frames_total", tipo="capturados", faixa=faixa)
+        self._frames_processados = metricas.contador("guarita_frames_total", tipo="processados", faixa=faixa)
+        # Quanto o frame esperou (câmera -> início do reconhecimento); alto = reconhecendo o passado
+        self._idade_frame = metricas.histograma("guarita_etapa_segundos", etapa="idade_frame", faixa=faixa)
+
+        # O resto já é contado em outros objetos e só é lido na hora da coleta
+        detector, rastreador = self.detector, self.detector.rastreador
+        series = [
+            ("guarita_frames_total", "counter", lambda: self.fila_frames.descartados, {"tipo": "descartados"}),
+            ("guarita_frames_total", "counter", lambda: self.frames_ociosos, {"tipo": "sem_movimento"}),
+            ("guarita_frames_total", "counter", self._descartados_camera, {"tipo": "descartados_camera"}),
+            ("guarita_candidatos_total", "counter", lambda: detector.candidatos, {}),
+            ("guarita_ocr_total", "counter", lambda: rastreador.ocr_executados, {"tipo": "executados"}),
+            ("guarita_ocr_total", "counter", lambda: rastreador.ocr_evitados, {"tipo": "evitados"}),
+            ("guarita_placas_total", "counter", lambda: detector.placas_aceitas, {"resultado": "aceita"}),
+            ("guarita_placas_total", "counter", lambda: detector.placas_rejeitadas, {"resultado": "rejeitada"}),
+            ("guarita_fila", "gauge", lambda: len(self.fila_frames), {"fila": "frames"}),
+            ("guarita_fila", "gauge", self.resultados.qsize, {"fila": "resultados"}),
+        ]
+        for nome, tipo, funcao, rotulos in series:
+            metricas.funcao(nome, funcao, tipo_serie=tipo, faixa=faixa, **rotulos)
+
+    def _descartados_camera(self):
+        # Só a CapturaRecente conta os frames que a câmera entregou e ninguém leu
+        return getattr(self.detector.cap, "descartados", 0)
+
+    def _observar_etapas(self, tempos):
+        for etapa, segundos in tempos.items():
+            histograma = self._tempos_etapas.get(etapa)
+            if histograma is None:
+                histograma = self._tempos_etapas[etapa] = metricas.histograma(
+                    "guarita_etapa_segundos", etapa=etapa, faixa=self.nome)
+            histograma.observar(segundos)
+
+    @property
+    def ativo(self):
+        return self._rodando.is_set()
+
+    def iniciar(self, timeout=2):
+        """
+        Liga a câmera e as threads de captura e reconhecimento.
+        Retorna False se as threads de um parar() anterior ainda não terminaram (tente de novo depois).
+        """
+        if self._rodando.is_set():
+            return True
+        if not self._aguardar_threads(timeout):
+            print(f"AVISO [{self.nome}]: threads anteriores ainda encerrando; câmera não foi religada")
+            return False
+        self._limpar_estado()
+        self._rodando.set()
+        self._threads = [
+            threading.Thread(target=self._loop_captura, name="captura", daemon=True),
+            threading.Thread(target=self._loop_reconhecimento, name="reconhecimento", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return True
+
+    def parar(self, timeout=2):
+        """
+        Para as threads; a câmera é liberada pela própria thread de captura ao sair (nunca é fechada
+        no meio de um read). Retorna False se alguma thread não terminou dentro do 'timeout'
+        (ex.: câmera de rede travada): ela continua sendo esperada e o iniciar() não sobe outras.
+        """
+        self._rodando.clear()
+        if not self._aguardar_threads(timeout):
+            print(f"AVISO [{self.nome}]: threads ainda não terminaram; a câmera é liberada quando a captura sair")
+            return False
+        self._limpar_estado()
+        return True
+
+    def _aguardar_threads(self, timeout):
+        prazo = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, prazo - time.monotonic()))
+        self._threads = [t for t in self._threads if t.is_alive()]
+        return not self._threads
+
+    def _limpar_estado(self):
+        # Só com as threads paradas: nenhuma delas está usando a fila, o movimento ou os publicados
+        self.fila_frames.limpar()
+        with self._lock_frame:
+            self._ultimo_frame = None
+        self._ultima_deteccao = None
+        self._publicados.clear()
+        if self.movimento is not None:
+            self.movimento.reiniciar()
+
+    @property
+    def ocioso(self):
+        return self.movimento is not None and self.movimento.ocioso
+
+    # ================= THREADS =================
+    def _loop_captura(self):
+        # Abrir a câmera pode levar mais de um segundo; aqui não trava quem chamou iniciar()
+        self.detector.conectar_camera()
+        self._ao_vivo = fonte_ao_vivo(getattr(self.detector, "fonte", None))
+        try:
+            self._capturar()
+        finally:
+            # Quem lê a câmera é quem a fecha: o parar() não solta a câmera com um read em andamento
+            self.detector.desconectar_camera()
+
+    def _capturar(self):
+        while self._rodando.is_set():
+            inicio = time.perf_counter()
+            frame = self.detector.ler_frame()
+            if frame is None:
+                # Câmera ainda abrindo ou sem sinal: espera um pouco para não girar em falso
+                time.sleep(0.01)
+                continue
+
+            # Inclui a espera pelo próximo frame da câmera (decodificação + rede/USB)
+            self._tempo_captura.observar(time.perf_counter() - inicio)
+            self._frames_capturados.incrementar()
+            self._frame_id += 1
+            item = (self._frame_id, self.detector.timestamp_frame, frame)
+            with self._lock_frame:
+                self._ultimo_frame = item
+            self.fps_captura.marcar()
+
+            if self.movimento is None or self.movimento.verificar(frame):
+                self.fila_frames.colocar(item)
+            else:
+                # Faixa vazia: não procura placa e lê a câmera bem mais devagar.
+                # O primeiro frame com movimento volta a ser processado na hora.
+                self.frames_ociosos += 1
+                self._esperar_ocioso()
+
+    def _esperar_ocioso(self):
+        # Dormir com a câmera ao vivo deixaria o driver acumular frames: o primeiro carro seria
+        # visto atrasado. Então o buffer continua sendo esvaziado com grab() (sem decodificar).
+        # A CapturaRecente (sem grab) já esvazia na thread dela; arquivo e pasta não enchem sozinhos.
+        grab = getattr(self.detector.cap, "grab", None)
+        if grab is None or not self._ao_vivo:
+            time.sleep(self.intervalo_ocioso)
+            return
+        prazo = time.monotonic() + self.intervalo_ocioso
+        while self._rodando.is_set() and time.monotonic() < prazo:
+            if grab():
+                self.frames_ociosos += 1
+            else:
+                time.sleep(0.01)  # Sem sinal: não gira em falso
+
+    def _loop_reconhecimento(self):
+        while self._rodando.is_set():
+            item = self.fila_frames.pegar(timeout=0.1)
+            if item is None:
+                continue
+
+            frame_id, timestamp, frame = item
+            self._idade_frame.observar(time.time() - timestamp)
+            # O processar desenha em cima do frame, então trabalha numa cópia
+            # para não sujar a imagem que a interface está exibindo
+            try:
+                _, texto, _ = self.detector.processar(frame.copy())
+            except Exception:
+                # Um frame com problema (OCR, recorte...) não pode matar a thread: a faixa
+                # ficaria com a câmera ligada e sem reconhecer nada até reiniciar o programa
+                log.exception("[%s] Erro ao processar o frame %s", self.nome, frame_id)
+                continue
+            self.fps_processamento.marcar()
+            self._frames_processados.incrementar()
+            self._observar_etapas(self.detector.tempos_etapas)
+
+            trilha = self.detector.ultima_trilha
+            id_trilha = trilha.id if trilha is not None else None
+            self._ultima_deteccao = {
+                "frame_id": frame_id,
+                "timestamp": timestamp,
+                "localizacao": self.detector.ultima_localizacao,
+                "texto": texto,
+                "trilha": id_trilha,
+            }
+            if texto and self._publicados.get(id_trilha) != texto:
+                self._publicados[id_trilha] = texto
+                self._limpar_publicados()
+                self.resultados.put({"frame_id": frame_id, "timestamp": timestamp, "texto": texto,
+                                     "trilha": id_trilha})
+
+    def _limpar_publicados(self):
+        # Esquece as trilhas que o rastreador já encerrou
+        vivas = self.detector.rastreador.trilhas
+        for id_trilha in [i for i in self._publicados if i not in vivas]:
+            del self._publicados[id_trilha]
+
+    # ================= CONSUMO PELA INTERFACE =================
+    def ultimo_frame(self):
+        """Retorna (frame_id, timestamp, frame) do frame mais recente ou None"""
+        with self._lock_frame:
+            return self._ultimo_frame
+
+    def ultima_deteccao(self):
+        return self._ultima_deteccao
+
+    def pegar_resultados(self):
+        """Esvazia a fila de placas lidas sem bloquear"""
+        itens = []
+        while True:
+            try:
+                itens.append(self.resultados.get_nowait())
+            except queue.Empty:
+                return itens
+
+    def registrar_exibicao(self):
+        self.fps_exibicao.marcar()
+
+    def estatisticas(self):
+        return {
+            "fps_captura": self.fps_captura.fps(),
+            "fps_processamento": self.fps_processamento.fps(),
+            "fps_exibicao": self.fps_exibicao.fps(),
+            "frames_descartados": self.fila_frames.descartados,
+            "frames_descartados_camera": self._descartados_camera(),
+            "frames_ociosos": self.frames_ociosos,
+            "ocioso": self.ocioso,
+            "fila": len(self.fila_frames),
+            "ocr_executados": self.detector.rastreador.ocr_executados,
+            "ocr_evitados": self.detector.rastreador.ocr_evitados,
+        }
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metricas import metricas
+from pipeline import MedidorFPS
+
+
+class PoolOCR:
+    """
+    Um único modelo de OCR compartilhado por várias câmeras.
+
+    Tem o mesmo método readtext dos motores de OCR (backends_ocr), então pode ser passado
+    direto como 'reader' para o DetectorPlaca. Cada chamada entra numa fila e
+    a thread da câmera espera o resultado.
+
+    Com max_lote > 1 os recortes que chegam dentro de 'max_espera_ms' são
+    juntos e lidos numa única chamada do reconhecer_lote (só o reconhecedor,
+    sem o detector de texto, numa inferência por lote em vez de uma por placa).
+    Motores sem reconhecer_lote leem um por um.
+    """
+
+    def __init__(self, reader, workers=1, max_lote=1, max_espera_ms=10):
+        self.reader = reader
+        self.workers = workers
+        self.max_lote = max_lote  # Quantos recortes no máximo por inferência
+        self.max_espera_ms = max_espera_ms  # Quanto esperar por mais recortes antes de rodar
+
+        self.chamadas = 0
+        self.lotes = 0
+        self.imagens = 0
+        self.tempo_total = 0.0
+        self.taxa = MedidorFPS(janela=5.0)  # Placas lidas por segundo
+
+        self._lock = threading.Lock()
+        self._fila = queue.Queue()
+        metricas.funcao("guarita_fila", self._fila.qsize, fila="ocr")
+        self._threads = [threading.Thread(target=self._loop, name=f"ocr-{i}", daemon=True) for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    @classmethod
+    def criar(cls, backend="easyocr", opcoes_backend=None, workers=1, **opcoes):
+        """Carrega o motor de OCR uma vez e já devolve o pool pronto"""
+        from backends_ocr import carregar_backend
+
+        return cls(carregar_backend(backend, **(opcoes_backend or {})), workers, **opcoes)
+
+    def readtext(self, imagem, **kwargs):
+        self.chamadas += 1
+        futuro = Future()
+        self._fila.put((imagem, kwargs, futuro))
+        return futuro.result()
+
+    def encerrar(self):
+        for _ in self._threads:
+            self._fila.put(None)
+        for t in self._threads:
+            t.join(timeout=5)
+
+    def estatisticas(self):
+        return {
+            "lotes": self.lotes,
+            "imagens": self.imagens,
+            "tamanho_medio_lote": self.imagens / self.lotes if self.lotes else 0.0,
+            "tempo_medio_lote_ms": 1000 * self.tempo_total / self.lotes if self.lotes else 0.0,
+            "placas_por_segundo": self.taxa.fps(),
+        }
+
+    # ================= WORKERS =================
+    def _loop(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                return
+
+            # Junta mais recortes até encher o lote ou acabar o tempo de espera
+            lote = [item]
+            prazo = time.monotonic() + self.max_espera_ms / 1000
+            while len(lote) < self.max_lote:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    proximo = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if proximo is None:
+                    # Pedido de encerramento: devolve para a fila e termina este lote
+                    self._fila.put(None)
+                    break
+                lote.append(proximo)
+
+            self._executar(lote)
+
+    def _executar(self, lote):
+        inicio = time.perf_counter()
+        try:
+            # Chamadas com opções próprias (ou um lote de um só) vão pelo readtext normal
+            usar_lote = (len(lote) > 1 and hasattr(self.reader, "reconhecer_lote")
+                         and not any(kwargs for _, kwargs, _ in lote))
+            if usar_lote:
+                resultados = self.reader.reconhecer_lote([imagem for imagem, _, _ in lote])
+            else:
+                resultados = [self.reader.readtext(imagem, **kwargs) for imagem, kwargs, _ in lote]
+        except Exception as e:
+            for _, _, futuro in lote:
+                futuro.set_exception(e)
+            return
+
+        with self._lock:
+            self.lotes += 1
+            self.imagens += len(lote)
+            self.tempo_total += time.perf_counter() - inicio
+        for (_, _, futuro), resultado in zip(lote, resultados):
+            self.taxa.marcar()
+            futuro.set_result(resultado)
@@ -0,0 +1,103 @@
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+VERDE = (0, 255, 0)
+
+
+class RenderizadorPrevia:
+    """
+    Mostra os frames da câmera num Label do Tkinter gastando o mínimo da thread da interface.
+
+    - Reduz o frame para o tamanho da área da tela *antes* de converter as cores
+      (o Label tem ~700x500; converter 1080p inteiro e depois jogar fora é desperdício).
+    - Reaproveita sempre os mesmos buffers (frame reduzido e RGBA) e a mesma PhotoImage,
+      que só recebe os pixels novos (paste); nada é alocado por frame enquanto o tamanho não muda.
+    - Limita a prévia a 'fps_max', independente da velocidade da câmera e do OCR.
+    """
+
+    def __init__(self, label, area=None, fps_max=20, tamanho_padrao=(700, 500)):
+        self.label = label
+        self.area = area if area is not None else getattr(label, "master", None)  # Widget que define o espaço
+        self.fps_max = fps_max
+        self.tamanho_padrao = tamanho_padrao  # Usado até a janela ser desenhada pela primeira vez
+
+        self._reduzido = None  # Frame reduzido (BGR), onde também é desenhada a detecção
+        self._rgba = None
+        self._imagem = None  # Imagem do PIL apontando para o buffer _rgba (sem cópia)
+        self._foto = None
+        self._ultima_exibicao = 0.0
+
+        self.exibidos = 0
+        self.pulados = 0  # Frames ignorados pelo limite de fps
+        self.tempo_medio_ms = 0.0  # Média móvel do tempo gasto na thread da interface por frame
+
+    def exibir(self, frame, deteccao=None):
+        """Desenha o frame (e o retângulo/texto da detecção). Retorna False se pulou pelo limite de fps"""
+        agora = time.perf_counter()
+        if self.fps_max and agora - self._ultima_exibicao < 1.0 / self.fps_max:
+            self.pulados += 1
+            return False
+        self._ultima_exibicao = agora
+
+        largura, altura = self._tamanho_area()
+        imagem = self.preparar(frame, deteccao, largura, altura)
+        if self._foto is None or (self._foto.width(), self._foto.height()) != imagem.size:
+            # Só na primeira vez ou quando a janela muda de tamanho
+            self._foto = ImageTk.PhotoImage("RGBA", imagem.size)
+            self.label.configure(image=self._foto, text="")
+            self.label.imgtk = self._foto  # Mantém a referência (senão o Tkinter mostra uma imagem vazia)
+        self._foto.paste(imagem)
+
+        self.exibidos += 1
+        duracao_ms = (time.perf_counter() - agora) * 1000
+        self.tempo_medio_ms = duracao_ms if self.exibidos == 1 else 0.9 * self.tempo_medio_ms + 0.1 * duracao_ms
+        return True
+
+    def preparar(self, frame, deteccao, largura_max, altura_max):
+        """Reduz, desenha a detecção e converte para RGBA nos buffers reaproveitados (sem Tkinter)"""
+        altura, largura = frame.shape[:2]
+        # Nunca aumenta: um frame menor que a área é mostrado no tamanho original
+        escala = min(largura_max / largura, altura_max / altura, 1.0)
+        tamanho = (max(1, int(largura * escala)), max(1, int(altura * escala)))
+
+        if self._reduzido is None or self._reduzido.shape[:2] != (tamanho[1], tamanho[0]):
+            self._reduzido = np.empty((tamanho[1], tamanho[0], 3), np.uint8)
+            self._rgba = np.empty((tamanho[1], tamanho[0], 4), np.uint8)
+            self._imagem = Image.frombuffer("RGBA", tamanho, self._rgba, "raw", "RGBA", 0, 1)
+
+        if escala < 1.0:
+            cv2.resize(frame, tamanho, dst=self._reduzido, interpolation=cv2.INTER_LINEAR)
+        else:
+            # O frame é do pipeline: desenha numa cópia, nunca nele
+            np.copyto(self._reduzido, frame)
+
+        if deteccao is not None and deteccao.get("localizacao") is not None:
+            location = (deteccao["localizacao"] * escala).astype(np.int32)
+            cv2.drawContours(self._reduzido, [location], -1, VERDE, 2)
+            if deteccao.get("texto"):
+                cv2.putText(self._reduzido, deteccao["texto"], (location[0][0][0], location[0][0][1] - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, max(0.5, escala), VERDE, 2)
+
+        # OpenCV usa BGR e o Tkinter RGB; o canal alfa deixa o PIL usar o buffer direto
+        cv2.cvtColor(self._reduzido, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+        return self._imagem
+
+    def limpar(self, texto=""):
+        """Tira a imagem do Label (câmera desligada); a próxima exibição recria a PhotoImage"""
+        self.label.config(image="", text=texto)
+        self.label.imgtk = None
+        self._foto = None
+
+    def estatisticas(self):
+        return {"exibidos": self.exibidos, "pulados": self.pulados, "tempo_medio_ms": self.tempo_medio_ms}
+
+    def _tamanho_area(self):
+        largura, altura = self.area.winfo_width(), self.area.winfo_height()
+        if largura <= 1 or altura <= 1:
+            # Janela ainda não desenhada: o Tkinter informa 1x1
+            return self.tamanho_padrao
+        # Desconta a borda do Label: uma imagem do tamanho exato da área faria a janela crescer a cada frame
+        return largura - 4, altura - 4
@@ -0,0 +1,414 @@
+"""
+OCR em vários processos, para usar todos os núcleos da máquina.
+
+Numa thread só, o readtext fica preso ao GIL e às threads internas do torch.
+O PoolProcessosOCR sobe 'processos' processos, cada um com o seu modelo
+(carregado uma vez), e divide os núcleos entre eles (torch/OpenMP com
+'threads_por_processo' threads cada, para não disputarem a CPU).
+
+Os recortes vão para os processos por memória compartilhada (shared_memory):
+a imagem é copiada uma vez para um "slot" e o processo lê direto de lá,
+sem passar o array pelo pickle.
+
+Tem o mesmo readtext dos motores de OCR, então pode ser o 'reader' do DetectorPlaca
+ou das faixas do serviço. Para enviar sem esperar, use enviar(imagem, frame_id, trilha)
+e pegar_resultados(), que devolve as leituras na ordem de envio.
+
+Um processo que cai é substituído (até 'max_reinicios' vezes); depois disso, ou se o
+modelo não carregar, o pool fica marcado com 'erro_carga' e o readtext levanta erro
+em vez de esperar para sempre.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from metricas import metricas
+from pipeline import MedidorFPS
+
+# Leitura devolvida pelo enviar()/pegar_resultados()
+LeituraOCR = namedtuple("LeituraOCR", "sequencia frame_id trilha resultado")
+
+# Lidas pelo OpenMP/MKL/OpenBLAS só quando o numpy/torch são importados
+VARIAVEIS_THREADS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+log = logging.getLogger("guarita.ocr")
+
+
+def _configurar_threads(threads):
+    # As variáveis de ambiente já vieram do processo pai (ver _iniciar_worker); aqui só o que tem API
+    import cv2
+
+    cv2.setNumThreads(1)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+
+def _trabalhador(backend, opcoes_backend, threads, nomes_slots, tarefas, respostas, atual):
+    """Loop de cada processo: carrega o modelo e lê os recortes que chegam pelos slots"""
+    _configurar_threads(threads)
+    slots = [shared_memory.SharedMemory(name=nome) for nome in nomes_slots]
+    try:
+        from backends_ocr import carregar_backend
+
+        reader = carregar_backend(backend, **opcoes_backend)
+    except Exception as e:
+        respostas.put(("erro_carga", os.getpid(), repr(e)))
+        return
+    respostas.put(("pronto", os.getpid(), None))
+
+    try:
+        while True:
+            tarefa = tarefas.get()
+            if tarefa is None:
+                return
+            id_tarefa, slot, forma, tipo, imagem, kwargs = tarefa
+            # Memória compartilhada, não mensagem: se este processo cair, o pai sabe qual tarefa
+            # se perdeu (uma mensagem ainda no buffer da fila morreria junto com ele)
+            atual.value = id_tarefa
+            if imagem is None:
+                # Sem cópia: o array aponta para a memória compartilhada
+                imagem = np.ndarray(forma, dtype=tipo, buffer=slots[slot].buf)
+            inicio = time.perf_counter()
+            try:
+                resultado = reader.readtext(imagem, **kwargs)
+                # Caixas com tipos do numpy viram listas simples (pickle menor e sem surpresas)
+                resultado = [(np.asarray(caixa).tolist(), texto, float(confianca))
+                             for caixa, texto, confianca in resultado]
+                respostas.put(("ok", id_tarefa, (resultado, time.perf_counter() - inicio)))
+            except Exception as e:
+                respostas.put(("erro", id_tarefa, repr(e)))
+            del imagem
+            atual.value = -1
+    finally:
+        for memoria in slots:
+            memoria.close()
+
+
+class PoolProcessosOCR:
+    """
+    'processos' processos de OCR com 'slots' áreas de memória compartilhada de
+    'tamanho_slot' bytes. Um recorte maior que o slot ainda funciona, mas vai pelo pickle.
+    """
+
+    def __init__(self, backend="easyocr", opcoes_backend=None, processos=None, threads_por_processo=None,
+                 slots=None, tamanho_slot=4 * 1024 * 1024, max_reinicios=3, timeout_leitura=30.0):
+        nucleos = os.cpu_count() or 1
+        self.processos = processos or max(1, nucleos // 2)
+        self.threads_por_processo = threads_por_processo or max(1, nucleos // self.processos)
+        self.tamanho_slot = tamanho_slot
+        self.max_reinicios = max_reinicios
+        self.reinicios = 0
+        self.timeout_leitura = timeout_leitura  # O readtext não espera mais que isso (None: sem limite)
+
+        self.enviados = 0
+        self.sem_memoria_compartilhada = 0  # Recortes maiores que o slot
+        self.lidos = 0
+        self.tempo_total = 0.0
+        self.taxa = MedidorFPS(janela=5.0)
+        self.erro_carga = None
+
+        self._contexto = multiprocessing.get_context("spawn")  # Seguro com threads e com torch
+        self._memorias = [shared_memory.SharedMemory(create=True, size=tamanho_slot)
+                          for _ in range(slots or 2 * self.processos)]
+        self._slots_livres = queue.Queue()
+        for i in range(len(self._memorias)):
+            self._slots_livres.put(i)
+
+        self._tarefas = self._contexto.Queue()
+        self._respostas = self._contexto.Queue()
+        self._pendentes = {}  # id da tarefa -> (futuro, sequência ou None, frame_id, trilha)
+        # O slot só volta a ficar livre quando a tarefa terminou ou o processo que a lia morreu;
+        # antes disso o processo ainda pode estar lendo a memória compartilhada
+        self._slot_da_tarefa = {}  # id da tarefa -> slot
+        self._atuais = {}  # índice do processo -> RawValue com o id da tarefa que ele está lendo (-1: nenhuma)
+        self._lock = threading.Lock()
+        self._proximo_id = 0
+        self._prontos = set()  # pids dos processos com o modelo carregado
+        self._todos_prontos = threading.Event()
+
+        # Entrega em ordem: leituras que terminaram antes das anteriores esperam aqui
+        self._sequencia = 0
+        self._proxima_entrega = 0
+        self._terminadas = {}
+        self._encerrado = False
+
+        self._argumentos = (backend, opcoes_backend or {}, self.threads_por_processo,
+                            [memoria.name for memoria in self._memorias], self._tarefas, self._respostas)
+        self._workers = [self._iniciar_worker(i) for i in range(self.processos)]
+        self._coletor = threading.Thread(target=self._loop_respostas, name="ocr-respostas", daemon=True)
+        self._coletor.start()
+        metricas.funcao("guarita_fila", lambda: len(self._pendentes), fila="ocr")
+
+    def _iniciar_worker(self, indice):
+        # O processo novo herda o ambiente deste: as variáveis de threads precisam estar lá antes
+        # de ele importar numpy/torch (o spawn reimporta os módulos do programa antes do _trabalhador)
+        anteriores = {variavel: os.environ.get(variavel) for variavel in VARIAVEIS_THREADS}
+        os.environ.update({variavel: str(self.threads_por_processo) for variavel in VARIAVEIS_THREADS})
+        self._atuais[indice] = self._contexto.RawValue("q", -1)
+        try:
+            worker = self._contexto.Process(target=_trabalhador, name=f"ocr-processo-{indice}", daemon=True,
+                                            args=self._argumentos + (self._atuais[indice],))
+            worker.start()
+        finally:
+            for variavel, valor in anteriores.items():
+                if valor is None:
+                    os.environ.pop(variavel, None)
+                else:
+                    os.environ[variavel] = valor
+        return worker
+
+    # ================= ENVIO =================
+    def readtext(self, imagem, **kwargs):
+        """
+        Mesmo uso do easyocr.Reader.readtext (bloqueia até a leitura terminar).
+        Passando de 'timeout_leitura' levanta TimeoutError: a thread da câmera nunca fica presa.
+        """
+        return self._enviar(imagem, kwargs, ordenado=False).result(timeout=self.timeout_leitura)
+
+    def enviar(self, imagem, frame_id=None, trilha=None, **kwargs):
+        """Envia sem esperar; o futuro devolve uma LeituraOCR, que também sai no pegar_resultados()"""
+        return self._enviar(imagem, kwargs, ordenado=True, frame_id=frame_id, trilha=trilha)
+
+    def pegar_resultados(self):
+        """Leituras enviadas com enviar() que já terminaram, sempre na ordem de envio"""
+        itens = []
+        with self._lock:
+            while self._proxima_entrega in self._terminadas:
+                itens.append(self._terminadas.pop(self._proxima_entrega))
+                self._proxima_entrega += 1
+        return itens
+
+    def _enviar(self, imagem, kwargs, ordenado, frame_id=None, trilha=None):
+        if self._encerrado:
+            raise RuntimeError("Pool de OCR encerrado")
+        if self.erro_carga is not None:
+            raise RuntimeError(f"Modelo OCR não carregou nos processos: {self.erro_carga}")
+        imagem = np.ascontiguousarray(imagem)
+        futuro = Future()
+
+        slot = None
+        if imagem.nbytes <= self.tamanho_slot:
+            # Espera um slot livre: se todos estão em uso, os processos já têm trabalho acumulado
+            slot = self._slots_livres.get()
+            destino = np.ndarray(imagem.shape, dtype=imagem.dtype, buffer=self._memorias[slot].buf)
+            destino[...] = imagem
+            del destino
+            enviada = None
+        else:
+            self.sem_memoria_compartilhada += 1
+            enviada = imagem
+
+        with self._lock:
+            id_tarefa = self._proximo_id
+            self._proximo_id += 1
+            sequencia = None
+            if ordenado:
+                sequencia = self._sequencia
+                self._sequencia += 1
+            self._pendentes[id_tarefa] = (futuro, sequencia, frame_id, trilha)
+            if slot is not None:
+                self._slot_da_tarefa[id_tarefa] = slot
+            self.enviados += 1
+        self._tarefas.put((id_tarefa, slot if slot is not None else -1, imagem.shape, imagem.dtype.str,
+                           enviada, kwargs))
+        return futuro
+
+    # ================= RESPOSTAS =================
+    def _loop_respostas(self):
+        proxima_verificacao = time.monotonic() + 0.5
+        while True:
+            # Confere os processos mesmo com respostas chegando sem parar (um morto não responde)
+            if time.monotonic() >= proxima_verificacao:
+                proxima_verificacao = time.monotonic() + 0.5
+                if not self._encerrado:
+                    self._verificar_processos()
+            try:
+                tipo, chave, dados = self._respostas.get(timeout=0.5)
+            except queue.Empty:
+                if self._encerrado:
+                    return
+                continue
+            try:
+                self._tratar_resposta(tipo, chave, dados)
+            except Exception:
+                # Esta thread não pode morrer: sem ela nenhum futuro seria resolvido
+                log.exception("Erro ao tratar a resposta %r do OCR", tipo)
+
+    def _tratar_resposta(self, tipo, chave, dados):
+        if tipo == "pronto":
+            self._prontos.add(chave)
+            if len(self._prontos) >= len(self._workers):
+                self._todos_prontos.set()
+            return
+        if tipo == "erro_carga":
+            log.error("Erro ao carregar o modelo OCR no processo %s: %s", chave, dados)
+            self._marcar_falha(dados)
+            return
+
+        with self._lock:
+            slot = self._slot_da_tarefa.pop(chave, None)
+            pendente = self._pendentes.pop(chave, None)
+        if slot is not None:
+            self._slots_livres.put(slot)
+        if pendente is None:
+            return  # Tarefa já dada como falha (pool marcado com erro); só o slot precisava voltar
+        futuro, sequencia, frame_id, trilha = pendente
+
+        if tipo == "erro":
+            futuro.set_exception(RuntimeError(dados))
+            resultado = []
+        else:
+            resultado, duracao = dados
+            self.lidos += 1
+            self.tempo_total += duracao
+            self.taxa.marcar()
+
+        if sequencia is None:
+            if tipo == "ok":
+                futuro.set_result(resultado)
+            return
+        leitura = LeituraOCR(sequencia, frame_id, trilha, resultado)
+        with self._lock:
+            self._terminadas[sequencia] = leitura
+        if tipo == "ok":
+            futuro.set_result(leitura)
+
+    def _verificar_processos(self):
+        if self.erro_carga is not None:
+            return
+        mortos = [indice for indice, worker in enumerate(self._workers) if not worker.is_alive()]
+        if not mortos:
+            return
+        for indice in mortos:
+            worker = self._workers[indice]
+            # A tarefa que o processo estava lendo se perdeu com ele; ninguém mais lê aquele slot
+            perdida = self._atuais[indice].value
+            if perdida >= 0:
+                self._falhar_tarefas(RuntimeError(f"Processo de OCR encerrado (código {worker.exitcode})"),
+                                     [perdida])
+            if self.reinicios >= self.max_reinicios:
+                self._marcar_falha(f"processos de OCR caíram {self.reinicios + 1} vezes")
+                return
+            self.reinicios += 1
+            log.warning("Processo de OCR %s encerrado (código %s); iniciando outro", worker.pid, worker.exitcode)
+            self._prontos.discard(worker.pid)
+            self._workers[indice] = self._iniciar_worker(indice)
+        self._recolher_orfas()
+
+    def _recolher_orfas(self):
+        """
+        Depois de um processo cair: tarefas pendentes que não estão na fila nem com um processo vivo
+        (ex.: pegas no instante da queda, antes de marcar o 'atual') nunca teriam resposta e falham.
+        As que ainda estavam na fila voltam para ela.
+        """
+        na_fila = []
+        while True:
+            try:
+                # O último get espera um pouco: quem acabou de pegar uma tarefa já marcou o 'atual'
+                na_fila.append(self._tarefas.get(timeout=0.05))
+            except queue.Empty:
+                break
+        # Respostas que já chegaram resolvem as suas tarefas antes da conferência
+        while True:
+            try:
+                tipo, chave, dados = self._respostas.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._tratar_resposta(tipo, chave, dados)
+            except Exception:
+                log.exception("Erro ao tratar a resposta %r do OCR", tipo)
+
+        com_dono = {valor.value for indice, valor in self._atuais.items() if self._workers[indice].is_alive()}
+        com_dono.update(tarefa[0] for tarefa in na_fila if tarefa is not None)
+        with self._lock:
+            orfas = [id_tarefa for id_tarefa in self._pendentes if id_tarefa not in com_dono]
+        for tarefa in na_fila:
+            self._tarefas.put(tarefa)
+        if orfas:
+            log.warning("%d leituras de OCR sem processo depois da queda; dadas como falha", len(orfas))
+            self._falhar_tarefas(RuntimeError("Leitura de OCR perdida com a queda de um processo"), orfas)
+
+    def _marcar_falha(self, motivo):
+        """Daqui em diante o readtext levanta erro; os futuros pendentes também"""
+        if self.erro_carga is None:
+            self.erro_carga = motivo
+        self._todos_prontos.set()
+        self._falhar_tarefas(RuntimeError(f"Pool de OCR indisponível: {motivo}"))
+
+    def _falhar_tarefas(self, erro, ids=None):
+        """
+        Falha os futuros das tarefas 'ids', que nenhum processo vivo está lendo (o slot delas é liberado),
+        ou, sem 'ids', de todas: aí o slot só é liberado se nenhum processo está vivo
+        (os outros voltam quando a resposta chegar).
+        """
+        liberar = ids is not None or not any(worker.is_alive() for worker in self._workers)
+        with self._lock:
+            falhas, livres = [], []
+            for id_tarefa in (list(self._pendentes) if ids is None else ids):
+                if liberar:
+                    slot = self._slot_da_tarefa.pop(id_tarefa, None)
+                    if slot is not None:
+                        livres.append(slot)
+                pendente = self._pendentes.pop(id_tarefa, None)
+                if pendente is not None:
+                    falhas.append(pendente)
+                    futuro, sequencia, frame_id, trilha = pendente
+                    if sequencia is not None:
+                        self._terminadas[sequencia] = LeituraOCR(sequencia, frame_id, trilha, [])
+        for slot in livres:
+            self._slots_livres.put(slot)
+        for futuro, *_ in falhas:
+            futuro.set_exception(erro)
+
+    # ================= CONTROLE =================
+    @property
+    def pronto(self):
+        return self._todos_prontos.is_set() and self.erro_carga is None
+
+    def aguardar_pronto(self, timeout=None):
+        """Espera todos os processos carregarem o modelo; False se o tempo acabar ou der erro"""
+        return self._todos_prontos.wait(timeout) and self.erro_carga is None
+
+    def encerrar(self, timeout=5):
+        if self._encerrado:
+            return
+        self._encerrado = True
+        for _ in self._workers:
+            self._tarefas.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self._coletor.join(timeout=2)
+        # Todos os processos já pararam: nenhum slot está mais em uso
+        self._falhar_tarefas(RuntimeError("Pool de OCR encerrado"))
+        for memoria in self._memorias:
+            memoria.close()
+            memoria.unlink()
+
+    def estatisticas(self):
+        # Mesmas chaves do PoolOCR (o serviço registra as duas do mesmo jeito); cada leitura é um "lote" de 1
+        return {
+            "processos": self.processos,
+            "threads_por_processo": self.threads_por_processo,
+            "lotes": self.lidos,
+            "imagens": self.lidos,
+            "tamanho_medio_lote": 1.0 if self.lidos else 0.0,
+            "tempo_medio_lote_ms": 1000 * self.tempo_total / self.lidos if self.lidos else 0.0,
+            "placas_por_segundo": self.taxa.fps(),
+            "pendentes": len(self._pendentes),
+            "sem_memoria_compartilhada": self.sem_memoria_compartilhada,
+        }
@@ -0,0 +1,120 @@
+import itertools
+import time
+
+from consenso import VotacaoPlaca
+
+
+def calcular_iou(a, b):
+    """Intersecção sobre união de duas caixas (x, y, w, h)"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    uniao = aw * ah + bw * bh - inter
+    return inter / uniao if uniao > 0 else 0.0
+
+
+class Trilha:
+    """Uma placa sendo acompanhada ao longo dos frames"""
+
+    def __init__(self, id_trilha, caixa, agora, votacao):
+        self.id = id_trilha
+        self.caixa = caixa
+        self.criada_em = agora
+        self.ultimo_visto = agora
+
+        # Resultado parcial da votação entre as leituras de OCR desta trilha
+        self.votacao = votacao
+        self.texto = None
+        self.confianca = 0.0
+        # Texto com consenso: só ele deve ir para o banco de dados
+        self.confirmada = None
+        self.caixa_ocr = None  # Onde a placa estava quando o OCR rodou
+        self.ultima_tentativa = None
+        self.tentativas_ocr = 0
+
+
+class RastreadorPlacas:
+    """
+    Rastreador simples por IoU: se o retângulo do frame atual sobrepõe bem
+    o de uma trilha viva, é a mesma placa e a leitura anterior é reaproveitada.
+    """
+
+    def __init__(self, iou_minimo=0.3, tempo_vida=1.0, iou_reocr=0.5, intervalo_tentativa=0.2,
+                 criar_votacao=VotacaoPlaca):
+        self.iou_minimo = iou_minimo  # Sobreposição mínima para considerar a mesma placa
+        self.tempo_vida = tempo_vida  # Segundos sem ver a placa até encerrar a trilha
+        self.iou_reocr = iou_reocr  # Abaixo disso a placa "andou muito" desde o último OCR
+        self.intervalo_tentativa = intervalo_tentativa  # Espera entre tentativas que falharam
+        self.criar_votacao = criar_votacao  # Fábrica da votação de cada trilha nova
+
+        self.trilhas = {}
+        self._ids = itertools.count(1)
+        self.ocr_executados = 0
+        self.ocr_evitados = 0
+
+    def atualizar(self, caixa, agora=None):
+        """Associa a caixa detectada a uma trilha existente ou cria uma nova"""
+        agora = time.time() if agora is None else agora
+        self.expirar(agora)
+
+        melhor, melhor_iou = None, self.iou_minimo
+        for trilha in self.trilhas.values():
+            iou = calcular_iou(caixa, trilha.caixa)
+            if iou >= melhor_iou:
+                melhor, melhor_iou = trilha, iou
+
+        if melhor is None:
+            melhor = Trilha(next(self._ids), caixa, agora, self.criar_votacao())
+            self.trilhas[melhor.id] = melhor
+
+        melhor.caixa = caixa
+        melhor.ultimo_visto = agora
+        return melhor
+
+    def expirar(self, agora=None):
+        """Remove as trilhas que não aparecem há mais de 'tempo_vida' segundos"""
+        agora = time.time() if agora is None else agora
+        for id_trilha in [i for i, t in self.trilhas.items() if agora - t.ultimo_visto > self.tempo_vida]:
+            del self.trilhas[id_trilha]
+
+    def precisa_ocr(self, trilha, agora=None):
+        """Decide se vale rodar o OCR de novo ou se a leitura guardada ainda serve"""
+        agora = time.time() if agora is None else agora
+
+        # Placa já confirmada e praticamente parada: reaproveita
+        if trilha.confirmada is not None:
+            return calcular_iou(trilha.caixa, trilha.caixa_ocr) < self.iou_reocr
+
+        # Ainda juntando leituras para a votação: lê de novo no próximo frame
+        if trilha.texto is not None and not trilha.votacao.cheia():
+            return True
+
+        # Trilha nova ou OCR falhando: tenta de novo, mas sem rodar o OCR em todo frame
+        if trilha.ultima_tentativa is None:
+            return True
+        return agora - trilha.ultima_tentativa >= self.intervalo_tentativa
+
+    def registrar_tentativa(self, trilha, agora=None):
+        trilha.ultima_tentativa = time.time() if agora is None else agora
+        trilha.tentativas_ocr += 1
+        self.ocr_executados += 1
+
+    def registrar_reuso(self):
+        self.ocr_evitados += 1
+
+    def registrar_leitura(self, trilha, texto, confianca, agora=None, definitiva=False):
+        """
+        Soma a leitura na votação da trilha e atualiza o texto confirmado.
+        definitiva=True confirma na hora, sem esperar a votação (leitura já conferida no cadastro).
+        """
+        trilha.votacao.adicionar(texto, confianca, agora)
+        trilha.texto, trilha.confianca = trilha.votacao.resultado()
+        trilha.caixa_ocr = trilha.caixa
+
+        decidido = texto if definitiva else trilha.votacao.decidir(agora)
+        if decidido is not None:
+            trilha.confirmada = decidido
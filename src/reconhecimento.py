@@ -1,24 +1,125 @@
+import threading
+import time
+
 import cv2
-import easyocr
 import numpy as np
 import imutils
 
+from backends_ocr import carregar_backend
+from consenso import VotacaoPlaca
+from fontes import abrir_fonte
+from rastreador import RastreadorPlacas
+from validacao_placa import CorretorPlaca
+
+
+KERNEL_FECHAMENTO = np.ones((3, 3), np.uint8)
+
+
+def ordenar_cantos(pontos):
+    """Ordena 4 pontos como superior-esquerdo, superior-direito, inferior-direito, inferior-esquerdo"""
+    soma = pontos.sum(axis=1)
+    diferenca = np.diff(pontos, axis=1).ravel()
+    return np.array([pontos[np.argmin(soma)], pontos[np.argmin(diferenca)],
+                     pontos[np.argmax(soma)], pontos[np.argmax(diferenca)]], dtype=np.float32)
+
 
 class DetectorPlaca:
-    def __init__(self, gpu=False, min_area=300):
-        print("Carregando modelo OCR (uma única vez)...")
-        # Inicializa o EasyOCR.
-        # 'gpu=True' é muito mais rápido (precisa de NVIDIA CUDA).
-        # 'quantize=False' mantém precisão alta.
-        self.reader = easyocr.Reader(['pt'], gpu=gpu, quantize=False)
+    def __init__(self, gpu=False, min_area=300, consenso_min_leituras=3, consenso_janela_ms=1500,
+                 consenso_limiar=0.6, reader=None, fonte=0, modo_deteccao="padrao", roi=None,
+                 escala_busca=0.5, top_k=10, quantizado=False, carregar_em_segundo_plano=False,
+                 backend_ocr="easyocr", opcoes_ocr=None, corretor=None, limiar_confirmacao_imediata=0.7,
+                 captura=None):
+        # Várias câmeras podem receber o mesmo reader (ex.: PoolOCR) e carregar o modelo uma vez só.
+        # Sem reader, carrega o motor 'backend_ocr' (easyocr, onnx ou tesseract; ver backends_ocr.py)
+        self.reader = reader
+        opcoes_ocr = dict(opcoes_ocr or {})
+        if backend_ocr == "easyocr":
+            opcoes_ocr.setdefault("gpu", gpu)
+            opcoes_ocr.setdefault("quantizado", quantizado)
+        self.erro_modelo = None
+        self._modelo_carregado = threading.Event()
+        if reader is not None:
+            self._modelo_carregado.set()
+        elif carregar_em_segundo_plano:
+            # A janela abre na hora; até o modelo ficar pronto a placa é localizada mas não lida
+            threading.Thread(target=self._carregar_modelo, args=(backend_ocr, opcoes_ocr), name="carregar-ocr",
+                             daemon=True).start()
+        else:
+            self.reader = carregar_backend(backend_ocr, **opcoes_ocr)
+            self._modelo_carregado.set()
         self.min_area = min_area
+        # Fonte de vídeo: índice da webcam, URL RTSP, arquivo de vídeo ou pasta de imagens
+        self.fonte = fonte
+        # Opções do modo de baixa latência (fontes.CapturaRecente), ex.: {"largura": 1280, "fourcc": "MJPG"}
+        self.captura = captura
         self.cap = None
+        self.timestamp_frame = None  # Momento em que o último frame lido saiu da câmera
+        # Último retângulo encontrado (usado pela interface para desenhar por cima do vídeo)
+        self.ultima_localizacao = None
+
+        # Detecção: "padrao" (frame inteiro) ou "rapido" (ROI + resolução reduzida)
+        self.modo_deteccao = modo_deteccao
+        self.roi = roi  # (x, y, largura, altura) em frações do frame, ex.: (0, 0.4, 1, 0.6)
+        self.escala_busca = escala_busca  # Fator de redução da imagem na busca rápida
+        self.top_k = top_k  # Quantos contornos (os maiores) testar como placa
+
+        # Consenso: a placa só é confirmada depois de algumas leituras concordarem
+        self.consenso_min_leituras = consenso_min_leituras
+        self.consenso_janela_ms = consenso_janela_ms
+        self.consenso_limiar = consenso_limiar
+
+        # Validação do formato da placa; com cadastro (CorretorPlaca(cadastro=...)) também
+        # ajusta leituras quase iguais a uma placa cadastrada
+        self.corretor = corretor if corretor is not None else CorretorPlaca()
+        self.limiar_confirmacao_imediata = limiar_confirmacao_imediata
+
+        # Rastreador: acompanha a mesma placa entre frames para não rodar o OCR toda hora
+        self.rastreador = RastreadorPlacas(criar_votacao=self.nova_votacao)
+        self.ultima_trilha = None
+
+        # Tempo (em segundos) de cada etapa do último processar(), usado no benchmark e nas métricas
+        self.tempos_etapas = {}
+        # Contadores para as métricas: frames com retângulo de placa e leituras aceitas/rejeitadas
+        self.candidatos = 0
+        self.placas_aceitas = 0
+        self.placas_rejeitadas = 0
+
+    def _carregar_modelo(self, backend_ocr, opcoes_ocr):
+        try:
+            self.reader = carregar_backend(backend_ocr, **opcoes_ocr)
+        except Exception as e:
+            # Sem o modelo a câmera continua funcionando; a interface mostra o erro
+            print(f"Erro ao carregar o modelo OCR: {e}")
+            self.erro_modelo = e
+        finally:
+            self._modelo_carregado.set()
+
+    @property
+    def modelo_pronto(self):
+        # Um pool de processos (PoolProcessosOCR) já existe enquanto os processos ainda carregam o modelo
+        return self.reader is not None and getattr(self.reader, "pronto", True)
+
+    def aguardar_modelo(self, timeout=None):
+        """Espera o carregamento em segundo plano terminar; retorna True se o modelo está pronto"""
+        self._modelo_carregado.wait(timeout)
+        if hasattr(self.reader, "aguardar_pronto"):
+            self.reader.aguardar_pronto(timeout)
+        return self.modelo_pronto
+
+    def nova_votacao(self):
+        """Cria a votação de uma trilha nova com os parâmetros atuais de consenso"""
+        return VotacaoPlaca(self.consenso_min_leituras, self.consenso_janela_ms, self.consenso_limiar)
+
+    def reiniciar_rastreamento(self):
+        """Esquece as placas acompanhadas (ex.: imagens independentes, câmera reconectada)"""
+        self.rastreador.trilhas.clear()
+        self.ultima_trilha = None
 
     def conectar_camera(self):
         """Inicia a conexão com a webcam se não estiver ativa"""
         # Verifica se o objeto de captura existe ou se está fechado
         if self.cap is None or not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(0)  # 0 é geralmente a webcam padrão
+            self.cap = abrir_fonte(self.fonte, self.captura)  # 0 é geralmente a webcam padrão
             return True
         return True
 
@@ -37,22 +138,26 @@ class DetectorPlaca:
         ret, frame = self.cap.read()
         if not ret:
             return None
+        # A CapturaRecente informa quando o frame foi capturado; nas outras fontes é o momento da leitura
+        self.timestamp_frame = getattr(self.cap, "timestamp_atual", None) or time.time()
         return frame
 
-    def processar(self, frame):
-        """
-        Recebe um frame, tenta achar a placa e ler.
-        """
-        if frame is None:
-            return None, None, None
+    # ================= LOCALIZAÇÃO DA PLACA =================
+    def _localizar_padrao(self, frame, tempos):
+        """Busca original: frame inteiro, em resolução cheia"""
+        inicio = time.perf_counter()
 
         # --- ETAPA 1: Pré-processamento visual ---
         # Converte para cinza (reduz a complexidade de 3 canais de cor para 1)
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         # Blur Gaussian: Suaviza a imagem para remover ruídos que atrapalham a detecção de bordas
         blur = cv2.GaussianBlur(gray, (5, 5), 0)
+        marca = time.perf_counter()
+        tempos["preprocessamento"] = marca - inicio
         # Canny: Algoritmo para detectar bordas baseado em gradiente de cor
         edged = cv2.Canny(blur, 30, 200)
+        tempos["canny"] = time.perf_counter() - marca
+        marca = time.perf_counter()
 
         # --- ETAPA 2: Encontrar Contornos ---
         # Encontra as curvas que formam objetos na imagem de bordas
@@ -74,52 +179,190 @@ class DetectorPlaca:
                 location = approx
                 break
 
+        tempos["contornos"] = time.perf_counter() - marca
+        return location
+
+    def _localizar_rapido(self, frame, tempos):
+        """
+        Busca rápida: só dentro da região de interesse (ROI), em resolução reduzida,
+        pegando apenas os contornos externos. Nenhuma imagem do tamanho do frame é criada.
+        Obs.: RETR_EXTERNAL não enxerga uma placa que esteja dentro de outro contorno
+        fechado; se isso acontecer na sua câmera, ajuste o ROI para enquadrar só a faixa.
+        """
+        inicio = time.perf_counter()
+        x0, y0, x1, y1 = self._roi_em_pixels(frame.shape[1], frame.shape[0])
+        escala = self.escala_busca
+
+        # Fatiar o frame não copia nada; o resize já devolve a imagem pequena
+        regiao = frame[y0:y1, x0:x1]
+        if escala != 1.0:
+            regiao = cv2.resize(regiao, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(regiao, cv2.COLOR_BGR2GRAY)
+        blur = cv2.GaussianBlur(gray, (5, 5), 0)
+        marca = time.perf_counter()
+        tempos["preprocessamento"] = marca - inicio
+        edged = cv2.Canny(blur, 30, 200)
+        # Na imagem reduzida a borda da placa pode ficar com falhas de 1 pixel;
+        # a dilatação fecha essas falhas para o contorno externo continuar fechado
+        edged = cv2.dilate(edged, KERNEL_FECHAMENTO)
+        tempos["canny"] = time.perf_counter() - marca
+        marca = time.perf_counter()
+
+        # O Canny já é uma imagem nova, então o findContours pode usá-la sem copy()
+        contours = imutils.grab_contours(cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE))
+        location = None
+        if contours:
+            # Seleção parcial dos k maiores (argpartition) em vez de ordenar todos os contornos
+            areas = np.fromiter((cv2.contourArea(c) for c in contours), dtype=np.float64, count=len(contours))
+            k = min(self.top_k, len(areas))
+            maiores = np.argpartition(-areas, k - 1)[:k]
+            maiores = maiores[np.argsort(-areas[maiores])]
+
+            area_minima = self.min_area * escala * escala
+            for i in maiores:
+                if areas[i] <= area_minima:
+                    break
+                peri = cv2.arcLength(contours[i], True)
+                approx = cv2.approxPolyDP(contours[i], 0.02 * peri, True)
+                if len(approx) == 4:
+                    # Volta para as coordenadas do frame original
+                    location = (approx / escala + (x0, y0)).astype(np.int32)
+                    break
+
+        tempos["contornos"] = time.perf_counter() - marca
+        return location
+
+    def _roi_em_pixels(self, largura, altura):
+        if self.roi is None:
+            return 0, 0, largura, altura
+        rx, ry, rw, rh = self.roi
+        x0, y0 = int(rx * largura), int(ry * altura)
+        return x0, y0, min(largura, x0 + int(rw * largura)), min(altura, y0 + int(rh * altura))
+
+    # ================= RECORTE DA PLACA =================
+    def _recortar_padrao(self, frame, location):
+        """Recorte original: máscara do tamanho do frame e np.where para achar os limites"""
+        # Cria uma máscara preta do tamanho da imagem
+        mask = np.zeros(frame.shape[:2], np.uint8)
+        # Pinta de branco a área onde a placa está na máscara
+        cv2.drawContours(mask, [location], 0, 255, -1)
+        # Recorta a imagem original usando a máscara (fundo fica preto)
+        new_image = cv2.bitwise_and(frame, frame, mask=mask)
+
+        # Corta o retângulo exato (Crop) removendo as partes pretas inúteis
+        (x, y) = np.where(mask == 255)
+        if len(x) == 0 or len(y) == 0:
+            return None
+        (topx, topy) = (np.min(x), np.min(y))
+        (bottomx, bottomy) = (np.max(x), np.max(y))
+        return new_image[topx:bottomx + 1, topy:bottomy + 1]
+
+    def _recortar_rapido(self, frame, location):
+        """Recorte direto: boundingRect dá o tamanho e a perspectiva endireita a placa"""
+        _, _, w, h = cv2.boundingRect(location)
+        if w < 2 or h < 2:
+            return None
+        origem = ordenar_cantos(location.reshape(4, 2).astype(np.float32))
+        destino = np.array([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]], dtype=np.float32)
+        matriz = cv2.getPerspectiveTransform(origem, destino)
+        # warpPerspective só aloca a imagem de saída (w x h), não o frame inteiro
+        return cv2.warpPerspective(frame, matriz, (w, h))
+
+    def processar(self, frame):
+        """
+        Recebe um frame, tenta achar a placa e ler.
+        """
+        if frame is None:
+            return None, None, None
+
+        tempos = self.tempos_etapas = {}
+
+        # --- ETAPAS 1 e 2: achar o retângulo da placa ---
+        if self.modo_deteccao == "rapido":
+            location = self._localizar_rapido(frame, tempos)
+        else:
+            location = self._localizar_padrao(frame, tempos)
+
+        self.ultima_localizacao = location
+        self.ultima_trilha = None
         texto_lido = None
         crop = None
 
-        # --- ETAPA 3: Extração e Leitura ---
-        if location is not None:
-            # Desenha o retângulo verde na imagem original
-            cv2.drawContours(frame, [location], -1, (0, 255, 0), 2)
-
-            try:
-                # Cria uma máscara preta do tamanho da imagem
-                mask = np.zeros(gray.shape, np.uint8)
-                # Pinta de branco a área onde a placa está na máscara
-                new_image = cv2.drawContours(mask, [location], 0, 255, -1)
-                # Recorta a imagem original usando a máscara (fundo fica preto)
-                new_image = cv2.bitwise_and(frame, frame, mask=mask)
-
-                # Corta o retângulo exato (Crop) removendo as partes pretas inúteis
-                (x, y) = np.where(mask == 255)
-                if len(x) > 0 and len(y) > 0:
-                    (topx, topy) = (np.min(x), np.min(y))
-                    (bottomx, bottomy) = (np.max(x), np.max(y))
-                    crop = new_image[topx:bottomx + 1, topy:bottomy + 1]
-
-                    # --- ETAPA 4: Tratamento para o OCR (Melhorar a imagem para a IA) ---
-                    crop_gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-                    # Aumenta a imagem 3x (Upscaling) - Ajuda muito o OCR em placas distantes
-                    crop_gray = cv2.resize(crop_gray, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
-                    # Threshold (Otsu): Transforma em preto e branco puro (binário) para destacar letras
-                    _, crop_binary = cv2.threshold(crop_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-                    # --- ETAPA 5: Reconhecimento de Texto ---
-                    result = self.reader.readtext(crop_binary)
-
-                    for (bbox, text, prob) in result:
-                        # Limpeza: Remove espaços, pontos e traços para padronizar
-                        text_clean = text.replace(" ", "").upper().replace("-", "").replace(".", "")
-
-                        # Filtro de qualidade: Só aceita se tiver 7 caracteres (padrão Brasil)
-                        # e certeza acima de 40%
-                        if len(text_clean) >= 7 and prob > 0.4:
-                            texto_lido = text_clean
-                            # Escreve o texto lido na tela acima do retângulo
-                            cv2.putText(frame, text_clean, (location[0][0][0], location[0][0][1] - 10),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            except Exception as e:
-                # O try/except evita que o programa crashe se o crop falhar
-                pass
-
-        return frame, texto_lido, crop
\ No newline at end of file
+        if location is None:
+            self.rastreador.expirar()
+            return frame, texto_lido, crop
+
+        self.candidatos += 1
+
+        # --- ETAPA 3: Rastreamento ---
+        # Liga o retângulo atual a uma placa que já estava sendo vista (ou abre uma trilha nova)
+        trilha = self.rastreador.atualizar(cv2.boundingRect(location))
+        self.ultima_trilha = trilha
+
+        # Desenha o retângulo verde na imagem original
+        cv2.drawContours(frame, [location], -1, (0, 255, 0), 2)
+
+        if not self.rastreador.precisa_ocr(trilha):
+            # Mesma placa, parada e já confirmada: reaproveita a leitura sem rodar o OCR
+            self.rastreador.registrar_reuso()
+            texto_lido = trilha.confirmada
+            cv2.putText(frame, texto_lido, (location[0][0][0], location[0][0][1] - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            return frame, texto_lido, crop
+
+        if not self.modelo_pronto:
+            # Modelo de OCR ainda carregando: mostra o retângulo, mas não tenta ler
+            return frame, texto_lido, crop
+
+        # --- ETAPA 4: Extração e Leitura ---
+        self.rastreador.registrar_tentativa(trilha)
+        marca = time.perf_counter()
+        try:
+            if self.modo_deteccao == "rapido":
+                crop = self._recortar_rapido(frame, location)
+            else:
+                crop = self._recortar_padrao(frame, location)
+
+            if crop is not None and crop.size > 0:
+                # --- ETAPA 5: Tratamento para o OCR (Melhorar a imagem para a IA) ---
+                crop_gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+                # Aumenta a imagem 3x (Upscaling) - Ajuda muito o OCR em placas distantes
+                crop_gray = cv2.resize(crop_gray, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+                # Threshold (Otsu): Transforma em preto e branco puro (binário) para destacar letras
+                _, crop_binary = cv2.threshold(crop_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                tempos["recorte"] = time.perf_counter() - marca
+                marca = time.perf_counter()
+
+                # --- ETAPA 6: Reconhecimento de Texto ---
+                result = self.reader.readtext(crop_binary)
+                tempos["ocr"] = time.perf_counter() - marca
+
+                # Validação: só passa o que cabe no formato antigo ou Mercosul,
+                # já com as trocas O/0, I/1, B/8, S/5... corrigidas e conferido com o cadastro
+                placa, prob, cadastrada = self.corretor.corrigir(result)
+
+                # Filtro de qualidade: certeza acima de 40%
+                if placa and prob > 0.4:
+                    # Placa do cadastro lida com boa certeza já é confirmada neste frame;
+                    # as outras viram um voto na trilha desta placa
+                    definitiva = cadastrada and prob >= self.limiar_confirmacao_imediata
+                    self.rastreador.registrar_leitura(trilha, placa, prob, definitiva=definitiva)
+                    self.placas_aceitas += 1
+                else:
+                    self.placas_rejeitadas += 1
+
+                # Só devolve o texto quando as leituras da trilha chegarem a um consenso
+                texto_lido = trilha.confirmada
+                if texto_lido:
+                    # Escreve o texto lido na tela acima do retângulo
+                    cv2.putText(frame, texto_lido, (location[0][0][0], location[0][0][1] - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                elif trilha.texto:
+                    # Leitura ainda em votação aparece em amarelo
+                    cv2.putText(frame, trilha.texto, (location[0][0][0], location[0][0][1] - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+        except Exception as e:
+            # O try/except evita que o programa crashe se o crop falhar
+            pass
+
+        return frame, texto_lido, crop
@@ -0,0 +1,244 @@
+"""
+Modo serviço da guarita: roda sem interface gráfica, com várias câmeras.
+
+Cada câmera (faixa) tem a sua captura e o seu rastreamento, mas todas usam
+o mesmo modelo de OCR (PoolOCR), carregado uma única vez.
+
+Uso:
+    cd src
+    python servico.py --config ../cameras.exemplo.json
+
+Formato do arquivo de configuração (JSON):
+    {
+        "gpu": false,
+        "ocr_quantizado": false,
+        "ocr_backend": "easyocr",
+        "ocr_opcoes": {},
+        "ocr_workers": 1,
+        "ocr_max_lote": 4,
+        "ocr_max_espera_ms": 15,
+        "ocr_processos": 0,
+        "metricas": {"porta": 9108, "arquivo": "../logs/metricas.jsonl", "intervalo": 60},
+        "alertas": {"arquivo": "../logs/alertas.jsonl", "som": true, "webhook": "http://127.0.0.1:8080/alerta",
+                    "intervalo_repeticao": 60, "max_por_placa": 3},
+        "cameras": [
+            {"nome": "entrada_principal", "fonte": 0, "sentido": "entrada",
+             "captura": {"largura": 1280, "altura": 720, "fps": 30, "fourcc": "MJPG", "buffer": 1}},
+            {"nome": "saida_principal", "fonte": "rtsp://192.168.0.10/stream", "sentido": "saida",
+             "detector": {"modo_deteccao": "rapido", "roi": [0, 0.3, 1, 0.7]}},
+            {"nome": "teste", "fonte": "../videos/portao.mp4", "sentido": "auto",
+             "detector": {"min_area": 500}, "movimento": false},
+            {"nome": "replay", "fonte": {"origem": "../videos/portao.mp4", "velocidade": 2, "repetir": true},
+             "sentido": "entrada"}
+        ]
+    }
+"""
+import argparse
+import json
+import logging
+import queue
+import signal
+import sqlite3
+import threading
+import time
+
+import database_manager
+from alertas import CentralAlertas, SinkLog, criar_sinks
+from controle_acesso import ControleAcesso
+from metricas import GravadorArquivoMetricas, ServidorMetricas, metricas
+from movimento import DetectorMovimento
+from pipeline import PipelineReconhecimento
+from pool_ocr import PoolOCR
+from processos_ocr import PoolProcessosOCR
+from reconhecimento import DetectorPlaca
+from validacao_placa import CorretorPlaca
+
+log = logging.getLogger("guarita")
+
+
+class Faixa:
+    """Uma câmera do portão: captura, reconhecimento e decisão de acesso"""
+
+    def __init__(self, nome, fonte, sentido, reader, opcoes_detector=None, opcoes_movimento=None, alertas=None,
+                 opcoes_captura=None):
+        self.nome = nome
+        self.alertas = alertas
+        # opcoes_captura liga o modo de baixa latência (sempre o frame mais novo da câmera)
+        self.detector = DetectorPlaca(reader=reader, fonte=fonte, captura=opcoes_captura,
+                                      corretor=CorretorPlaca(cadastro=database_manager.cache_veiculos),
+                                      **(opcoes_detector or {}))
+        # opcoes_movimento=False desliga o filtro de movimento (processa todos os frames)
+        movimento = None
+        if opcoes_movimento is not False:
+            opcoes_movimento = {"roi": self.detector.roi, **(opcoes_movimento or {})}
+            movimento = DetectorMovimento(**opcoes_movimento)
+        self.pipeline = PipelineReconhecimento(self.detector, movimento=movimento, nome=nome)
+        self.controle = ControleAcesso(sentido=sentido)
+        self.decisoes = 0
+        self.erros_banco = 0
+        # Do frame capturado até a decisão do portão (fila, detecção, OCR, consenso e banco)
+        self.tempo_decisao = metricas.histograma("guarita_etapa_segundos", etapa="ponta_a_ponta", faixa=nome)
+        self._thread = None
+
+    def iniciar(self):
+        self.pipeline.iniciar()
+        self._thread = threading.Thread(target=self._loop_decisoes, name=f"decisoes-{self.nome}", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self.pipeline.parar()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _loop_decisoes(self):
+        while self.pipeline.ativo:
+            try:
+                resultado = self.pipeline.resultados.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                decisao = self.controle.processar(resultado["texto"])
+            except sqlite3.Error as e:
+                # Um erro de banco não pode derrubar a câmera: registra e segue para a próxima placa
+                self.erros_banco += 1
+                log.error("[%s] Erro no banco ao processar %s: %s", self.nome, resultado["texto"], e)
+                continue
+            self._registrar(decisao, time.time() - resultado["timestamp"])
+
+    def _registrar(self, decisao, latencia):
+        acao, placa = decisao["acao"], decisao["placa"]
+        if acao is None:
+            return
+        self.decisoes += 1
+        self.tempo_decisao.observar(latencia)
+        if decisao["alerta"] and self.alertas is not None:
+            # Não bloqueia: os destinos (log, som, webhook...) são atendidos pelas threads da central
+            self.alertas.emitir(decisao["alerta"], placa, decisao["mensagem"], faixa=self.nome)
+        elif acao == "bloqueado":
+            log.warning("[%s] ALERTA: veículo BLOQUEADO %s", self.nome, placa)
+        elif acao == "desconhecido":
+            log.info("[%s] Visitante desconhecido: %s", self.nome, placa)
+        else:
+            log.info("[%s] %s %s: %s", self.nome, acao.capitalize(), placa, decisao["mensagem"])
+
+
+class ServicoGuarita:
+    """Sobe todas as faixas da configuração e as mantém rodando até receber um sinal de parada"""
+
+    def __init__(self, config):
+        if not config.get("cameras"):
+            raise ValueError("A configuração precisa de pelo menos uma câmera em 'cameras'")
+
+        database_manager.inicializar_banco()
+        database_manager.cache_veiculos.carregar()
+
+        # Motor de OCR: "easyocr" (padrão), "onnx" ou "tesseract", com as opções próprias em "ocr_opcoes"
+        backend = config.get("ocr_backend", "easyocr")
+        opcoes_backend = dict(config.get("ocr_opcoes", {}))
+        if backend == "easyocr":
+            opcoes_backend.setdefault("gpu", config.get("gpu", False))
+            opcoes_backend.setdefault("quantizado", config.get("ocr_quantizado", False))
+
+        if config.get("ocr_processos"):
+            # Um modelo por processo: as faixas leem em paralelo usando todos os núcleos
+            self.pool = PoolProcessosOCR(backend, opcoes_backend, processos=config["ocr_processos"],
+                                         threads_por_processo=config.get("ocr_threads_por_processo"))
+            log.info("Carregando o OCR em %d processos (%d threads cada)...",
+                     self.pool.processos, self.pool.threads_por_processo)
+            if not self.pool.aguardar_pronto():
+                self.pool.encerrar()
+                raise RuntimeError(f"Modelo OCR não carregou nos processos: {self.pool.erro_carga}")
+        else:
+            # Com várias faixas, juntar os recortes num lote dilui o custo de cada chamada ao modelo
+            self.pool = PoolOCR.criar(backend, opcoes_backend, workers=config.get("ocr_workers", 1),
+                                      max_lote=config.get("ocr_max_lote", len(config["cameras"])),
+                                      max_espera_ms=config.get("ocr_max_espera_ms", 15))
+        self.intervalo_estatisticas = config.get("intervalo_estatisticas", 60)
+
+        # BLOQUEADO/SUSPEITO: sempre no log e, se configurado, em arquivo, som e webhook
+        opcoes_alertas = config.get("alertas", {})
+        self.alertas = CentralAlertas([SinkLog(log)] + criar_sinks(opcoes_alertas),
+                                      intervalo_repeticao=opcoes_alertas.get("intervalo_repeticao", 60),
+                                      max_por_placa=opcoes_alertas.get("max_por_placa", 3))
+        self.faixas = [
+            Faixa(cam["nome"], cam["fonte"], cam.get("sentido", "auto"), self.pool, cam.get("detector"),
+                  cam.get("movimento"), alertas=self.alertas, opcoes_captura=cam.get("captura"))
+            for cam in config["cameras"]
+        ]
+        self._parar = threading.Event()
+
+        # Métricas: "porta" liga o /metrics (Prometheus) e "arquivo" o resumo periódico em JSON
+        opcoes_metricas = config.get("metricas", {})
+        self.servidor_metricas = None
+        self.arquivo_metricas = None
+        if opcoes_metricas.get("porta"):
+            self.servidor_metricas = ServidorMetricas(porta=opcoes_metricas["porta"],
+                                                      endereco=opcoes_metricas.get("endereco", "127.0.0.1"))
+            log.info("Métricas em http://%s:%d/metrics", opcoes_metricas.get("endereco", "127.0.0.1"),
+                     self.servidor_metricas.porta)
+        if opcoes_metricas.get("arquivo"):
+            self.arquivo_metricas = GravadorArquivoMetricas(opcoes_metricas["arquivo"],
+                                                            intervalo=opcoes_metricas.get("intervalo", 60))
+
+    def executar(self):
+        for faixa in self.faixas:
+            log.info("Iniciando câmera %s (fonte=%s, sentido=%s)",
+                     faixa.nome, faixa.detector.fonte, faixa.controle.sentido)
+            faixa.iniciar()
+
+        try:
+            while not self._parar.wait(self.intervalo_estatisticas):
+                self.registrar_estatisticas()
+        finally:
+            self.encerrar()
+
+    def parar(self, *_):
+        self._parar.set()
+
+    def registrar_estatisticas(self):
+        for faixa in self.faixas:
+            stats = faixa.pipeline.estatisticas()
+            log.info("[%s] câmera %.1f fps | OCR %.1f fps | descartados %d (+%d na câmera) | sem movimento %d | "
+                     "decisões %d", faixa.nome, stats["fps_captura"], stats["fps_processamento"],
+                     stats["frames_descartados"], stats["frames_descartados_camera"], stats["frames_ociosos"],
+                     faixa.decisoes)
+        ocr = self.pool.estatisticas()
+        log.info("OCR: %.1f placas/s | lote médio %.1f | %.0f ms por lote",
+                 ocr["placas_por_segundo"], ocr["tamanho_medio_lote"], ocr["tempo_medio_lote_ms"])
+        banco = database_manager.gravador_acessos.estatisticas()
+        log.info("Acessos: %d gravados em %d transações | %d na fila | %d no campus | %d erros",
+                 banco["gravados"], banco["lotes"], banco["pendentes"], banco["dentro"], banco["erros"])
+
+    def encerrar(self):
+        log.info("Encerrando serviço...")
+        for faixa in self.faixas:
+            faixa.parar()
+        self.pool.encerrar()
+        self.alertas.encerrar()
+        database_manager.gravador_acessos.encerrar()
+        database_manager.fechar_conexoes()
+        if self.arquivo_metricas is not None:
+            self.arquivo_metricas.encerrar()
+        if self.servidor_metricas is not None:
+            self.servidor_metricas.encerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guarita sem interface gráfica (várias câmeras)")
+    parser.add_argument("--config", required=True, help="Arquivo JSON com as câmeras")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    with open(args.config, encoding="utf-8") as arquivo:
+        config = json.load(arquivo)
+
+    servico = ServicoGuarita(config)
+    # Ctrl+C ou 'kill' fecham as câmeras e o banco com calma
+    signal.signal(signal.SIGINT, servico.parar)
+    signal.signal(signal.SIGTERM, servico.parar)
+    servico.executar()
+
+
+if __name__ == "__main__":
+    main()
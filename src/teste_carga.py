@@ -0,0 +1,219 @@
+"""
+Teste de carga do portão (sem câmeras).
+
+Várias faixas virtuais tocam um vídeo, uma pasta de imagens ou placas sintéticas
+pelo caminho completo do modo serviço: reconhecimento -> buscar_veiculo ->
+registrar_entrada/registrar_saida. Tudo roda numa cópia descartável do banco
+(o estacionamento.db de verdade não é alterado). Para cada quantidade de faixas
+informa placas/s, decisões/s, latência do frame até a decisão e erros de banco.
+
+Exemplos:
+    cd src
+    # 1, 2, 4 e 8 faixas com placas do cadastro desenhadas na hora, 30 s cada, sem limite de fps
+    python teste_carga.py --faixas 1 2 4 8 --duracao 30
+    # O mesmo vídeo em todas as faixas, a 4x a velocidade real
+    python teste_carga.py --fonte ../videos/portao.mp4 --velocidade 4 --faixas 2 4
+    # Com edições do cadastro acontecendo ao mesmo tempo (disputa pela escrita no banco)
+    python teste_carga.py --faixas 4 --escritas-cadastro 5
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import database_manager
+from benchmark import gravar_resultado, resumir
+from fontes import FonteSintetica
+from gerador_placas import gerar_texto_placa
+from pool_ocr import PoolOCR
+from processos_ocr import PoolProcessosOCR
+from servico import Faixa
+
+
+class FaixaCarga(Faixa):
+    """Faixa do serviço que também guarda cada latência (para os percentis do relatório)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.placas_lidas = 0
+        self.latencias = []
+
+    def _registrar(self, decisao, latencia):
+        self.placas_lidas += 1
+        if decisao["acao"] is not None:
+            self.latencias.append(latencia)
+        super()._registrar(decisao, latencia)
+
+
+def copiar_banco(origem, pasta):
+    """Cópia consistente do banco (a API de backup do SQLite inclui o que ainda está no WAL)"""
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, "carga.db")
+    if origem and os.path.exists(origem):
+        fonte = sqlite3.connect(origem)
+        copia = sqlite3.connect(destino)
+        with copia:
+            fonte.backup(copia)
+        fonte.close()
+        copia.close()
+    return destino
+
+
+def preparar_placas(quantidade, fracao_visitantes, semente=42):
+    """Placas do cadastro da cópia (completando com sintéticas) e alguns visitantes sem cadastro"""
+    rng = random.Random(semente)
+    placas = database_manager.cache_veiculos.placas()[:quantidade]
+    while len(placas) < quantidade:
+        placa = gerar_texto_placa(rng)
+        database_manager.cadastrar_veiculo(placa, "Teste de carga", "Carro", "Visitante")
+        placas.append(placa)
+    visitantes = [gerar_texto_placa(rng) for _ in range(int(quantidade * fracao_visitantes))]
+    return placas + visitantes
+
+
+def escrever_cadastro(placas, por_segundo, parar, contagem):
+    """Simula o operador editando veículos enquanto o portão grava acessos"""
+    rng = random.Random(7)
+    while not parar.wait(1.0 / por_segundo):
+        placa = rng.choice(placas)
+        if database_manager.cadastrar_veiculo(placa, "Teste de carga", "Carro", "Visitante",
+                                              obs=time.strftime("%H:%M:%S")):
+            contagem["ok"] += 1
+        else:
+            contagem["erros"] += 1
+
+
+def criar_fonte(args, indice, placas):
+    if args.fonte:
+        return {"origem": args.fonte, "velocidade": args.velocidade, "repetir": True}
+    # Cada faixa vê as placas numa ordem diferente, como carros diferentes chegando em cada portão
+    ordem = random.Random(indice).sample(placas, len(placas))
+    sintetica = FonteSintetica(10 ** 9, args.frames_por_placa, args.largura, args.altura, semente=indice,
+                               placas=ordem)
+    return {"origem": sintetica, "velocidade": args.velocidade, "fps": args.fps}
+
+
+def executar_etapa(args, pool, quantidade_faixas, pasta):
+    """Roda 'quantidade_faixas' faixas por 'args.duracao' segundos numa cópia nova do banco ('pasta')"""
+    database_manager.DB_NAME = copiar_banco(args.banco, pasta)
+    database_manager.inicializar_banco()
+    database_manager.cache_veiculos.carregar()
+    placas = preparar_placas(args.placas, args.fracao_visitantes)
+    gravador = database_manager.gravador_acessos
+    gravador.recarregar()
+    inicio_banco = gravador.estatisticas()
+
+    faixas = [
+        FaixaCarga(f"faixa_{i}", criar_fonte(args, i, placas), args.sentido, pool,
+                   opcoes_movimento=None if args.movimento else False)
+        for i in range(quantidade_faixas)
+    ]
+    parar_escrita = threading.Event()
+    escritas = {"ok": 0, "erros": 0}
+    escritor = None
+    if args.escritas_cadastro:
+        escritor = threading.Thread(target=escrever_cadastro, daemon=True,
+                                    args=(placas[:args.placas], args.escritas_cadastro, parar_escrita, escritas))
+        escritor.start()
+
+    for faixa in faixas:
+        faixa.iniciar()
+    inicio = time.perf_counter()
+    maior_fila = 0
+    while time.perf_counter() - inicio < args.duracao:
+        time.sleep(0.2)
+        maior_fila = max(maior_fila, gravador.estatisticas()["pendentes"])
+    duracao = time.perf_counter() - inicio
+
+    parar_escrita.set()
+    if escritor is not None:
+        escritor.join(timeout=2)
+    for faixa in faixas:
+        faixa.parar()
+    # Tempo para o banco alcançar o que já foi decidido (o atraso da gravação em segundo plano)
+    marca = time.perf_counter()
+    gravador.gravar_pendentes(timeout=30)
+    tempo_esvaziar = time.perf_counter() - marca
+    banco = gravador.estatisticas()
+
+    latencias = [l for faixa in faixas for l in faixa.latencias]
+    stats = [faixa.pipeline.estatisticas() for faixa in faixas]
+    return {
+        "faixas": quantidade_faixas,
+        "duracao_s": round(duracao, 1),
+        "placas_por_segundo": round(sum(f.placas_lidas for f in faixas) / duracao, 2),
+        "decisoes_por_segundo": round(sum(f.decisoes for f in faixas) / duracao, 2),
+        "latencia_decisao_ms": resumir(latencias),
+        "frames_descartados": sum(s["frames_descartados"] for s in stats),
+        "ocr": pool.estatisticas(),
+        "banco": {
+            "acessos_gravados": banco["gravados"] - inicio_banco["gravados"],
+            "transacoes": banco["lotes"] - inicio_banco["lotes"],
+            "erros_gravacao": banco["erros"] - inicio_banco["erros"],
+            "erros_decisao": sum(f.erros_banco for f in faixas),
+            "maior_fila_pendente": maior_fila,
+            "tempo_para_esvaziar_s": round(tempo_esvaziar, 3),
+            "escritas_cadastro": escritas,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do portão com faixas virtuais")
+    parser.add_argument("--faixas", type=int, nargs="+", default=[1, 2, 4],
+                        help="Quantidades de faixas simultâneas, uma etapa para cada")
+    parser.add_argument("--duracao", type=float, default=30, help="Segundos de cada etapa")
+    parser.add_argument("--fonte", help="Vídeo ou pasta de imagens tocado em todas as faixas (padrão: sintético)")
+    parser.add_argument("--velocidade", type=float, default=0,
+                        help="1 = tempo real, 4 = 4x mais rápido, 0 = o mais rápido possível")
+    parser.add_argument("--fps", type=float, default=15, help="Sintético: fps da \"câmera\" no tempo real")
+    parser.add_argument("--frames-por-placa", type=int, default=5)
+    parser.add_argument("--largura", type=int, default=1280)
+    parser.add_argument("--altura", type=int, default=720)
+    parser.add_argument("--placas", type=int, default=200, help="Sintético: placas do cadastro usadas")
+    parser.add_argument("--fracao-visitantes", type=float, default=0.1,
+                        help="Sintético: placas sem cadastro, em fração de --placas")
+    parser.add_argument("--sentido", choices=["auto", "entrada", "saida"], default="auto")
+    parser.add_argument("--movimento", action="store_true", help="Liga o filtro de movimento nas faixas")
+    parser.add_argument("--escritas-cadastro", type=float, default=0,
+                        help="Edições do cadastro por segundo durante o teste (disputa pela escrita)")
+    parser.add_argument("--banco", default=database_manager.DB_NAME,
+                        help="Banco copiado para o teste (o original não é alterado)")
+    parser.add_argument("--backend", choices=["easyocr", "onnx", "tesseract"], default="easyocr")
+    parser.add_argument("--ocr-opcoes", type=json.loads, default=None)
+    parser.add_argument("--ocr-workers", type=int, default=1)
+    parser.add_argument("--ocr-processos", type=int, default=0,
+                        help="Lê as placas em N processos (PoolProcessosOCR) em vez de threads")
+    parser.add_argument("--saida", help="Grava o resultado JSON neste arquivo")
+    args = parser.parse_args()
+
+    if args.ocr_processos:
+        pool = PoolProcessosOCR(args.backend, args.ocr_opcoes, processos=args.ocr_processos)
+        if not pool.aguardar_pronto():
+            pool.encerrar()
+            raise SystemExit(f"Modelo OCR não carregou nos processos: {pool.erro_carga}")
+    else:
+        pool = PoolOCR.criar(args.backend, args.ocr_opcoes, workers=args.ocr_workers, max_lote=max(args.faixas))
+    pasta = tempfile.mkdtemp(prefix="guarita_carga_")
+    etapas = []
+    try:
+        for i, quantidade in enumerate(args.faixas):
+            print(f"Etapa com {quantidade} faixa(s)...")
+            etapas.append(executar_etapa(args, pool, quantidade, os.path.join(pasta, f"etapa_{i}")))
+    finally:
+        pool.encerrar()
+        database_manager.gravador_acessos.encerrar()
+        database_manager.fechar_conexoes()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    gravar_resultado({"data": time.strftime("%Y-%m-%d %H:%M:%S"), "fonte": args.fonte or "sintetico",
+                      "velocidade": args.velocidade, "etapas": etapas}, args.saida)
+
+
+if __name__ == "__main__":
+    main()
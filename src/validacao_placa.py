@@ -0,0 +1,243 @@
+"""
+Validação e correção das leituras do OCR para placas brasileiras.
+
+Formatos aceitos (L = letra, N = número):
+    antigo   LLLNNNN  (ABC1234)
+    mercosul LLLNLNN  (ABC1D23)
+
+O OCR costuma trocar letras e números parecidos (O/0, I/1, B/8, S/5...).
+Como cada posição da placa só pode ter letra ou só número, dá para corrigir
+essas trocas pela posição. Com o cadastro de veículos, uma leitura quase igual
+a uma placa cadastrada (1 caractere de diferença) é ajustada para ela.
+"""
+import re
+
+FORMATOS = {"antigo": "LLLNNNN", "mercosul": "LLLNLNN"}
+TAMANHO_PLACA = 7
+
+# Trocas comuns do OCR, aplicadas só quando a posição exige o outro tipo de caractere
+LETRA_PARA_NUMERO = {"O": "0", "Q": "0", "D": "0", "U": "0", "I": "1", "L": "1", "J": "1",
+                     "Z": "2", "A": "4", "S": "5", "G": "6", "T": "7", "B": "8"}
+NUMERO_PARA_LETRA = {"0": "O", "1": "I", "2": "Z", "4": "A", "5": "S", "6": "G", "7": "T", "8": "B"}
+
+# Caracteres que o OCR confunde entre si; só trocas dentro do mesmo grupo ajustam
+# uma placa válida para outra do cadastro (evita trocar a placa de um visitante por
+# outra parecida que por acaso esteja cadastrada)
+GRUPOS_PARECIDOS = ["0ODQU", "1IJLT", "2Z", "4A", "5S", "6GC", "8B", "MN", "UV", "EF", "PR", "KX"]
+_GRUPO = {c: i for i, grupo in enumerate(GRUPOS_PARECIDOS) for c in grupo}
+
+_NAO_ALFANUMERICO = re.compile(r"[^A-Z0-9]")
+
+
+def limpar_texto(texto):
+    """Maiúsculas, sem espaços, traços, pontos ou qualquer outro símbolo"""
+    return _NAO_ALFANUMERICO.sub("", texto.upper())
+
+
+def placa_valida(placa):
+    return any(_correcoes_para_formato(placa, formato) == 0 for formato in FORMATOS.values())
+
+
+def _correcoes_para_formato(texto, formato):
+    """Quantos caracteres precisam de troca para 'texto' caber no formato (None se não der)"""
+    if len(texto) != len(formato):
+        return None
+    correcoes = 0
+    for caractere, classe in zip(texto, formato):
+        if classe == "L" and caractere.isdigit():
+            if caractere not in NUMERO_PARA_LETRA:
+                return None
+            correcoes += 1
+        elif classe == "N" and caractere.isalpha():
+            if caractere not in LETRA_PARA_NUMERO:
+                return None
+            correcoes += 1
+    return correcoes
+
+
+def _aplicar_formato(texto, formato):
+    return "".join(
+        NUMERO_PARA_LETRA.get(c, c) if classe == "L" else LETRA_PARA_NUMERO.get(c, c)
+        for c, classe in zip(texto, formato)
+    )
+
+
+def so_trocas_parecidas(a, b):
+    """True se 'a' e 'b' têm o mesmo tamanho e só diferem em caracteres do mesmo grupo de confusão"""
+    if len(a) != len(b):
+        return False
+    return all(x == y or (x in _GRUPO and _GRUPO.get(x) == _GRUPO.get(y)) for x, y in zip(a, b))
+
+
+def distancia_edicao(a, b):
+    """Distância de Levenshtein (inserção, remoção e troca custam 1)"""
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = atual
+    return anterior[-1]
+
+
+def _remocoes(palavra, quantidade):
+    """Todas as variações de 'palavra' com até 'quantidade' caracteres removidos"""
+    variacoes = {palavra}
+    atuais = {palavra}
+    for _ in range(quantidade):
+        atuais = {p[:i] + p[i + 1:] for p in atuais for i in range(len(p))}
+        variacoes |= atuais
+    return variacoes
+
+
+class IndicePlacas:
+    """
+    Índice de placas para busca aproximada por distância de edição.
+
+    Cada placa é guardada também com 1 (ou 'distancia_maxima') caractere removido
+    em cada posição. Duas palavras a distância <= k sempre têm uma dessas variações
+    em comum, então a busca só confere as poucas placas que caem no mesmo "balde",
+    em vez de comparar com o cadastro inteiro.
+    """
+
+    def __init__(self, placas=(), distancia_maxima=1):
+        self.distancia_maxima = distancia_maxima
+        self.baldes = {}  # variação -> conjunto de placas
+        self.tamanho = 0
+        for placa in placas:
+            self.adicionar(placa)
+
+    def adicionar(self, placa):
+        self.tamanho += 1
+        for variacao in _remocoes(placa, self.distancia_maxima):
+            self.baldes.setdefault(variacao, set()).add(placa)
+
+    def buscar(self, palavra):
+        """Lista de (distancia, placa) a no máximo 'distancia_maxima' de 'palavra', da mais próxima"""
+        candidatas = set()
+        for variacao in _remocoes(palavra, self.distancia_maxima):
+            candidatas |= self.baldes.get(variacao, set())
+        encontrados = [(distancia_edicao(palavra, placa), placa) for placa in candidatas]
+        return sorted(e for e in encontrados if e[0] <= self.distancia_maxima)
+
+
+class CorretorPlaca:
+    """
+    Transforma as leituras brutas do readtext numa placa válida (ou descarta).
+
+    - Só aceita textos que cabem num dos formatos, corrigindo até 'max_correcoes'
+      trocas de letra/número; cada troca reduz a confiança ('penalidade_correcao').
+    - Com um 'cadastro' (ex.: database_manager.cache_veiculos), procura a placa
+      cadastrada mais próxima; se houver uma única a 'distancia_maxima' ou menos,
+      a leitura é ajustada para ela ('penalidade_cadastro' por diferença). Uma leitura
+      que já é uma placa válida só é ajustada se a diferença for entre caracteres parecidos.
+    """
+
+    def __init__(self, cadastro=None, max_correcoes=2, penalidade_correcao=0.9, distancia_maxima=1,
+                 penalidade_cadastro=0.8):
+        self.cadastro = cadastro
+        self.max_correcoes = max_correcoes
+        self.penalidade_correcao = penalidade_correcao
+        self.distancia_maxima = distancia_maxima
+        self.penalidade_cadastro = penalidade_cadastro
+        self._indice = None
+        self._cadastradas = set()
+        self._geracao = None
+
+        self.leituras = 0
+        self.corrigidas = 0
+        self.ajustadas_cadastro = 0
+        self.descartadas = 0
+
+    def corrigir(self, resultado_ocr):
+        """
+        Recebe a lista (caixa, texto, confiança) do readtext e devolve
+        (placa, confiança, cadastrada) ou (None, 0.0, False) se nada parece uma placa.
+        'cadastrada' indica que a placa final existe no cadastro.
+        """
+        self.leituras += 1
+        candidatos = []  # (confiança, correções, placa)
+        textos = [(limpar_texto(texto), confianca) for _, texto, confianca in resultado_ocr]
+        if len(textos) > 1:
+            # A placa pode vir partida em pedaços ("ABC" e "1234") ou junto com a faixa "BRASIL"
+            textos.append(("".join(t for t, _ in textos), min(c for _, c in textos)))
+
+        for texto, confianca in textos:
+            for janela in self._janelas(texto):
+                for formato in FORMATOS.values():
+                    correcoes = _correcoes_para_formato(janela, formato)
+                    if correcoes is None or correcoes > self.max_correcoes:
+                        continue
+                    # Cada caractere a mais no texto original também conta como uma correção
+                    penalidade = correcoes + len(texto) - TAMANHO_PLACA
+                    candidatos.append((confianca * self.penalidade_correcao ** penalidade, penalidade,
+                                       _aplicar_formato(janela, formato)))
+
+        self._atualizar_indice()
+        if candidatos:
+            candidatos.sort(key=lambda c: (-c[0], c[1]))
+            # Uma leitura que bate com o cadastro ganha das outras interpretações
+            for confianca, penalidade, placa in candidatos:
+                if placa in self._cadastradas:
+                    if penalidade:
+                        self.corrigidas += 1
+                    return placa, confianca, True
+            confianca, penalidade, placa = candidatos[0]
+        else:
+            placa, confianca, penalidade = None, 0.0, 0
+
+        ajuste = self._mais_proxima_no_cadastro(placa or (textos[-1][0] if textos else ""))
+        if ajuste is not None and placa is not None and not so_trocas_parecidas(placa, ajuste[1]):
+            ajuste = None
+        if ajuste is not None:
+            distancia, cadastrada = ajuste
+            self.ajustadas_cadastro += 1
+            base = confianca if placa else max((c for _, c in textos), default=0.0)
+            return cadastrada, base * self.penalidade_cadastro ** distancia, True
+
+        if placa is None:
+            self.descartadas += 1
+            return None, 0.0, False
+        if penalidade:
+            self.corrigidas += 1
+        return placa, confianca, False
+
+    def estatisticas(self):
+        return {
+            "leituras": self.leituras,
+            "corrigidas": self.corrigidas,
+            "ajustadas_cadastro": self.ajustadas_cadastro,
+            "descartadas": self.descartadas,
+            "placas_no_indice": len(self._cadastradas),
+        }
+
+    @staticmethod
+    def _janelas(texto):
+        if len(texto) < TAMANHO_PLACA:
+            return []
+        return [texto[i:i + TAMANHO_PLACA] for i in range(len(texto) - TAMANHO_PLACA + 1)]
+
+    def _mais_proxima_no_cadastro(self, texto):
+        if self._indice is None or not texto:
+            return None
+        encontrados = self._indice.buscar(texto)
+        if not encontrados:
+            return None
+        # Duas placas cadastradas igualmente próximas: não dá para escolher com segurança
+        if len(encontrados) > 1 and encontrados[0][0] == encontrados[1][0]:
+            return None
+        return encontrados[0]
+
+    def _atualizar_indice(self):
+        """Refaz o índice quando o cadastro mudou (o cache avisa pela 'geracao')"""
+        if self.cadastro is None:
+            return
+        self.cadastro.garantir_atualizado()
+        if self.cadastro.geracao == self._geracao:
+            return
+        self._geracao = self.cadastro.geracao
+        placas = self.cadastro.placas()
+        self._cadastradas = set(placas)
+        self._indice = IndicePlacas(placas, self.distancia_maxima)